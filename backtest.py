@@ -0,0 +1,276 @@
+"""
+Backtest hors ligne des déclencheurs du CardPredictor.
+
+Rejoue un historique de messages du canal de statistiques avec la même
+sémantique que ``CardPredictor.should_predict`` / ``verify_prediction`` et
+calcule le taux de réussite par chiffre déclencheur et par offset (0/1/2).
+
+Les messages sont analysés une seule fois (``message_parser``) puis encodés
+en tableaux NumPy ; la simulation elle-même est vectorisée.
+
+Usage :
+    python backtest.py historique.jsonl --triggers 6 7 8 9 --triggers 5 7 8
+    python backtest.py historique.txt --save-npz historique.npz
+    python backtest.py historique.npz --triggers 7 8 --json
+
+Formats d'entrée : JSONL (champ ``text`` ou ``message``), texte brut (un message
+par ligne) ou archive ``.npz`` produite par ``--save-npz``.
+
+Différences connues avec le bot en direct :
+- le saut aléatoire de 30 % du même déclencheur consécutif n'est pas simulé ;
+- une baisse du numéro de jeu de plus de ``reset_gap`` ouvre une nouvelle
+  session (numérotation quotidienne), chaque session ayant ses propres cibles.
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Dict, Iterable, List, Any
+
+try:
+    import numpy as np
+except ImportError:  # dépendance optionnelle, uniquement pour l'analyse hors ligne
+    np = None
+
+from message_parser import parse_stat_message
+WIN_STATUSES = ('✅0️⃣', '✅1️⃣', '✅2️⃣')
+
+
+def _require_numpy():
+    if np is None:
+        raise SystemExit("❌ NumPy est requis pour le backtest : pip install numpy")
+
+
+def load_history(path: str) -> List[str]:
+    """Charge les textes des messages (JSONL ou un message par ligne)"""
+    texts = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line:
+                continue
+            if line.startswith('{'):
+                try:
+                    record = json.loads(line)
+                    texts.append(record.get('text') or record.get('message') or '')
+                    continue
+                except json.JSONDecodeError:
+                    pass
+            texts.append(line)
+    return texts
+
+
+def encode_messages(texts: Iterable[str]) -> Dict[str, Any]:
+    """Analyse chaque message une fois et produit les colonnes NumPy du backtest"""
+    _require_numpy()
+    games, n_groups, count1, count2, mask1, tagged, clock = [], [], [], [], [], [], []
+    for text in texts:
+        parsed = parse_stat_message(text)
+        counts = parsed.card_counts
+        games.append(-1 if parsed.game_number is None else parsed.game_number)
+        n_groups.append(len(parsed.groups))
+        count1.append(counts[0] if counts else -1)
+        count2.append(counts[1] if len(counts) > 1 else -1)
+        mask1.append(parsed.suit_masks[0] if parsed.suit_masks else 0)
+        tagged.append(parsed.is_verification)
+        clock.append(parsed.has_clock)
+    return {
+        'game': np.asarray(games, dtype=np.int64),
+        'n_groups': np.asarray(n_groups, dtype=np.int16),
+        'count1': np.asarray(count1, dtype=np.int16),
+        'count2': np.asarray(count2, dtype=np.int16),
+        'suit_mask1': np.asarray(mask1, dtype=np.uint8),
+        'tagged': np.asarray(tagged, dtype=bool),
+        'clock': np.asarray(clock, dtype=bool),
+    }
+
+
+def load_arrays(path: str) -> Dict[str, Any]:
+    """Charge un historique déjà encodé (.npz) ou encode un fichier texte"""
+    _require_numpy()
+    if path.endswith('.npz'):
+        with np.load(path) as data:
+            return {key: data[key] for key in data.files}
+    return encode_messages(load_history(path))
+
+
+def _session_keys(game, reset_gap: int):
+    """Clé monotone par session : une forte baisse du numéro ouvre une nouvelle session"""
+    valid = game >= 0
+    filled = np.where(valid, game, 0)
+    # Propage le dernier numéro valide pour comparer chaque message au précédent
+    last_idx = np.maximum.accumulate(np.where(valid, np.arange(len(game)), 0))
+    prev = np.concatenate(([0], filled[last_idx][:-1]))
+    drops = valid & (prev - filled > reset_gap)
+    session = np.cumsum(drops)
+    span = int(filled.max()) + reset_gap + 16 if len(game) else 1
+    return np.where(valid, session * span + filled, -1)
+
+
+def run_backtest(arrays: Dict[str, Any], triggers: Iterable[int], window: int = 2,
+                 reset_gap: int = 100) -> Dict[str, Any]:
+    """
+    Rejoue l'historique pour un jeu de déclencheurs.
+
+    Args:
+        arrays: Colonnes produites par encode_messages / load_arrays
+        triggers: Chiffres de fin déclenchant une prédiction
+        window: Offset maximal accepté pour la vérification (0..window)
+        reset_gap: Baisse de numéro considérée comme un changement de session
+    """
+    _require_numpy()
+    triggers = sorted(set(int(t) for t in triggers))
+    game = arrays['game']
+    n = len(game)
+    key = _session_keys(game, reset_gap)
+    has_game = key >= 0
+
+    # --- should_predict : premier message déclencheur par cible ---
+    is_trigger = (has_game & np.isin(game % 10, triggers)
+                  & (arrays['n_groups'] >= 1) & (arrays['suit_mask1'] > 0))
+    trig_idx = np.flatnonzero(is_trigger)
+    target_key = key[trig_idx] - game[trig_idx] + (game[trig_idx] // 10 + 1) * 10
+    target_key, first = np.unique(target_key, return_index=True)
+    created_at = trig_idx[first]
+    trigger_digit = game[created_at] % 10
+    target_game = game[created_at] // 10 * 10 + 10
+    m = len(target_key)
+
+    # --- verify_prediction : message résolvant (tag, pas ⏰, au moins 2 groupes) ---
+    resolving = arrays['tagged'] & ~arrays['clock'] & has_game & (arrays['n_groups'] >= 2)
+    res_idx = np.flatnonzero(resolving)
+    res_sorted = np.sort(key[res_idx] * n + res_idx)
+    valid_result = (arrays['count1'] == 2) & (arrays['count2'] == 2)
+
+    never = n + 1
+    resolve_at = np.full(m, never, dtype=np.int64)
+    resolve_offset = np.full(m, -1, dtype=np.int64)
+    # Historique court ou tronqué sans message résolvant : rien à chercher
+    for offset in range(window + 1 if len(res_sorted) else 0):
+        wanted = target_key + offset
+        pos = np.searchsorted(res_sorted, wanted * n + created_at + 1)
+        in_range = pos < len(res_sorted)
+        found = np.zeros(m, dtype=bool)
+        found[in_range] = res_sorted[pos[in_range]] // n == wanted[in_range]
+        at = np.where(found, res_sorted[np.minimum(pos, len(res_sorted) - 1)] % n, never)
+        better = at < resolve_at
+        resolve_at = np.where(better, at, resolve_at)
+        resolve_offset = np.where(better, offset, resolve_offset)
+
+    # --- expiration : premier message taggé avec jeu > prédiction + window ---
+    expiring = arrays['tagged'] & has_game & (arrays['clock'] | (arrays['n_groups'] >= 2))
+    exp_key = np.where(expiring, key, -1)
+    running_max = np.maximum.accumulate(exp_key) if n else exp_key
+    limit = target_key + window
+    expire_at = np.searchsorted(running_max, limit, side='right').astype(np.int64)
+    expire_at[expire_at >= n] = never
+    # Historique désordonné : un message antérieur dépassait déjà la limite,
+    # la recherche monotone ne s'applique pas, repli sur un parcours exact.
+    stale = running_max[created_at] > limit
+    for row in np.flatnonzero(stale):
+        later = np.flatnonzero(exp_key[created_at[row] + 1:] > limit[row])
+        expire_at[row] = created_at[row] + 1 + later[0] if len(later) else never
+
+    resolved_first = resolve_at < expire_at
+    win = resolved_first & valid_result[np.minimum(resolve_at, n - 1)] if n else resolved_first
+    invalid = resolved_first & ~win
+    expired = ~resolved_first & (expire_at < never)
+    pending = ~resolved_first & ~expired
+
+    return _summarize(triggers, window, trigger_digit, target_game, resolve_offset,
+                      win, invalid, expired, pending)
+
+
+def _rate(wins: int, decided: int) -> float:
+    return round(wins / decided * 100, 2) if decided else 0.0
+
+
+def _summarize(triggers, window, trigger_digit, target_game, resolve_offset,
+               win, invalid, expired, pending) -> Dict[str, Any]:
+    """Agrège les résultats par chiffre déclencheur et par offset"""
+    def bucket(mask):
+        wins = int(np.count_nonzero(win & mask))
+        losses = int(np.count_nonzero((invalid | expired) & mask))
+        return {
+            'predictions': int(np.count_nonzero(mask)),
+            'wins': wins,
+            'losses_invalid': int(np.count_nonzero(invalid & mask)),
+            'losses_expired': int(np.count_nonzero(expired & mask)),
+            'pending': int(np.count_nonzero(pending & mask)),
+            'win_rate': _rate(wins, wins + losses),
+        }
+
+    everything = np.ones(len(target_game), dtype=bool)
+    total_wins = int(np.count_nonzero(win))
+    return {
+        'triggers': triggers,
+        'window': window,
+        'overall': bucket(everything),
+        'by_trigger': {str(d): bucket(trigger_digit == d) for d in triggers},
+        'by_offset': {
+            str(offset): {
+                'wins': int(np.count_nonzero(win & (resolve_offset == offset))),
+                'share': _rate(int(np.count_nonzero(win & (resolve_offset == offset))), total_wins),
+            }
+            for offset in range(window + 1)
+        },
+    }
+
+
+def format_report(result: Dict[str, Any]) -> str:
+    """Rapport texte d'un backtest"""
+    overall = result['overall']
+    lines = [
+        f"🎯 Déclencheurs {result['triggers']} (offsets 0..{result['window']})",
+        f"  Prédictions: {overall['predictions']} | ✅ {overall['wins']} | "
+        f"❌ {overall['losses_invalid']} invalides, {overall['losses_expired']} expirées | "
+        f"⌛ {overall['pending']} | Taux: {overall['win_rate']:.2f}%",
+    ]
+    for digit, stats in result['by_trigger'].items():
+        lines.append(f"  • Déclencheur {digit}: {stats['wins']}/{stats['predictions']} "
+                     f"({stats['win_rate']:.2f}%)")
+    for offset, stats in result['by_offset'].items():
+        lines.append(f"  • Offset {offset}: {stats['wins']} réussites ({stats['share']:.2f}% des ✅)")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest hors ligne des déclencheurs du CardPredictor")
+    parser.add_argument('history', help="Historique (.jsonl, .txt ou .npz)")
+    parser.add_argument('--triggers', type=int, nargs='+', action='append',
+                        help="Chiffres déclencheurs (option répétable pour comparer plusieurs jeux)")
+    parser.add_argument('--window', type=int, default=2, help="Offset maximal de vérification (défaut: 2)")
+    parser.add_argument('--reset-gap', type=int, default=100,
+                        help="Baisse de numéro signalant une nouvelle session (défaut: 100)")
+    parser.add_argument('--save-npz', help="Sauvegarde l'historique encodé pour les prochains runs")
+    parser.add_argument('--json', action='store_true', help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    _require_numpy()
+    started = time.perf_counter()
+    arrays = load_arrays(args.history)
+    loaded = time.perf_counter()
+    if args.save_npz:
+        np.savez_compressed(args.save_npz, **arrays)
+
+    results = [run_backtest(arrays, triggers, args.window, args.reset_gap)
+               for triggers in (args.triggers or [[6, 7, 8, 9]])]
+    finished = time.perf_counter()
+
+    if args.json:
+        json.dump({
+            'messages': int(len(arrays['game'])),
+            'load_seconds': round(loaded - started, 3),
+            'backtest_seconds': round(finished - loaded, 3),
+            'results': results,
+        }, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    else:
+        print(f"📂 {len(arrays['game'])} messages chargés en {loaded - started:.2f}s, "
+              f"backtest en {finished - loaded:.2f}s")
+        for result in results:
+            print(format_report(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""
+Benchmarks de débit du pipeline des messages de statistiques.
+
+    python -m benchmarks.run --messages 50000 --output bench.json
+    python -m benchmarks.run --compare ancien.json nouveau.json
+"""
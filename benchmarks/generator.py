@@ -0,0 +1,85 @@
+"""
+Générateur déterministe de messages réalistes du canal de statistiques.
+
+Couvre la numérotation #N (avec ou sans espace / point), les couleurs emoji et
+simples, les tags ⏰/✅/🔰, les distributions 2+2 et à 3 cartes, ainsi que des
+jeux arrivant dans le désordre.
+"""
+import random
+from typing import Iterator, List, Optional
+
+EMOJI_SUITS = ('♠️', '♥️', '♦️', '♣️')
+PLAIN_SUITS = ('♠', '♥', '♦', '♣')
+RANKS = ('A', 'K', 'Q', 'J', '10', '9', '8', '7', '6', '5', '4', '3', '2')
+
+
+class StatMessageGenerator:
+    """Flux reproductible de messages (même graine → mêmes messages)"""
+
+    def __init__(self, seed: int = 42, start_game: int = 1, emoji_ratio: float = 0.7,
+                 three_card_ratio: float = 0.4, clock_ratio: float = 0.15,
+                 untagged_ratio: float = 0.1, disorder_ratio: float = 0.05):
+        self.rng = random.Random(seed)
+        self.game = start_game
+        self.emoji_ratio = emoji_ratio
+        self.three_card_ratio = three_card_ratio
+        self.clock_ratio = clock_ratio
+        self.untagged_ratio = untagged_ratio
+        self.disorder_ratio = disorder_ratio
+
+    def _group(self, cards: int) -> str:
+        suits = EMOJI_SUITS if self.rng.random() < self.emoji_ratio else PLAIN_SUITS
+        return ''.join(self.rng.choice(RANKS) + self.rng.choice(suits) for _ in range(cards))
+
+    def _number(self, game: int) -> str:
+        style = self.rng.random()
+        if style < 0.8:
+            return f"#N{game}."
+        if style < 0.9:
+            return f"#N {game}"
+        return f"#n{game}."
+
+    def message(self, game: Optional[int] = None, tag: Optional[str] = None,
+                cards: Optional[tuple] = None) -> str:
+        """Un message pour un jeu donné (ou le prochain jeu du flux)"""
+        if game is None:
+            game = self.next_game()
+        if tag is None:
+            roll = self.rng.random()
+            if roll < self.untagged_ratio:
+                tag = ''
+            elif roll < self.untagged_ratio + self.clock_ratio:
+                tag = '⏰'
+            else:
+                tag = self.rng.choice(('✅', '🔰'))
+        if cards is None:
+            first = 3 if self.rng.random() < self.three_card_ratio else 2
+            second = 3 if self.rng.random() < self.three_card_ratio else 2
+            cards = (first, second)
+        score1, score2 = self.rng.randint(0, 9), self.rng.randint(0, 9)
+        return (f"{self._number(game)} {tag}{score1}({self._group(cards[0])}) - "
+                f"{score2}({self._group(cards[1])}) #T{score1 + score2}")
+
+    def next_game(self) -> int:
+        """Numéro du prochain jeu, parfois légèrement dans le désordre"""
+        if self.rng.random() < self.disorder_ratio:
+            return max(1, self.game + self.rng.randint(-3, 3))
+        game = self.game
+        self.game += 1
+        return game
+
+    def stream(self, count: int) -> Iterator[str]:
+        for _ in range(count):
+            yield self.message()
+
+    def batch(self, count: int) -> List[str]:
+        return list(self.stream(count))
+
+    def triggers(self, count: int, digits=(6, 7, 8, 9)) -> List[str]:
+        """Messages dont le numéro se termine par un chiffre déclencheur"""
+        messages = []
+        while len(messages) < count:
+            game = self.next_game()
+            if game % 10 in digits:
+                messages.append(self.message(game, tag=''))
+        return messages
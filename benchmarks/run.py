@@ -0,0 +1,216 @@
+"""
+Scénarios de débit : prédiction, vérification, rafale d'expirations, état de
+longue durée et vérification du planificateur.
+
+Chaque scénario mesure messages/s, latences p50/p99 par message et pic mémoire
+(tracemalloc, passe séparée pour ne pas fausser les latences), puis le tout est
+émis en JSON comparable d'un commit à l'autre.
+"""
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple, Any
+
+from bot_logging import setup_logging
+from message_parser import parse_stat_message
+from predictor import CardPredictor
+from benchmarks.generator import StatMessageGenerator
+
+Scenario = Callable[[int, int, Dict[str, Any]], Tuple[Callable[[str], Any], List[str], Dict[str, Any]]]
+
+
+def _pipeline(predictor: CardPredictor) -> Callable[[str], Any]:
+    """Chemin critique du bot : une analyse, puis should_predict et verify_prediction"""
+    def handle(text: str):
+        parsed = parse_stat_message(text)
+        predictor.should_predict(parsed)
+        return predictor.verify_prediction(parsed)
+    return handle
+
+
+def scenario_predict(count: int, seed: int, options: Dict[str, Any]):
+    """Uniquement des messages déclencheurs"""
+    predictor = CardPredictor()
+    messages = StatMessageGenerator(seed, disorder_ratio=0).triggers(count)
+    return predictor.should_predict, messages, {'predictor': predictor}
+
+
+def scenario_verify(count: int, seed: int, options: Dict[str, Any]):
+    """Flux réaliste complet (prédictions + vérifications + expirations)"""
+    predictor = CardPredictor()
+    messages = StatMessageGenerator(seed).batch(count)
+    return _pipeline(predictor), messages, {'predictor': predictor}
+
+
+def scenario_expiry_storm(count: int, seed: int, options: Dict[str, Any]):
+    """Beaucoup de prédictions ⌛ expirées d'un coup par des messages ⏰ très en avance"""
+    predictor = CardPredictor()
+    for game in range(10, count * 10 + 10, 10):
+        predictor.add_pending(game)
+    generator = StatMessageGenerator(seed)
+    far_game = count * 10 + 100
+    messages = [generator.message(far_game + i, tag='⏰') for i in range(count)]
+    return _pipeline(predictor), messages, {'predictor': predictor}
+
+
+def scenario_long_uptime(count: int, seed: int, options: Dict[str, Any]):
+    """Vérification après des semaines d'historique (état de longue durée)"""
+    history = options.get('uptime_history', 50_000)
+    predictor = CardPredictor()
+    generator = StatMessageGenerator(seed)
+    for game in range(10, history * 10 + 10, 10):
+        predictor.add_pending(game)
+        predictor.verify_prediction(generator.message(game, tag='✅', cards=(2, 2)))
+    generator.game = history * 10 + 20
+    messages = generator.batch(count)
+    return _pipeline(predictor), messages, {'predictor': predictor}
+
+
+def scenario_scheduler_verify(count: int, seed: int, options: Dict[str, Any]):
+    """PredictionScheduler.verify_prediction_from_message avec 12 prédictions en attente"""
+    from persistence import PersistenceService
+    from scheduler import PredictionScheduler
+    scheduler = PredictionScheduler(None, CardPredictor(), 0, 0, persistence=PersistenceService())
+    messages = StatMessageGenerator(seed).batch(count)
+    pending = sorted({random.Random(seed).randint(1, count) for _ in range(12)})
+    return (lambda text: scheduler.verify_prediction_from_message(parse_stat_message(text), pending),
+            messages, {})
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    'predict': scenario_predict,
+    'verify': scenario_verify,
+    'expiry_storm': scenario_expiry_storm,
+    'long_uptime': scenario_long_uptime,
+    'scheduler_verify': scenario_scheduler_verify,
+}
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index] / 1000  # ns → µs
+
+
+def _state_sizes(predictor: CardPredictor) -> Dict[str, int]:
+    return {
+        'prediction_status': len(predictor.prediction_status),
+        'prediction_messages': len(predictor.prediction_messages),
+        'processed_games': len(predictor.processed_games),
+        'auto_predictions': len(predictor.auto_predictions),
+        'status_log': len(predictor.status_log),
+        'pending': predictor.pending_count(),
+    }
+
+
+def run_scenario(name: str, count: int, seed: int, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Passe chronométrée puis passe mémoire sur un état reconstruit"""
+    build = SCENARIOS[name]
+    try:
+        random.seed(seed)
+        handler, messages, context = build(count, seed, options)
+    except ImportError as e:
+        return {'skipped': f"dépendance manquante: {e.name}"}
+
+    clock = time.perf_counter_ns
+    latencies = []
+    started = clock()
+    for text in messages:
+        before = clock()
+        handler(text)
+        latencies.append(clock() - before)
+    elapsed = (clock() - started) / 1e9
+    latencies.sort()
+
+    random.seed(seed)
+    tracemalloc.start()
+    handler, messages, _ = build(count, seed, options)
+    tracemalloc.reset_peak()
+    for text in messages:
+        handler(text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'messages': len(messages),
+        'seconds': round(elapsed, 4),
+        'messages_per_sec': round(len(messages) / elapsed, 1) if elapsed else 0.0,
+        'p50_us': round(_percentile(latencies, 50), 2),
+        'p99_us': round(_percentile(latencies, 99), 2),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+    if 'predictor' in context:
+        result['state'] = _state_sizes(context['predictor'])
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'inconnu'
+
+
+def compare(old_path: str, new_path: str):
+    """Affiche l'évolution messages/s et p99 entre deux résultats JSON"""
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old.get('revision')} → {new.get('revision')}")
+    for name, current in new['scenarios'].items():
+        previous = old['scenarios'].get(name)
+        if not previous or 'skipped' in current or 'skipped' in previous:
+            continue
+        speedup = current['messages_per_sec'] / previous['messages_per_sec'] if previous['messages_per_sec'] else 0
+        print(f"  {name:18s} {previous['messages_per_sec']:>12.0f} → {current['messages_per_sec']:>12.0f} msg/s "
+              f"(x{speedup:.2f}), p99 {previous['p99_us']:.1f} → {current['p99_us']:.1f} µs")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de débit du CardPredictor")
+    parser.add_argument('--messages', type=int, default=20000, help="Messages par scénario")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scénario à exécuter (répétable, tous par défaut)")
+    parser.add_argument('--uptime-history', type=int, default=50_000,
+                        help="Prédictions résolues avant le scénario long_uptime")
+    parser.add_argument('--output', help="Fichier JSON de sortie (stdout par défaut)")
+    parser.add_argument('--compare', nargs=2, metavar=('ANCIEN', 'NOUVEAU'),
+                        help="Compare deux fichiers de résultats")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # Les benchmarks mesurent le coût en production : journalisation au niveau WARNING
+    setup_logging('WARNING')
+
+    options = {'uptime_history': args.uptime_history}
+    report = {
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'messages': args.messages,
+        'seed': args.seed,
+        'options': options,
+        'scenarios': {name: run_scenario(name, args.messages, args.seed, options)
+                      for name in (args.scenario or SCENARIOS)},
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
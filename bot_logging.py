@@ -0,0 +1,125 @@
+"""
+Journalisation partagée du bot (remplace les print() du chemin critique).
+
+- Niveaux standard (``LOG_LEVEL`` : DEBUG, INFO, WARNING, ERROR ; INFO par défaut)
+- Formatage différé : ``logger.debug("Jeu #%s", numero)`` ne construit aucune
+  chaîne quand le niveau est désactivé
+- Limitation des lignes répétées : au plus ``LOG_RATE_BURST`` lignes identiques
+  (même gabarit) par fenêtre de ``LOG_RATE_INTERVAL`` secondes, et
+  échantillonnage explicite via ``extra={'sample': N}`` (1 ligne sur N)
+- Sortie asynchrone optionnelle (``LOG_ASYNC=1``) : les handlers tournent dans
+  un thread dédié alimenté par une file, l'écriture ne bloque pas la boucle asyncio
+
+En production, ``LOG_LEVEL=WARNING`` rend le coût de journalisation quasi nul.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+_configured = False
+_listener = None
+
+
+class RateLimitFilter(logging.Filter):
+    """Limite les lignes répétées et applique l'échantillonnage ``extra={'sample': N}``"""
+
+    def __init__(self, interval: float = 10.0, burst: int = 5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self._windows = {}  # (logger, gabarit) -> [début fenêtre, émis, supprimés]
+        self._samples = {}  # (logger, gabarit) -> compteur d'échantillonnage
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Les erreurs passent toujours
+        if record.levelno >= logging.ERROR:
+            return True
+
+        # Clé sur le gabarit non formaté : aucun coût de formatage ici
+        key = (record.name, record.msg)
+
+        sample = getattr(record, 'sample', None)
+        if sample and sample > 1:
+            seen = self._samples.get(key, 0)
+            self._samples[key] = seen + 1
+            if seen % sample:
+                return False
+
+        if self.burst <= 0:
+            return True
+
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.interval:
+            suppressed = window[2] if window else 0
+            self._windows[key] = [now, 1, 0]
+            if suppressed:
+                record.msg = f"{record.msg} (+{suppressed} lignes identiques supprimées)"
+            return True
+
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+
+        window[2] += 1
+        return False
+
+
+def setup_logging(level: Optional[str] = None, async_output: Optional[bool] = None) -> logging.Logger:
+    """Configure la journalisation une seule fois pour tout le processus"""
+    global _configured, _listener
+    root = logging.getLogger()
+    if _configured:
+        return root
+
+    level_name = (level or os.getenv('LOG_LEVEL') or 'INFO').upper()
+    root.setLevel(getattr(logging, level_name, logging.INFO))
+
+    if async_output is None:
+        async_output = os.getenv('LOG_ASYNC', '0').lower() in ('1', 'true', 'yes')
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    rate_limit = RateLimitFilter(
+        interval=float(os.getenv('LOG_RATE_INTERVAL', '10')),
+        burst=int(os.getenv('LOG_RATE_BURST', '5')),
+    )
+
+    if async_output:
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # Filtrage dans le thread appelant : les lignes rejetées ne sont jamais mises en file
+        queue_handler.addFilter(rate_limit)
+        root.addHandler(queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+    else:
+        stream_handler.addFilter(rate_limit)
+        root.addHandler(stream_handler)
+
+    # Telethon est très bavard en INFO
+    logging.getLogger('telethon').setLevel(max(root.level, logging.WARNING))
+
+    _configured = True
+    return root
+
+
+def shutdown_logging():
+    """Vide la file asynchrone avant l'arrêt du processus"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger nommé du bot"""
+    return logging.getLogger(name)
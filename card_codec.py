@@ -0,0 +1,64 @@
+"""
+Codec des symboles de cartes, partagé par le parseur, les prédicteurs et le planificateur.
+
+Un groupe entre parenthèses (ex. ``"♠️10♥️K"``) est décodé en une seule passe
+en un nombre de cartes et un masque de couleurs sur 4 bits. Le sélecteur de
+variante emoji (U+FE0F) n'est pas un symbole de carte : ``♠️`` et ``♠``
+comptent tous deux pour une carte. Les groupes se répètent beaucoup d'un
+message à l'autre, le décodage est donc mémorisé.
+"""
+from functools import lru_cache
+from typing import NamedTuple
+
+SUIT_CHARS = '♠♥♦♣'
+SUIT_BITS = {suit: 1 << i for i, suit in enumerate(SUIT_CHARS)}
+
+# Couleurs de chaque masque, dans l'ordre historique de normalize_suits (tri par code)
+_MASK_SUITS = tuple(
+    ''.join(sorted(suit for suit, bit in SUIT_BITS.items() if mask & bit))
+    for mask in range(1 << len(SUIT_CHARS))
+)
+
+
+class CardGroup(NamedTuple):
+    """Groupe décodé : nombre de cartes et masque des couleurs présentes"""
+    count: int
+    mask: int
+
+    @property
+    def suits(self) -> str:
+        return _MASK_SUITS[self.mask]
+
+
+@lru_cache(maxsize=4096)
+def decode_group(group: str) -> CardGroup:
+    """Nombre de cartes et masque de couleurs d'un groupe, en une passe"""
+    count = 0
+    mask = 0
+    bits = SUIT_BITS
+    for char in group:
+        bit = bits.get(char)
+        if bit:
+            count += 1
+            mask |= bit
+    return CardGroup(count, mask)
+
+
+def count_cards(group: str) -> int:
+    """Nombre de symboles de cartes du groupe"""
+    return decode_group(group).count
+
+
+def suit_mask(group: str) -> int:
+    """Masque 4 bits des couleurs du groupe (♠=1, ♥=2, ♦=4, ♣=8)"""
+    return decode_group(group).mask
+
+
+def mask_to_suits(mask: int) -> str:
+    """Couleurs d'un masque, triées comme normalize_suits"""
+    return _MASK_SUITS[mask]
+
+
+def normalize_suits(group: str) -> str:
+    """Couleurs distinctes d'un groupe, triées, sans sélecteur de variante emoji"""
+    return _MASK_SUITS[decode_group(group).mask]
@@ -0,0 +1,54 @@
+"""
+Gestionnaires Telethon filtrés par chat, réenregistrables à chaud.
+
+Un gestionnaire enregistré sans filtre reçoit chaque message de chaque chat
+visible par le bot. Avec ``chats=``, Telethon écarte le trafic hors des canaux
+de statistiques dans son propre dispatcher, avant que notre code ne s'exécute.
+
+Quand les canaux configurés changent (``/set_stat``, routes, rechargement de la
+configuration), ``bind`` remplace le filtre : retrait de l'ancien gestionnaire
+et ajout du nouveau se font sans ``await`` entre les deux, donc de façon
+atomique pour la boucle asyncio (aucun événement ne voit l'état intermédiaire).
+"""
+from typing import Callable, FrozenSet, Iterable, Optional
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class FilteredHandler:
+    """Un callback lié à un type d'événement et à l'ensemble courant de chats"""
+
+    def __init__(self, client, callback: Callable, event_type):
+        """
+        Args:
+            client: Client Telegram
+            callback: Coroutine appelée pour chaque événement retenu
+            event_type: Classe d'événement Telethon (events.NewMessage, events.MessageEdited...)
+        """
+        self.client = client
+        self.callback = callback
+        self.event_type = event_type
+        self.chats: FrozenSet[int] = frozenset()
+        self._builder: Optional[object] = None
+
+    def bind(self, chats: Iterable[int]) -> bool:
+        """Enregistre le callback pour ces chats (aucun chat = désenregistré) ; vrai si le filtre a changé"""
+        chats = frozenset(chat_id for chat_id in chats if chat_id)
+        if chats == self.chats:
+            return False
+
+        # Pas d'await entre retrait et ajout : le remplacement est atomique pour la boucle
+        if self._builder is not None:
+            self.client.remove_event_handler(self.callback, self.event_type)
+        self._builder = self.event_type(chats=sorted(chats)) if chats else None
+        if self._builder is not None:
+            self.client.add_event_handler(self.callback, self._builder)
+        self.chats = chats
+
+        logger.info("🎯 %s lié à %s chat(s): %s", self.callback.__name__, len(chats), sorted(chats))
+        return True
+
+    def unbind(self):
+        self.bind(())
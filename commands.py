@@ -0,0 +1,104 @@
+"""
+Dispatcher unique des commandes d'administration.
+
+Au lieu d'un gestionnaire ``events.NewMessage(pattern=...)`` par commande (chaque
+message testé contre toutes les expressions régulières), un seul gestionnaire :
+
+- un texte qui ne commence pas par ``/`` est écarté par un test d'un caractère ;
+- le nom de la commande (``/status``, ``/set_stat@MonBot``...) est cherché dans
+  une table : coût constant quel que soit le nombre de commandes, et ``/sta`` ne
+  se confond plus avec ``/start`` ou ``/status`` ;
+- les contrôles communs (discussion privée, administrateur) et l'analyse des
+  arguments sont faits ici ; le résultat de l'expression des arguments est
+  exposé dans ``event.pattern_match`` comme avec ``pattern=``.
+"""
+import re
+from typing import Callable, Dict, List, Optional, Pattern
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Command:
+    """Une commande enregistrée et ses contrôles"""
+
+    __slots__ = ('name', 'callback', 'args', 'admin', 'private', 'deny')
+
+    def __init__(self, name: str, callback: Callable, args: Optional[Pattern],
+                 admin: bool, private: bool, deny: Optional[str]):
+        self.name = name
+        self.callback = callback
+        self.args = args
+        self.admin = admin
+        self.private = private
+        self.deny = deny
+
+
+class CommandDispatcher:
+    """Table nom → commandes, consultée une fois par message"""
+
+    def __init__(self, admin_id: int):
+        self.admin_id = admin_id
+        self._commands: Dict[str, List[Command]] = {}
+
+    def command(self, name: str, args: Optional[str] = None, admin: bool = True,
+                private: bool = False, deny: Optional[str] = None):
+        """
+        Décorateur d'enregistrement d'une commande.
+
+        Args:
+            name: Nom sans ``/`` (plusieurs callbacks par nom sont exécutés dans l'ordre)
+            args: Expression des arguments ; la commande est ignorée s'ils ne correspondent pas
+            admin: Réservée à l'administrateur
+            private: Ignorée dans les groupes et canaux
+            deny: Réponse aux non-administrateurs (ignorés en silence sinon)
+        """
+        pattern = re.compile(args) if args else None
+
+        def register(callback: Callable) -> Callable:
+            self._commands.setdefault(name, []).append(Command(name, callback, pattern, admin, private, deny))
+            return callback
+
+        return register
+
+    @staticmethod
+    def parse(text: str):
+        """Nom de la commande (sans ``/`` ni ``@bot``) et reste du texte, ou (None, '')"""
+        if not text or text[0] != '/':
+            return None, ''
+        head, _, rest = text[1:].partition(' ')
+        name = head.split('\n', 1)[0].split('@', 1)[0]
+        return name, rest.strip()
+
+    async def dispatch(self, event) -> bool:
+        """Gestionnaire NewMessage ; vrai si une commande connue a été reconnue"""
+        name, rest = self.parse(event.message.message if event.message else '')
+        commands = self._commands.get(name) if name else None
+        if not commands:
+            return False
+
+        for command in commands:
+            if command.private and (event.is_group or event.is_channel):
+                continue
+            if command.admin and event.sender_id != self.admin_id:
+                if command.deny:
+                    await event.respond(command.deny)
+                continue
+            match = None
+            if command.args is not None:
+                match = command.args.match(rest)
+                if match is None:
+                    continue
+            event.pattern_match = match
+            try:
+                await command.callback(event)
+            except Exception as e:
+                logger.error("Erreur dans /%s: %s", name, e)
+        return True
+
+    def names(self) -> List[str]:
+        return sorted(self._commands)
+
+    def __len__(self) -> int:
+        return len(self._commands)
@@ -0,0 +1,108 @@
+"""
+Déduplication des messages par identifiants Telegram.
+
+Les identifiants de messages d'un canal sont monotones : pour chaque chat on
+garde le plus grand identifiant vu (high-water mark) et un masque de bits des
+``window`` identifiants qui le précèdent, pour accepter les messages arrivés
+dans le désordre. Vérification O(1), deux entiers par chat, et l'état reste
+valable après un redémarrage (contrairement à ``hash()`` qui change à chaque
+processus).
+
+``MessageGameIndex`` retient le jeu de chaque message récent : une modification
+(⏰ → résultat final) retrouve son jeu sans relire l'historique.
+"""
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class MessageWatermarks:
+    """High-water mark et fenêtre de désordre par chat"""
+
+    MAX_WINDOW = 63  # Le masque tient dans un entier signé 64 bits (instantanés, BIGINT)
+
+    def __init__(self, window: int = 32):
+        """
+        Args:
+            window: Nombre d'identifiants sous la marque encore acceptés hors ordre
+        """
+        if not 0 < window <= self.MAX_WINDOW:
+            raise ValueError(f"window doit être entre 1 et {self.MAX_WINDOW}")
+        self.window = window
+        self._full = (1 << window) - 1
+        self._marks: Dict[int, Tuple[int, int]] = {}  # chat -> (marque, bits vus)
+        self.accepted = 0
+        self.rejected = 0
+
+    def is_new(self, chat_id: int, message_id: int) -> bool:
+        """Vrai si le message n'a jamais été vu (et l'enregistre), faux sinon"""
+        entry = self._marks.get(chat_id)
+        if entry is None:
+            self._marks[chat_id] = (message_id, 1)
+            self.accepted += 1
+            return True
+
+        mark, bits = entry
+        if message_id > mark:
+            # Le bit 0 correspond toujours à la marque
+            bits = ((bits << (message_id - mark)) | 1) & self._full
+            self._marks[chat_id] = (message_id, bits)
+            self.accepted += 1
+            return True
+
+        delta = mark - message_id
+        if delta >= self.window or (bits >> delta) & 1:
+            # Trop ancien pour la fenêtre, ou déjà vu
+            self.rejected += 1
+            return False
+
+        self._marks[chat_id] = (mark, bits | (1 << delta))
+        self.accepted += 1
+        return True
+
+    def high_water(self, chat_id: int) -> int:
+        """Plus grand identifiant vu pour ce chat (0 si aucun)"""
+        entry = self._marks.get(chat_id)
+        return entry[0] if entry else 0
+
+    def clear(self):
+        self._marks.clear()
+        self.accepted = 0
+        self.rejected = 0
+
+    def export_state(self) -> List[Tuple[int, int, int]]:
+        """Triplets (chat, marque, bits) pour les instantanés et la base de données"""
+        return [(chat_id, mark, bits) for chat_id, (mark, bits) in self._marks.items()]
+
+    def restore_state(self, rows: List[Tuple[int, int, int]]):
+        """Fusionne des triplets sauvegardés (la marque la plus haute l'emporte)"""
+        for chat_id, mark, bits in rows:
+            current = self._marks.get(chat_id)
+            if current is None or mark > current[0]:
+                self._marks[chat_id] = (mark, bits & self._full)
+
+    def __len__(self) -> int:
+        return len(self._marks)
+
+
+class MessageGameIndex:
+    """Index borné (chat_id, message_id) → numéro de jeu, pour retrouver le jeu d'un message modifié"""
+
+    def __init__(self, maxlen: int = 512):
+        self.maxlen = maxlen
+        self._games: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+
+    def add(self, chat_id: int, message_id: int, game_number: int):
+        key = (chat_id, message_id)
+        self._games[key] = game_number
+        self._games.move_to_end(key)
+        if len(self._games) > self.maxlen:
+            self._games.popitem(last=False)
+
+    def get(self, chat_id: int, message_id: int) -> Optional[int]:
+        return self._games.get((chat_id, message_id))
+
+    def clear(self):
+        self._games.clear()
+
+    def __len__(self) -> int:
+        return len(self._games)
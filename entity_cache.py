@@ -0,0 +1,109 @@
+"""
+Cache des identités Telegram (le bot lui-même, entités et titres des canaux).
+
+``get_me`` et ``get_entity`` sont des allers-retours réseau dont la réponse ne
+change presque jamais : les résultats sont gardés ``ttl`` secondes, les appels
+simultanés pour la même clé partagent une seule requête, et ``invalidate``
+oublie une entrée (canal renommé, bot retiré) ou tout le cache. ``warm``
+précharge l'identité du bot et les canaux configurés au démarrage.
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+_ME = 'me'  # Clé de l'identité du bot
+
+
+class EntityCache:
+    """Cache asynchrone à durée de vie autour de get_me / get_entity"""
+
+    def __init__(self, client, ttl: Optional[float] = None):
+        """
+        Args:
+            client: Client Telegram
+            ttl: Durée de vie d'une entrée en secondes (ENTITY_CACHE_TTL, 3600 par défaut)
+        """
+        self.client = client
+        self.ttl = ttl or float(os.getenv('ENTITY_CACHE_TTL', '3600'))
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}  # clé -> (expiration, valeur)
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def _get(self, key: Hashable, fetch):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        loading = self._loading.get(key)
+        if loading is not None:
+            # Une requête est déjà en cours pour cette clé : on partage son résultat
+            self.hits += 1
+            return await asyncio.shield(loading)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await fetch()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Évite l'avertissement si personne d'autre n'attend
+            raise
+        else:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._loading[key]
+
+    async def get_me(self):
+        """Identité du bot"""
+        return await self._get(_ME, self.client.get_me)
+
+    async def me_id(self) -> Optional[int]:
+        """Identifiant du bot (None si get_me échoue)"""
+        try:
+            return getattr(await self.get_me(), 'id', None)
+        except Exception as e:
+            logger.error("Erreur get_me: %s", e)
+            return None
+
+    async def get_entity(self, chat_id: int):
+        """Entité d'un chat ou canal"""
+        return await self._get(chat_id, lambda: self.client.get_entity(chat_id))
+
+    async def title(self, chat_id: int) -> str:
+        """Titre d'un canal, ou « Canal <id> » s'il est inaccessible"""
+        try:
+            chat = await self.get_entity(chat_id)
+            return getattr(chat, 'title', None) or f'Canal {chat_id}'
+        except Exception:
+            return f'Canal {chat_id}'
+
+    def invalidate(self, chat_id: Optional[int] = None):
+        """Oublie un chat, ou tout le cache (identité du bot comprise) sans argument"""
+        if chat_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(chat_id, None)
+
+    async def warm(self, chat_ids: Iterable[int] = ()):
+        """Précharge l'identité du bot et les canaux donnés (les erreurs sont ignorées)"""
+        chat_ids = [chat_id for chat_id in dict.fromkeys(chat_ids) if chat_id]
+        results = await asyncio.gather(self.get_me(), *(self.get_entity(chat_id) for chat_id in chat_ids),
+                                       return_exceptions=True)
+        failed = sum(isinstance(result, Exception) for result in results)
+        logger.info("🗂️ Cache des entités préchargé: %s entrée(s), %s échec(s)", len(self._entries), failed)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
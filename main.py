@@ -1,3 +1,5 @@
+# Premier import : chronomètre les imports suivants avec --profile-startup
+from startup_profile import profiler
 import os
 import asyncio
 import re
@@ -6,8 +8,24 @@ from datetime import datetime
 from telethon import TelegramClient, events
 from telethon.events import ChatAction
 from predictor import CardPredictor
+from router import ChannelRouter
+from outbox import OutboundQueue, PRIORITY_PREDICTION, PRIORITY_RESULT
+from entity_cache import EntityCache
+from chat_filter import FilteredHandler
+from commands import CommandDispatcher
+from persistence import PersistenceService, atomic_write_json
+from session import create_session, has_auth_key, StartupTimer
+from metrics import (REGISTRY, MESSAGES, PREDICTIONS_CREATED, PREDICTIONS_VERIFIED, HANDLER_SECONDS,
+                     OUTBOX_DEPTH, timed, monitor_event_loop)
+from tracing import tracer
+from snapshot import read_snapshot, save_snapshot
+from message_parser import parse_stat_message
 from aiohttp import web
 import time
+from bot_logging import setup_logging, get_logger
+
+setup_logging()
+logger = get_logger('bot')
 
 # Configuration par défaut pour Replit
 API_ID = int(os.getenv('API_ID', '29177661'))
@@ -24,21 +42,38 @@ if not API_HASH:
 if not BOT_TOKEN:
     raise ValueError("❌ BOT_TOKEN manquant - Configurez vos Secrets")
 
-print(f"✅ Configuration chargée pour Replit")
-print(f"🔧 Port: {PORT}")
+logger.info("✅ Configuration chargée pour Replit")
+logger.info("🔧 Port: %s", PORT)
 
 # Variables d'état
 detected_stat_channel = None
 detected_display_channel = None
 confirmation_pending = {}
 CONFIG_FILE = 'bot_config.json'
+SNAPSHOT_FILE = os.getenv('SNAPSHOT_FILE', 'predictor_state.snap')
+SNAPSHOT_INTERVAL = int(os.getenv('SNAPSHOT_INTERVAL', '60'))
 
-# Gestionnaire de prédictions
+# Gestionnaire de prédictions (table historique /set_stat + /set_display)
 predictor = CardPredictor()
 
-# Client Telegram avec session unique
-session_name = f'replit_bot_{int(time.time())}'
-client = TelegramClient(session_name, API_ID, API_HASH)
+# Routage multi-tables : chaque canal de stats a son propre prédicteur
+router = ChannelRouter()
+
+# Client Telegram avec session stable (clé d'autorisation réutilisée entre redémarrages)
+session_info = create_session('replit_bot')
+client = TelegramClient(session_info.session, API_ID, API_HASH)
+startup = StartupTimer(session_info.mode, profiler.started)
+
+# File d'envoi partagée (limitation par chat, FloodWait, priorités)
+outbox = OutboundQueue(client)
+OUTBOX_DEPTH.set_function(outbox.__len__)
+
+# Identité du bot et entités des canaux (get_me / get_entity mis en cache)
+entity_cache = EntityCache(client)
+
+# Commandes d'administration : un seul gestionnaire, table nom → commande
+commands = CommandDispatcher(ADMIN_ID)
+client.add_event_handler(commands.dispatch, events.NewMessage())
 
 def load_config():
     """Charger la configuration depuis le fichier"""
@@ -49,36 +84,73 @@ def load_config():
                 config = json.load(f)
                 detected_stat_channel = config.get('stat_channel')
                 detected_display_channel = config.get('display_channel')
-                print(f"✅ Configuration chargée: Stats={detected_stat_channel}, Display={detected_display_channel}")
+                router.load_config(config.get('routes'))
+                logger.info("✅ Configuration chargée: Stats=%s, Display=%s, Tables=%s",
+                            detected_stat_channel, detected_display_channel, len(router))
     except Exception as e:
-        print(f"⚠️ Erreur chargement configuration: {e}")
+        logger.warning("⚠️ Erreur chargement configuration: %s", e)
+    sync_default_route()
+
+def sync_default_route():
+    """Aligner la table historique du routeur sur les canaux configurés"""
+    router.set_default(detected_stat_channel, detected_display_channel, predictor)
+    bind_stat_handlers()
+
+def bind_stat_handlers():
+    """Réenregistrer les gestionnaires des canaux de statistiques avec le filtre chats= des routes"""
+    for handler in stat_handlers:
+        handler.bind(router.stat_channels())
+
+def capture_config():
+    """Copie cohérente de la configuration (sur la boucle asyncio)"""
+    return {
+        'stat_channel': detected_stat_channel,
+        'display_channel': detected_display_channel,
+        'routes': router.to_config()
+    }
+
+def write_config(config):
+    """Écrire la configuration de façon atomique (dans un thread)"""
+    atomic_write_json(CONFIG_FILE, config)
+    logger.info("💾 Configuration sauvegardée")
+
+# Écriture différée de la configuration : jamais sur le chemin des messages
+persistence = PersistenceService()
+config_writer = persistence.track('configuration', capture_config, write_config)
 
 def save_config():
-    """Sauvegarder la configuration"""
-    try:
-        config = {
-            'stat_channel': detected_stat_channel,
-            'display_channel': detected_display_channel
-        }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
-        print(f"💾 Configuration sauvegardée")
-    except Exception as e:
-        print(f"❌ Erreur sauvegarde: {e}")
+    """Demander la sauvegarde de la configuration (regroupée, atomique, hors boucle)"""
+    config_writer.mark_dirty()
 
 async def start_bot():
     """Démarrer le bot"""
     try:
-        load_config()
-        await client.start(bot_token=BOT_TOKEN)
-        print("✅ Bot démarré avec succès")
+        with profiler.phase('config'):
+            load_config()
+        with profiler.phase('snapshot'):
+            restore_snapshot()
+        auth_reused = has_auth_key(client)
+        with profiler.phase('connect'):
+            await client.connect()
+        startup.connected(auth_reused)
+        profiler.milestone('connected')
+        with profiler.phase('authorize'):
+            await client.start(bot_token=BOT_TOKEN)
+        logger.info("✅ Bot démarré avec succès")
         
-        me = await client.get_me()
+        me = await entity_cache.get_me()
         username = getattr(me, 'username', 'Unknown')
-        print(f"🤖 Bot connecté: @{username}")
+        logger.info("🤖 Bot connecté: @%s", username)
+
+        # Préchargement des canaux routés (titres pour les invitations et /status)
+        with profiler.phase('entity_cache'):
+            await entity_cache.warm(channel for shard in router for channel in (shard.stat_channel, *shard.display_channels))
+        startup.ready()
+        profiler.milestone('ready')
+        profiler.report()
         return True
     except Exception as e:
-        print(f"❌ Erreur démarrage: {e}")
+        logger.error("❌ Erreur démarrage: %s", e)
         return False
 
 # --- ÉVÉNEMENTS BOT ---
@@ -87,16 +159,17 @@ async def handler_join(event):
     """Gérer l'ajout du bot dans les canaux"""
     global confirmation_pending
     try:
+        # Titre modifié ou bot retiré : l'entité en cache n'est plus à jour
+        if event.new_title or event.user_left or event.user_kicked:
+            entity_cache.invalidate(event.chat_id)
+
         if event.user_joined or event.user_added:
-            me = await client.get_me()
-            if event.user_id == getattr(me, 'id', None):
+            if event.user_id == await entity_cache.me_id():
                 confirmation_pending[event.chat_id] = 'waiting_confirmation'
                 
-                try:
-                    chat = await client.get_entity(event.chat_id)
-                    chat_title = getattr(chat, 'title', f'Canal {event.chat_id}')
-                except:
-                    chat_title = f'Canal {event.chat_id}'
+                # Entité fraîche : le bot vient d'obtenir l'accès au canal
+                entity_cache.invalidate(event.chat_id)
+                chat_title = await entity_cache.title(event.chat_id)
 
                 invitation_msg = f"""🔔 **Nouveau canal détecté**
 
@@ -109,47 +182,43 @@ async def handler_join(event):
 
                 try:
                     await client.send_message(ADMIN_ID, invitation_msg)
-                    print(f"📧 Invitation envoyée pour: {chat_title}")
+                    logger.info("📧 Invitation envoyée pour: %s", chat_title)
                 except Exception as e:
-                    print(f"❌ Erreur invitation: {e}")
+                    logger.error("❌ Erreur invitation: %s", e)
     except Exception as e:
-        print(f"❌ Erreur handler_join: {e}")
+        logger.error("❌ Erreur handler_join: %s", e)
 
-@client.on(events.NewMessage(pattern=r'/set_stat (-?\d+)'))
+@commands.command('set_stat', args=r'(-?\d+)', private=True)
 async def set_stat_channel(event):
     """Configurer le canal de statistiques"""
     global detected_stat_channel
     try:
-        if event.is_group or event.is_channel or event.sender_id != ADMIN_ID:
-            return
-            
         channel_id = int(event.pattern_match.group(1))
         detected_stat_channel = channel_id
+        sync_default_route()
         save_config()
         
         await event.respond(f"✅ **Canal de statistiques configuré**\n🆔 ID: {channel_id}")
-        print(f"📊 Canal stats configuré: {channel_id}")
+        logger.info("📊 Canal stats configuré: %s", channel_id)
     except Exception as e:
-        print(f"❌ Erreur set_stat: {e}")
+        logger.error("❌ Erreur set_stat: %s", e)
 
-@client.on(events.NewMessage(pattern=r'/set_display (-?\d+)'))
+@commands.command('set_display', args=r'(-?\d+)', private=True)
 async def set_display_channel(event):
     """Configurer le canal de diffusion"""
     global detected_display_channel
     try:
-        if event.is_group or event.is_channel or event.sender_id != ADMIN_ID:
-            return
-            
         channel_id = int(event.pattern_match.group(1))
         detected_display_channel = channel_id
+        sync_default_route()
         save_config()
         
         await event.respond(f"✅ **Canal de diffusion configuré**\n🆔 ID: {channel_id}")
-        print(f"📤 Canal display configuré: {channel_id}")
+        logger.info("📤 Canal display configuré: %s", channel_id)
     except Exception as e:
-        print(f"❌ Erreur set_display: {e}")
+        logger.error("❌ Erreur set_display: %s", e)
 
-@client.on(events.NewMessage(pattern='/start'))
+@commands.command('start', admin=False)
 async def start_command(event):
     """Message de bienvenue"""
     welcome_msg = """🎯 **Bot de Prédiction - Replit Edition**
@@ -168,104 +237,247 @@ async def start_command(event):
 **Commandes** :
 • `/start` - Ce message
 • `/status` - État du bot (admin)
+• `/routes` - Tables configurées (admin)
+• `/route_add [stats] [display]` - Ajouter une table (admin)
+• `/route_remove [stats] [display]` - Retirer une route (admin)
 • `/reset` - Réinitialiser (admin)
 
 🚀 **Hébergé sur Replit**"""
     
     await event.respond(welcome_msg)
 
-@client.on(events.NewMessage(pattern='/status'))
+@commands.command('status')
 async def show_status(event):
     """Afficher le statut"""
-    if event.sender_id != ADMIN_ID:
-        return
-        
+    stats = predictor.get_statistics()
+    outbox_stats = outbox.stats()
+    stat_title = await entity_cache.title(detected_stat_channel) if detected_stat_channel else ''
+    display_title = await entity_cache.title(detected_display_channel) if detected_display_channel else ''
     status_msg = f"""📊 **Statut du Bot Replit**
 
 🔧 **Configuration** :
-• Canal stats: {'✅' if detected_stat_channel else '❌'} ({detected_stat_channel})
-• Canal display: {'✅' if detected_display_channel else '❌'} ({detected_display_channel})
+• Canal stats: {'✅' if detected_stat_channel else '❌'} {stat_title} ({detected_stat_channel})
+• Canal display: {'✅' if detected_display_channel else '❌'} {display_title} ({detected_display_channel})
+• Tables routées: {len(router)}
 
 📈 **Prédictions** :
-• Actives: {len(predictor.prediction_status)}
-• Total: {len(predictor.status_log)}
+• Actives: {stats['pending']}
+• Total: {stats['total']} (✅ {stats['wins']} / ❌ {stats['losses']})
+• Dernière heure: {stats['last_hour']['wins']}/{stats['last_hour']['total']} ({stats['last_hour']['win_rate']:.1f}%)
+
+📤 **File d'envoi** :
+• En attente: {outbox_stats['depth']} (max {outbox_stats['max_depth']})
+• Attente moyenne des prédictions: {outbox_stats['wait']['prediction']['avg_ms']:.0f} ms
+• FloodWait: {outbox_stats['flood_waits']}
+
+⏱️ **Démarrage** : prêt en {startup.ready_ms or 0:.0f} ms (session {startup.mode}, autorisation {'réutilisée' if startup.auth_reused else 'nouvelle'})
 
 🌐 **Serveur** : Port {PORT}"""
     
     await event.respond(status_msg)
 
-@client.on(events.NewMessage(pattern='/reset'))
+@commands.command('route_add', args=r'(-?\d+) (-?\d+)', private=True)
+async def route_add(event):
+    """Ajouter un canal de diffusion à une table (créée si besoin)"""
+    try:
+        stat_id = int(event.pattern_match.group(1))
+        display_id = int(event.pattern_match.group(2))
+        shard = router.add_route(stat_id, display_id)
+        bind_stat_handlers()
+        save_config()
+
+        await event.respond(f"✅ **Route ajoutée**\n📊 {stat_id} → 📤 {display_id}\n"
+                            f"Canaux de diffusion de la table: {len(shard.display_channels)}")
+    except Exception as e:
+        logger.error("❌ Erreur route_add: %s", e)
+
+@commands.command('route_remove', args=r'(-?\d+)(?: (-?\d+))?', private=True)
+async def route_remove(event):
+    """Retirer un canal de diffusion, ou toute la table si seul le canal stats est donné"""
+    try:
+        stat_id = int(event.pattern_match.group(1))
+        display = event.pattern_match.group(2)
+        if display is None and stat_id == router.default_stat:
+            await event.respond("⚠️ Table principale : utilisez `/set_stat` ou `/reset`")
+            return
+
+        if router.remove_route(stat_id, int(display) if display else None):
+            bind_stat_handlers()
+            save_config()
+            await event.respond(f"🗑️ **Route retirée**: {stat_id}" + (f" → {display}" if display else ""))
+        else:
+            await event.respond("❌ Route introuvable")
+    except Exception as e:
+        logger.error("❌ Erreur route_remove: %s", e)
+
+@commands.command('routes')
+async def list_routes(event):
+    """Lister les tables et leurs canaux de diffusion"""
+    if not len(router):
+        await event.respond("ℹ️ Aucune table configurée\n\nUtilisez `/route_add [stats] [display]`")
+        return
+
+    lines = [f"🧭 **Tables routées** ({len(router)})", ""]
+    for shard in router:
+        stats = shard.predictor.get_statistics()
+        marker = " (principale)" if shard.stat_channel == router.default_stat else ""
+        displays = ', '.join(str(d) for d in shard.display_channels) or 'aucun'
+        lines.append(f"📊 {shard.stat_channel}{marker} → 📤 {displays}")
+        lines.append(f"   ⌛ {stats['pending']} | ✅ {stats['wins']} / ❌ {stats['losses']}")
+    await event.respond('\n'.join(lines))
+
+@commands.command('reset')
 async def reset_bot(event):
     """Réinitialiser le bot"""
     global detected_stat_channel, detected_display_channel
-    if event.sender_id != ADMIN_ID:
-        return
-        
     detected_stat_channel = None
     detected_display_channel = None
     confirmation_pending.clear()
     predictor.reset()
+    sync_default_route()
     save_config()
     
     await event.respond("🔄 Bot réinitialisé avec succès")
 
-@client.on(events.NewMessage())
 async def handle_messages(event):
-    """Traiter les messages du canal de statistiques"""
+    """Traiter les messages des canaux de statistiques routés (enregistré par bind_stat_handlers)"""
     try:
-        if detected_stat_channel is None or event.chat_id != detected_stat_channel:
+        profiler.first_message()
+        MESSAGES.inc('received')
+        shard = router.route(event.chat_id)
+        if shard is None:
+            MESSAGES.inc('filtered')
             return
             
         message_text = event.message.message if event.message else ""
         if not message_text:
+            MESSAGES.inc('filtered')
+            return
+
+        # Déduplication par (chat_id, message_id) : O(1) et stable entre redémarrages
+        if not shard.predictor.is_new_message(event.chat_id, event.message.id):
+            logger.debug("🔁 Message %s déjà traité", event.message.id)
+            MESSAGES.inc('filtered')
             return
             
-        print(f"📨 Message reçu: {message_text[:50]}...")
+        logger.debug("📨 Message reçu: %.50s...", message_text)
+
+        # Analyse unique du message
+        parsed = parse_stat_message(message_text)
+        MESSAGES.inc('parsed')
+        tracer.mark('parse')
         
         # Vérifier si c'est un déclencheur de prédiction
-        predicted, predicted_game, suit = predictor.should_predict(message_text)
+        table_predictor = shard.predictor
+        table_predictor.remember_message(event.chat_id, event.message.id, parsed.game_number)
+        predicted, predicted_game, suit = table_predictor.should_predict(parsed)
+        tracer.mark('should_predict')
         if predicted:
             prediction_text = f"🎯Nº:{predicted_game} 🔵Dis🔵tri🚥:statut :⌛"
-            await broadcast(prediction_text, predicted_game)
-            print(f"✅ Prédiction générée: #{predicted_game}")
+            await broadcast(prediction_text, predicted_game, shard, PRIORITY_PREDICTION)
+            PREDICTIONS_CREATED.inc('manual')
+            logger.info("✅ Prédiction générée: #%s (table %s)", predicted_game, shard.stat_channel)
             
         # Vérifier les résultats
-        verified, number = predictor.verify_prediction(message_text)
+        verified, number = table_predictor.verify_prediction(parsed)
+        tracer.mark('verify_prediction')
         if verified is not None and number is not None:
-            statut = predictor.prediction_status.get(number, '❌')
-            await edit_or_send_prediction(number, statut)
-            print(f"✅ Résultat vérifié: #{number} = {statut}")
+            statut = table_predictor.prediction_status.get(number, '❌')
+            PREDICTIONS_VERIFIED.inc(statut)
+            await edit_or_send_prediction(number, statut, shard)
+            logger.info("✅ Résultat vérifié: #%s = %s (table %s)", number, statut, shard.stat_channel)
             
     except Exception as e:
-        print(f"❌ Erreur handle_messages: {e}")
+        logger.error("❌ Erreur handle_messages: %s", e)
 
-async def broadcast(message, game_number=None):
-    """Diffuser un message"""
-    if detected_display_channel:
-        try:
-            sent_message = await client.send_message(detected_display_channel, message)
-            if game_number:
-                predictor.store_prediction_message(game_number, sent_message.id, detected_display_channel)
-            print(f"📤 Message diffusé: {message[:30]}...")
-        except Exception as e:
-            print(f"❌ Erreur broadcast: {e}")
-
-async def edit_or_send_prediction(game_number, status):
-    """Modifier ou envoyer le message de prédiction"""
+async def handle_edited_messages(event):
+    """Revérifier uniquement le jeu d'un message de statistiques modifié (⏰ → résultat final)"""
     try:
-        message_info = predictor.get_prediction_message(game_number)
-        if message_info:
-            new_text = f"🎯Nº:{game_number} 🔵Dis🔵tri🚥:statut :{status}"
-            await client.edit_message(
-                message_info['chat_id'], 
-                message_info['message_id'], 
-                new_text
-            )
-        else:
-            status_text = f"🎯Nº:{game_number} 🔵Dis🔵tri🚥:statut :{status}"
-            await broadcast(status_text)
+        shard = router.route(event.chat_id)
+        if shard is None or not event.message:
+            return
+
+        table_predictor = shard.predictor
+        game_number = table_predictor.game_for_message(event.chat_id, event.message.id)
+        if game_number is None or not table_predictor.awaits_result(game_number):
+            return
+
+        verified, number = table_predictor.verify_edited(event.message.message or "")
+        tracer.mark('verify_prediction')
+        if verified is not None and number is not None:
+            statut = table_predictor.prediction_status.get(number, '❌')
+            PREDICTIONS_VERIFIED.inc(statut)
+            await edit_or_send_prediction(number, statut, shard)
+            logger.info("✏️ Résultat vérifié après modification: #%s = %s (table %s)",
+                        number, statut, shard.stat_channel)
+
+    except Exception as e:
+        logger.error("❌ Erreur handle_edited_messages: %s", e)
+
+# Gestionnaires des canaux de statistiques, filtrés par chat dans Telethon (réenregistrés quand les routes changent)
+stat_handlers = (
+    FilteredHandler(client, timed(HANDLER_SECONDS, 'messages')(tracer.traced(handle_messages)), events.NewMessage),
+    FilteredHandler(client, timed(HANDLER_SECONDS, 'edited')(tracer.traced(handle_edited_messages)),
+                    events.MessageEdited),
+)
+
+def prediction_key(table_predictor, game_number):
+    """Clé des envois d'une prédiction dans la file (les modifications s'y enchaînent tant qu'ils sont en file)"""
+    return (id(table_predictor), game_number)
+
+async def broadcast(message, game_number=None, shard=None, priority=PRIORITY_RESULT):
+    """Mettre un message en file pour les canaux d'affichage de la table (envois parallèles)"""
+    shard = shard or router.route(detected_stat_channel)
+    if shard is None:
+        return
+    table_predictor = shard.predictor
+    key = prediction_key(table_predictor, game_number) if game_number else None
+    for channel_id in shard.display_channels:
+        on_sent = None
+        if game_number:
+            # L'identifiant est mémorisé une fois le message réellement envoyé
+            on_sent = (lambda sent, chat_id=channel_id:
+                       table_predictor.store_prediction_message(game_number, sent.id, chat_id))
+        outbox.send(channel_id, message, priority, on_sent, key)
+        logger.debug("📤 Message mis en file pour %s: %.30s...", channel_id, message)
+
+async def edit_or_send_prediction(game_number, status, shard):
+    """Modifier ou envoyer le message de prédiction (via la file d'envoi)"""
+    new_text = f"🎯Nº:{game_number} 🔵Dis🔵tri🚥:statut :{status}"
+    table_predictor = shard.predictor
+    messages = table_predictor.get_prediction_messages(game_number)
+    for message_info in messages:
+        outbox.edit(message_info['chat_id'], message_info['message_id'], new_text)
+    # Envois encore en file (seau à jetons, FloodWait) : la modification s'y enchaîne
+    known_chats = {message_info['chat_id'] for message_info in messages}
+    sends = outbox.pending_sends(prediction_key(table_predictor, game_number))
+    pending = {chat_id: sent for chat_id, sent in sends.items() if chat_id not in known_chats}
+    for chat_id, sent in pending.items():
+        outbox.edit_after(sent, chat_id, new_text)
+    if not (messages or pending):
+        await broadcast(new_text, shard=shard)
+
+# --- INSTANTANÉS DE L'ÉTAT ---
+def restore_snapshot():
+    """Restaurer l'état des tables depuis le dernier instantané"""
+    started = time.perf_counter()
+    restored = router.restore_states(read_snapshot(SNAPSHOT_FILE))
+    if restored:
+        logger.info("♻️ %s table(s) restaurée(s) en %.1f ms", restored, (time.perf_counter() - started) * 1000)
+
+async def save_state():
+    """Écrire l'instantané hors de la boucle asyncio"""
+    try:
+        size = await save_snapshot(SNAPSHOT_FILE, router.export_states())
+        logger.debug("💾 Instantané écrit: %s octets", size)
     except Exception as e:
-        print(f"❌ Erreur edit_prediction: {e}")
+        logger.error("❌ Erreur instantané: %s", e)
+
+async def snapshot_loop():
+    """Instantanés périodiques"""
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        await save_state()
 
 # --- SERVEUR WEB POUR REPLIT ---
 async def health_check(request):
@@ -279,49 +491,89 @@ async def bot_info(request):
         "platform": "Replit",
         "stat_channel": detected_stat_channel,
         "display_channel": detected_display_channel,
-        "predictions_active": len(predictor.prediction_status),
-        "total_predictions": len(predictor.status_log)
+        "predictions_active": predictor.pending_count(),
+        "total_predictions": predictor.status_total,
+        "statistics": predictor.get_statistics(),
+        "outbox": outbox.stats(),
+        "startup": {**startup.snapshot(), **profiler.snapshot()},
+        "routes": {
+            str(shard.stat_channel): {
+                "display_channels": shard.display_channels,
+                "predictions_active": shard.predictor.pending_count(),
+            }
+            for shard in router
+        }
     }
     return web.json_response(info)
 
+async def metrics_endpoint(request):
+    """Métriques au format texte Prometheus"""
+    return web.Response(text=REGISTRY.render(), content_type='text/plain')
+
+async def debug_traces(request):
+    """Dernières traces des messages de statistiques (?limit=N, ?slow=1 pour les lentes)"""
+    try:
+        limit = int(request.query.get('limit', '50'))
+    except ValueError:
+        limit = 50
+    slow_only = request.query.get('slow') in ('1', 'true', 'yes')
+    return web.json_response({"stats": tracer.stats(), "traces": tracer.recent(limit, slow_only)})
+
 async def create_web_server():
     """Créer le serveur web"""
     app = web.Application()
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
     app.router.add_get('/info', bot_info)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/debug/traces', debug_traces)
     
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', PORT)
     await site.start()
-    print(f"🌐 Serveur web démarré sur 0.0.0.0:{PORT}")
+    logger.info("🌐 Serveur web démarré sur 0.0.0.0:%s", PORT)
     return runner
 
 # --- FONCTION PRINCIPALE ---
 async def main():
     """Fonction principale"""
-    print("🚀 Démarrage du bot sur Replit...")
+    logger.info("🚀 Démarrage du bot sur Replit...")
     
+    snapshot_task = None
+    loop_monitor = asyncio.create_task(monitor_event_loop())
     try:
         # Démarrer le serveur web
         await create_web_server()
-        print(f"✅ Serveur web actif sur port {PORT}")
+        logger.info("✅ Serveur web actif sur port %s", PORT)
         
         # Démarrer le bot
         if await start_bot():
-            print("✅ Bot Telegram en ligne")
-            print(f"🔗 URL publique: https://{os.getenv('REPL_SLUG', 'your-repl')}.{os.getenv('REPL_OWNER', 'username')}.repl.co")
+            logger.info("✅ Bot Telegram en ligne")
+            snapshot_task = asyncio.create_task(snapshot_loop())
+            logger.info("🔗 URL publique: https://%s.%s.repl.co", os.getenv('REPL_SLUG', 'your-repl'), os.getenv('REPL_OWNER', 'username'))
             await client.run_until_disconnected()
         else:
-            print("❌ Échec du démarrage")
+            logger.error("❌ Échec du démarrage")
             
     except Exception as e:
-        print(f"❌ Erreur critique: {e}")
+        logger.error("❌ Erreur critique: %s", e)
     finally:
+        if snapshot_task:
+            snapshot_task.cancel()
+            try:
+                # Un instantané périodique en cours d'écriture doit finir avant le dernier
+                await snapshot_task
+            except asyncio.CancelledError:
+                pass
+        loop_monitor.cancel()
+        # File vidée d'abord : les envois terminés maintenant enregistrent leurs identifiants
+        await outbox.close()
+        await save_state()
+        await persistence.flush()
         try:
             await client.disconnect()
-            print("🔌 Bot déconnecté")
+            logger.info("🔌 Bot déconnecté")
         except:
             pass
 
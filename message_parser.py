@@ -0,0 +1,70 @@
+"""
+Analyse unique des messages du canal de statistiques.
+
+Chaque message est transformé une seule fois en ``ParsedStatMessage`` (immuable),
+puis ce même enregistrement est partagé par ``CardPredictor.should_predict``,
+``CardPredictor.verify_prediction`` et ``PredictionScheduler``.
+"""
+import re
+from typing import NamedTuple, Optional, Tuple, FrozenSet, Union
+
+from card_codec import decode_group
+
+# Expressions compilées une seule fois au chargement du module
+GAME_NUMBER_RE = re.compile(r"#N\s*(\d+)\.?", re.IGNORECASE)
+ALT_GAME_NUMBER_RE = re.compile(r"jeu\s*#?\s*(\d+)", re.IGNORECASE)
+GROUPS_RE = re.compile(r"\(([^)]*)\)")
+
+VERIFICATION_TAGS = ("✅", "🔰", "❌", "⭕", "⏰")
+CLOCK_TAG = "⏰"
+
+
+class ParsedStatMessage(NamedTuple):
+    """Message du canal de statistiques déjà découpé"""
+    text: str
+    game_number: Optional[int]
+    groups: Tuple[str, ...]
+    card_counts: Tuple[int, ...]
+    suits: Tuple[str, ...]
+    suit_masks: Tuple[int, ...]
+    tags: FrozenSet[str]
+
+    @property
+    def has_clock(self) -> bool:
+        """⏰ : partie en cours (plus de 2 cartes)"""
+        return CLOCK_TAG in self.tags
+
+    @property
+    def is_verification(self) -> bool:
+        """Le message porte au moins un tag de vérification"""
+        return bool(self.tags)
+
+
+def extract_game_number(text: str) -> Optional[int]:
+    """Extrait le numéro de jeu (#N123, #N 123, #N60. ou « jeu 123 »)"""
+    match = GAME_NUMBER_RE.search(text) or ALT_GAME_NUMBER_RE.search(text)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def parse_stat_message(text: str) -> ParsedStatMessage:
+    """Découpe un message du canal de statistiques en une seule passe"""
+    groups = tuple(GROUPS_RE.findall(text))
+    decoded = [decode_group(g) for g in groups]
+    return ParsedStatMessage(
+        text=text,
+        game_number=extract_game_number(text),
+        groups=groups,
+        card_counts=tuple(d.count for d in decoded),
+        suits=tuple(d.suits for d in decoded),
+        suit_masks=tuple(d.mask for d in decoded),
+        tags=frozenset(tag for tag in VERIFICATION_TAGS if tag in text),
+    )
+
+
+def ensure_parsed(message: Union[str, ParsedStatMessage]) -> ParsedStatMessage:
+    """Accepte un texte brut ou un message déjà analysé"""
+    if isinstance(message, ParsedStatMessage):
+        return message
+    return parse_stat_message(message)
@@ -0,0 +1,233 @@
+"""
+Métriques du bot au format texte Prometheus (``/metrics``).
+
+Collecteurs en mémoire, sans verrou ni dépendance : une mesure est une addition
+dans un dictionnaire (et une recherche dichotomique pour les histogrammes),
+faite sur la boucle asyncio. Les quelques mesures prises dans des threads
+(requêtes en base via ``asyncio.to_thread``) reposent sur le GIL : sous forte
+contention un incrément peut se perdre, jamais bloquer le bot.
+
+Les métriques du bot sont définies ici (``MESSAGES``, ``HANDLER_SECONDS``...)
+et importées là où elles sont mesurées ; ``REGISTRY.render()`` produit la page.
+"""
+import asyncio
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Bornes par défaut des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric:
+    """Base commune : nom, aide, noms d'étiquettes"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Compteur croissant, par combinaison d'étiquettes"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in list(self._values.items())]
+
+
+class Gauge(Metric):
+    """Valeur instantanée : fixée par ``set`` ou lue à chaque export par ``set_function``"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """La valeur (sans étiquette) est calculée à l'export, rien n'est mesuré entre-temps"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        values = dict(self._values)
+        if self._function is not None:
+            try:
+                values[()] = self._function()
+            except Exception:
+                pass
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in values.items()]
+
+
+class Histogram(Metric):
+    """Répartition de durées (ou de tailles) dans des intervalles fixes"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, List] = {}  # étiquettes -> [comptes par intervalle..., somme]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        # Compte non cumulé ici ; le cumul est fait à l'export
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, series in list(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Ensemble des métriques exportées"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Page au format d'exposition texte Prometheus 0.0.4"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# --- Métriques du bot ---
+MESSAGES = REGISTRY.counter(
+    'bot_messages_total', 'Messages des canaux de statistiques par étape (received, filtered, parsed)', ('stage',))
+PREDICTIONS_CREATED = REGISTRY.counter(
+    'bot_predictions_created_total', 'Prédictions créées (manual, auto)', ('kind',))
+PREDICTIONS_VERIFIED = REGISTRY.counter(
+    'bot_predictions_verified_total', 'Prédictions vérifiées par statut', ('status',))
+HANDLER_SECONDS = REGISTRY.histogram(
+    'bot_handler_seconds', 'Durée des gestionnaires de messages', ('handler',))
+TELEGRAM_SECONDS = REGISTRY.histogram(
+    'bot_telegram_request_seconds', 'Latence des appels Telegram de la file d\'envoi', ('method',))
+FLOOD_WAIT_SECONDS = REGISTRY.counter(
+    'bot_telegram_flood_wait_seconds_total', 'Secondes de pause imposées par FloodWait')
+OUTBOX_DEPTH = REGISTRY.gauge(
+    'bot_outbox_depth', 'Opérations en attente dans la file d\'envoi')
+SCHEDULER_LAG = REGISTRY.histogram(
+    'bot_scheduler_lag_seconds', 'Retard des lancements planifiés sur leur heure prévue',
+    buckets=(1, 5, 10, 15, 30, 45, 60, 120, 300))
+DB_QUERY_SECONDS = REGISTRY.histogram(
+    'bot_db_query_seconds', 'Durée des requêtes en base', ('query',))
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    'bot_event_loop_lag_seconds', 'Retard de réveil de la boucle asyncio')
+
+
+def timed(histogram: Histogram, *labels):
+    """Décorateur : durée de chaque appel (fonction ou coroutine) dans ``histogram``"""
+    def decorate(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started, *labels)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started, *labels)
+        return wrapper
+    return decorate
+
+
+async def monitor_event_loop(interval: float = 1.0):
+    """Tâche de fond : mesure le retard de réveil d'un ``sleep(interval)`` (boucle bloquée)"""
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - interval))
@@ -7,6 +7,7 @@ from psycopg2.extras import RealDictCursor
 import json
 from datetime import datetime
 from typing import Dict, Any, Optional, List
+from metrics import DB_QUERY_SECONDS, timed
 
 class DatabaseManager:
     """Gestionnaire de base de données PostgreSQL pour le bot"""
@@ -23,6 +24,7 @@ class DatabaseManager:
         """Retourne une connexion à la base de données"""
         return psycopg2.connect(self.database_url)
     
+    @timed(DB_QUERY_SECONDS, 'init_tables')
     def init_tables(self):
         """Initialise les tables de la base de données"""
         with self.get_connection() as conn:
@@ -82,8 +84,19 @@ class DatabaseManager:
                     )
                 """)
                 
+                # Table des marques de déduplication (dernier message_id vu par canal)
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS channel_watermarks (
+                        chat_id BIGINT PRIMARY KEY,
+                        high_water BIGINT NOT NULL,
+                        window_bits BIGINT NOT NULL DEFAULT 0,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                
                 conn.commit()
     
+    @timed(DB_QUERY_SECONDS, 'set_config')
     def set_config(self, key: str, value: Any):
         """Sauvegarde une valeur de configuration"""
         with self.get_connection() as conn:
@@ -96,6 +109,7 @@ class DatabaseManager:
                 """, (key, json.dumps(value) if isinstance(value, (dict, list)) else str(value)))
                 conn.commit()
     
+    @timed(DB_QUERY_SECONDS, 'get_config')
     def get_config(self, key: str, default=None):
         """Récupère une valeur de configuration"""
         with self.get_connection() as conn:
@@ -109,6 +123,7 @@ class DatabaseManager:
                         return result['value']
                 return default
     
+    @timed(DB_QUERY_SECONDS, 'save_prediction')
     def save_prediction(self, game_number: int, suit_combination: str, 
                        message_id: Optional[int] = None, chat_id: Optional[int] = None, 
                        prediction_type: str = 'manual'):
@@ -123,6 +138,7 @@ class DatabaseManager:
                 """, (game_number, suit_combination, message_id, chat_id, prediction_type))
                 conn.commit()
     
+    @timed(DB_QUERY_SECONDS, 'update_prediction_status')
     def update_prediction_status(self, game_number: int, status: str):
         """Met à jour le statut d'une prédiction"""
         with self.get_connection() as conn:
@@ -134,6 +150,7 @@ class DatabaseManager:
                 """, (status, game_number))
                 conn.commit()
     
+    @timed(DB_QUERY_SECONDS, 'get_pending_predictions')
     def get_pending_predictions(self) -> List[Dict]:
         """Récupère les prédictions en attente"""
         with self.get_connection() as conn:
@@ -145,6 +162,7 @@ class DatabaseManager:
                 """)
                 return [dict(row) for row in cur.fetchall()]
     
+    @timed(DB_QUERY_SECONDS, 'save_auto_prediction_schedule')
     def save_auto_prediction_schedule(self, schedule_data: Dict[str, Any]):
         """Sauvegarde la planification automatique complète"""
         with self.get_connection() as conn:
@@ -168,6 +186,7 @@ class DatabaseManager:
                     ))
                 conn.commit()
     
+    @timed(DB_QUERY_SECONDS, 'load_auto_prediction_schedule')
     def load_auto_prediction_schedule(self) -> Dict[str, Any]:
         """Charge la planification automatique du jour"""
         with self.get_connection() as conn:
@@ -193,6 +212,7 @@ class DatabaseManager:
                     }
                 return schedule
     
+    @timed(DB_QUERY_SECONDS, 'update_auto_prediction')
     def update_auto_prediction(self, numero: str, updates: Dict[str, Any]):
         """Met à jour une prédiction automatique"""
         with self.get_connection() as conn:
@@ -207,30 +227,34 @@ class DatabaseManager:
                 """, values)
                 conn.commit()
     
-    def is_message_processed(self, message_content: str, channel_id: int) -> bool:
-        """Vérifie si un message a déjà été traité"""
-        import hashlib
-        message_hash = hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
-        
+    @timed(DB_QUERY_SECONDS, 'save_watermarks')
+    def save_watermarks(self, rows: List[tuple]):
+        """Sauvegarde les marques de déduplication (chat_id, high_water, window_bits)"""
+        if not rows:
+            return
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT 1 FROM message_log WHERE message_hash = %s", (message_hash,))
-                return cur.fetchone() is not None
+                cur.executemany("""
+                    INSERT INTO channel_watermarks (chat_id, high_water, window_bits, updated_at)
+                    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (chat_id)
+                    DO UPDATE SET high_water = GREATEST(channel_watermarks.high_water, EXCLUDED.high_water),
+                                  window_bits = CASE WHEN EXCLUDED.high_water >= channel_watermarks.high_water
+                                                     THEN EXCLUDED.window_bits
+                                                     ELSE channel_watermarks.window_bits END,
+                                  updated_at = CURRENT_TIMESTAMP
+                """, rows)
+                conn.commit()
     
-    def mark_message_processed(self, message_content: str, channel_id: int):
-        """Marque un message comme traité"""
-        import hashlib
-        message_hash = hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
-        
+    @timed(DB_QUERY_SECONDS, 'load_watermarks')
+    def load_watermarks(self) -> List[tuple]:
+        """Récupère les marques de déduplication (chat_id, high_water, window_bits)"""
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO message_log (message_hash, channel_id, content)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (message_hash) DO NOTHING
-                """, (message_hash, channel_id, message_content))
-                conn.commit()
+                cur.execute("SELECT chat_id, high_water, window_bits FROM channel_watermarks")
+                return [tuple(row) for row in cur.fetchall()]
     
+    @timed(DB_QUERY_SECONDS, 'get_stats')
     def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques du bot"""
         with self.get_connection() as conn:
@@ -0,0 +1,418 @@
+"""
+File d'envoi asynchrone vers Telegram (send_message / edit_message).
+
+Les gestionnaires de messages ne font plus d'appel réseau : ils déposent les
+envois et modifications dans une file à priorités, vidée par une tâche de fond.
+Les opérations de chats différents partent en parallèle (au plus ``concurrency``
+à la fois), celles d'un même chat une par une et dans l'ordre : diffuser vers N
+canaux d'affichage prend le temps d'un seul envoi.
+
+- chaque chat a son seau à jetons (débit et rafale configurables), plus un seau
+  global pour tout le compte ; un chat limité ne bloque pas les autres ;
+- un ``FloodWaitError`` met le chat en pause le temps demandé par Telegram, puis
+  l'opération est rejouée à sa place dans la file ;
+- les prédictions passent avant les résultats, qui passent avant les bilans ;
+- les modifications d'un même message (chat_id, message_id) encore en file sont
+  fusionnées : seul le texte le plus récent part, après un court délai
+  (``edit_delay``), et un texte identique au dernier envoyé n'est pas renvoyé ;
+- un envoi marqué d'une clé (``send(..., key=...)``) reste consultable tant
+  qu'il est en file (``pending_sends``) : ``edit_after`` y enchaîne une
+  modification, mise en file dès que l'identifiant du message est connu ;
+- la profondeur de la file et le temps d'attente sont mesurés (``stats``).
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+
+from bot_logging import get_logger
+from metrics import FLOOD_WAIT_SECONDS, TELEGRAM_SECONDS
+from tracing import track
+
+logger = get_logger(__name__)
+
+# Priorités (plus petit = plus urgent)
+PRIORITY_PREDICTION = 0
+PRIORITY_RESULT = 1
+PRIORITY_REPORT = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_PREDICTION: 'prediction',
+    PRIORITY_RESULT: 'result',
+    PRIORITY_REPORT: 'report',
+}
+
+
+class TokenBucket:
+    """Seau à jetons : ``rate`` opérations par seconde, rafale de ``burst``"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0  # FloodWait en cours
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 si tout de suite)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def pause(self, seconds: float, now: float):
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0
+
+
+class _Job:
+    __slots__ = ('chat_id', 'message_id', 'text', 'priority', 'future', 'on_sent', 'queued_at', 'attempts',
+                 'not_before')
+
+    def __init__(self, chat_id, message_id, text, priority, future, on_sent):
+        self.chat_id = chat_id
+        self.message_id = message_id  # None pour un envoi, identifiant à modifier sinon
+        self.text = text
+        self.priority = priority
+        self.future = future
+        self.on_sent = on_sent
+        self.queued_at = time.monotonic()
+        self.attempts = 0
+        self.not_before = 0.0  # Délai de fusion des modifications
+
+
+class OutboundQueue:
+    """File d'envoi à priorités avec limitation par chat et gestion des FloodWait"""
+
+    TEXT_CACHE_SIZE = 1024  # Derniers textes connus par (chat_id, message_id)
+
+    def __init__(self, client, chat_rate: Optional[float] = None, chat_burst: Optional[float] = None,
+                 global_rate: Optional[float] = None, max_attempts: int = 3,
+                 edit_delay: Optional[float] = None, concurrency: Optional[int] = None):
+        """
+        Args:
+            client: Client Telegram (send_message / edit_message)
+            chat_rate: Opérations par seconde et par chat (OUTBOX_CHAT_RATE, 0.5 par défaut)
+            chat_burst: Rafale autorisée par chat (OUTBOX_CHAT_BURST, 5 par défaut)
+            global_rate: Opérations par seconde pour tout le compte (OUTBOX_GLOBAL_RATE, 25 par défaut)
+            max_attempts: Tentatives par opération hors FloodWait
+            edit_delay: Secondes pendant lesquelles une modification attend d'éventuelles
+                suivantes du même message (OUTBOX_EDIT_DELAY, 0.3 par défaut)
+            concurrency: Opérations simultanées au plus, une par chat (OUTBOX_CONCURRENCY, 8 par défaut)
+        """
+        self.client = client
+        self.chat_rate = chat_rate or float(os.getenv('OUTBOX_CHAT_RATE', '0.5'))
+        self.chat_burst = chat_burst or float(os.getenv('OUTBOX_CHAT_BURST', '5'))
+        global_rate = global_rate or float(os.getenv('OUTBOX_GLOBAL_RATE', '25'))
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.max_attempts = max_attempts
+        self.edit_delay = float(os.getenv('OUTBOX_EDIT_DELAY', '0.3')) if edit_delay is None else edit_delay
+        self._pending_edits: Dict[Tuple[int, int], _Job] = {}
+        self._pending_sends: Dict[Hashable, Dict[int, asyncio.Future]] = {}  # clé -> chat -> envoi en file
+        self._last_text: "OrderedDict[Tuple[int, int], str]" = OrderedDict()
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._heap: List = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        self.concurrency = concurrency or int(os.getenv('OUTBOX_CONCURRENCY', '8'))
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight: Dict[int, asyncio.Task] = {}  # chat -> opération en cours
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.sent = 0
+        self.edited = 0
+        self.failed = 0
+        self.flood_waits = 0
+        self.coalesced = 0
+        self.unchanged = 0
+        self.max_depth = 0
+        self._waits = {priority: [0, 0.0, 0.0] for priority in PRIORITY_NAMES}  # nombre, total, max
+
+    # --- Dépôt des opérations ---
+    def send(self, chat_id: int, text: str, priority: int = PRIORITY_RESULT,
+             on_sent: Optional[Callable[[Any], None]] = None, key: Optional[Hashable] = None) -> asyncio.Future:
+        """Met un envoi en file ; le futur reçoit le message envoyé (None en cas d'échec)
+
+        Avec ``key``, l'envoi reste accessible par ``pending_sends(key)`` jusqu'à sa fin.
+        """
+        future = self._submit(chat_id, None, text, priority, on_sent)
+        if key is not None:
+            self._pending_sends.setdefault(key, {})[chat_id] = future
+            future.add_done_callback(lambda _: self._forget_send(key, chat_id, future))
+        return track(future, f'send {chat_id}')
+
+    def _forget_send(self, key: Hashable, chat_id: int, future: asyncio.Future):
+        sends = self._pending_sends.get(key)
+        if sends and sends.get(chat_id) is future:
+            del sends[chat_id]
+            if not sends:
+                del self._pending_sends[key]
+
+    def pending_sends(self, key: Hashable) -> Dict[int, asyncio.Future]:
+        """Envois marqués ``key`` encore en file, par chat"""
+        return dict(self._pending_sends.get(key, ()))
+
+    def edit_after(self, sent: asyncio.Future, chat_id: int, text: str,
+                   priority: int = PRIORITY_RESULT) -> asyncio.Future:
+        """Modification d'un message dont l'envoi est encore en file
+
+        La modification est mise en file dès que l'envoi aboutit ; le futur reçoit le
+        message modifié (None si l'envoi ou la modification échoue).
+        """
+        result = asyncio.get_running_loop().create_future()
+
+        def resolve(future: asyncio.Future):
+            if not result.done():
+                result.set_result(None if future.cancelled() else future.result())
+
+        def chain(future: asyncio.Future):
+            message = None if future.cancelled() else future.result()
+            if message is None:
+                resolve(future)
+                return
+            self.edit(chat_id, message.id, text, priority).add_done_callback(resolve)
+
+        sent.add_done_callback(chain)
+        return result
+
+    def edit(self, chat_id: int, message_id: int, text: str, priority: int = PRIORITY_RESULT) -> asyncio.Future:
+        """Met une modification en file, fusionnée avec celle du même message encore en attente
+
+        Le futur reçoit le message modifié (None en cas d'échec ou de texte inchangé).
+        """
+        key = (chat_id, message_id)
+        pending = self._pending_edits.get(key)
+        if pending is not None:
+            # Seul le texte le plus récent sera envoyé, à la place de l'ancien
+            pending.text = text
+            self.coalesced += 1
+            return track(pending.future, f'edit {chat_id}')
+        if self._last_text.get(key) == text:
+            self.unchanged += 1
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(None)
+            return track(future, f'edit {chat_id} (inchangé)')
+        return track(self._submit(chat_id, message_id, text, priority, None), f'edit {chat_id}')
+
+    def _submit(self, chat_id, message_id, text, priority, on_sent) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        job = _Job(chat_id, message_id, text, priority, loop.create_future(), on_sent)
+        if message_id is not None:
+            job.not_before = job.queued_at + self.edit_delay
+            self._pending_edits[(chat_id, message_id)] = job
+        self._push(job, next(self._sequence))
+        self.max_depth = max(self.max_depth, len(self._heap))
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        return job.future
+
+    def _push(self, job: _Job, sequence: int):
+        heapq.heappush(self._heap, (job.priority, sequence, job))
+        self._wakeup.set()
+
+    def _remember_text(self, chat_id: int, message_id: int, text: str):
+        key = (chat_id, message_id)
+        self._last_text[key] = text
+        self._last_text.move_to_end(key)
+        if len(self._last_text) > self.TEXT_CACHE_SIZE:
+            self._last_text.popitem(last=False)
+
+    def _bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    # --- Tâche de fond ---
+    def _next_ready(self, now: float):
+        """Opération la plus prioritaire dont le chat a un jeton, ou le délai avant la prochaine"""
+        deferred = []
+        ready = None
+        wait = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            job = entry[2]
+            if job.chat_id in self._in_flight:
+                # Une opération à la fois par chat : l'ordre envoi → modification est préservé
+                deferred.append(entry)
+                continue
+            delay = max(self._bucket(job.chat_id).delay(now), job.not_before - now)
+            if delay <= 0:
+                ready = entry
+                break
+            deferred.append(entry)
+            wait = delay if wait is None else min(wait, delay)
+        for entry in deferred:
+            heapq.heappush(self._heap, entry)
+        return ready, wait
+
+    async def _run(self):
+        while True:
+            if not self._heap or len(self._in_flight) >= self.concurrency:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            global_delay = self.global_bucket.delay(now)
+            entry, wait = (None, global_delay) if global_delay else self._next_ready(now)
+            if entry is None:
+                # Rien n'est prêt : attendre un jeton, une fin d'opération ou une nouvelle opération
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, sequence, job = entry
+            if job.message_id is not None and not self._claim_edit(job):
+                continue
+            self.global_bucket.take(now)
+            self._bucket(job.chat_id).take(now)
+            self._in_flight[job.chat_id] = asyncio.create_task(self._dispatch(job, sequence))
+
+    async def _dispatch(self, job: _Job, sequence: int):
+        try:
+            await self._execute(job, sequence)
+        finally:
+            self._in_flight.pop(job.chat_id, None)
+            self._wakeup.set()
+
+    def _claim_edit(self, job: _Job) -> bool:
+        """Retire la modification des fusions possibles ; faux si son texte est déjà en place"""
+        key = (job.chat_id, job.message_id)
+        if self._pending_edits.get(key) is job:
+            del self._pending_edits[key]
+        if self._last_text.get(key) == job.text:
+            self.unchanged += 1
+            if not job.future.done():
+                job.future.set_result(None)
+            return False
+        return True
+
+    def _requeue(self, job: _Job, sequence: int):
+        """Remet une opération en file, sauf modification remplacée entre-temps par une plus récente"""
+        if job.message_id is not None:
+            key = (job.chat_id, job.message_id)
+            if key in self._pending_edits:
+                if not job.future.done():
+                    job.future.set_result(None)
+                return
+            self._pending_edits[key] = job
+        self._push(job, sequence)
+
+    async def _execute(self, job: _Job, sequence: int):
+        if job.queued_at is not None:
+            # Temps d'attente mesuré au premier essai seulement
+            waited = time.monotonic() - job.queued_at
+            job.queued_at = None
+            stats = self._waits[job.priority]
+            stats[0] += 1
+            stats[1] += waited
+            stats[2] = max(stats[2], waited)
+        job.attempts += 1
+        method = 'send' if job.message_id is None else 'edit'
+        started = time.perf_counter()
+        try:
+            if job.message_id is None:
+                message = await self.client.send_message(job.chat_id, job.text)
+                self.sent += 1
+                self._remember_text(job.chat_id, message.id, job.text)
+            else:
+                message = await self.client.edit_message(job.chat_id, job.message_id, job.text)
+                self.edited += 1
+                self._remember_text(job.chat_id, job.message_id, job.text)
+        except MessageNotModifiedError:
+            # Texte déjà en place côté Telegram : rien à renvoyer
+            self.unchanged += 1
+            self._remember_text(job.chat_id, job.message_id, job.text)
+            message = None
+        except FloodWaitError as e:
+            # Telegram impose une pause : le chat attend, l'opération garde sa place
+            self.flood_waits += 1
+            FLOOD_WAIT_SECONDS.inc(amount=e.seconds)
+            self._bucket(job.chat_id).pause(e.seconds, time.monotonic())
+            logger.warning("⏳ FloodWait de %ss sur %s, opération remise en file", e.seconds, job.chat_id)
+            job.attempts -= 1
+            self._requeue(job, sequence)
+            return
+        except Exception as e:
+            if job.attempts < self.max_attempts:
+                logger.warning("⚠️ Envoi vers %s échoué (%s/%s): %s", job.chat_id, job.attempts, self.max_attempts, e)
+                self._requeue(job, sequence)
+                return
+            self.failed += 1
+            logger.error("❌ Envoi vers %s abandonné: %s", job.chat_id, e)
+            message = None
+        finally:
+            TELEGRAM_SECONDS.observe(time.perf_counter() - started, method)
+        if job.on_sent and message is not None and job.message_id is None:
+            # Hors du try de l'envoi : une erreur ici ne doit pas faire renvoyer un message livré
+            try:
+                job.on_sent(message)
+            except Exception as e:
+                logger.error("❌ Traitement de l'envoi vers %s échoué: %s", job.chat_id, e)
+        if not job.future.done():
+            job.future.set_result(message)
+
+    async def close(self, timeout: float = 5.0):
+        """Vide la file (au plus ``timeout`` secondes) puis arrête la tâche de fond"""
+        deadline = time.monotonic() + timeout
+        while (self._heap or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._worker:
+            self._worker.cancel()
+            self._worker = None
+        for task in list(self._in_flight.values()):
+            task.cancel()
+        self._in_flight.clear()
+        if self._heap:
+            logger.warning("⚠️ %s envoi(s) abandonné(s) à l'arrêt", len(self._heap))
+            for _, _, job in self._heap:
+                if not job.future.done():
+                    job.future.set_result(None)
+            self._heap.clear()
+            self._pending_edits.clear()
+
+    # --- Mesures ---
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def stats(self) -> Dict:
+        """Profondeur, compteurs et temps d'attente par priorité (pour /status)"""
+        waits = {}
+        for priority, (count, total, longest) in self._waits.items():
+            waits[PRIORITY_NAMES[priority]] = {
+                'count': count,
+                'avg_ms': total / count * 1000 if count else 0.0,
+                'max_ms': longest * 1000,
+            }
+        return {
+            'depth': len(self._heap),
+            'in_flight': len(self._in_flight),
+            'max_depth': self.max_depth,
+            'sent': self.sent,
+            'edited': self.edited,
+            'failed': self.failed,
+            'flood_waits': self.flood_waits,
+            'coalesced': self.coalesced,
+            'unchanged': self.unchanged,
+            'wait': waits,
+        }
@@ -0,0 +1,136 @@
+"""
+Persistance différée (write-behind) et écriture atomique des fichiers d'état.
+
+Le chemin des messages ne touche plus le disque : une modification marque
+l'état « sale », les marques rapprochées sont regroupées pendant ``delay``
+secondes, puis l'état est capturé sur la boucle asyncio (copie cohérente) et
+écrit depuis un thread. Chaque fichier est écrit de façon atomique (fichier
+temporaire, fsync, os.replace) : un arrêt brutal laisse l'ancienne ou la
+nouvelle version, jamais un fichier tronqué. ``flush`` vide tout à l'arrêt.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from typing import Any, Callable, List, Optional
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def atomic_write(path: str, data: bytes) -> int:
+    """Écrit ``data`` de façon atomique et retourne sa taille en octets"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return len(data)
+
+
+def atomic_write_json(path: str, value: Any) -> int:
+    """Écrit une valeur JSON (indentée, UTF-8) de façon atomique"""
+    return atomic_write(path, json.dumps(value, indent=2, ensure_ascii=False).encode('utf-8'))
+
+
+class WriteBehind:
+    """Un état sauvegardé en différé : ``capture`` sur la boucle, ``write`` dans un thread"""
+
+    def __init__(self, name: str, capture: Callable[[], Any], write: Callable[[Any], None], delay: float):
+        """
+        Args:
+            name: Nom pour les journaux
+            capture: Copie cohérente de l'état (appelée sur la boucle asyncio, doit être rapide)
+            write: Écriture de la copie (appelée dans un thread, peut bloquer)
+            delay: Secondes de regroupement des modifications avant écriture
+        """
+        self.name = name
+        self.capture = capture
+        self.write = write
+        self.delay = delay
+        self.dirty = False
+        self.writes = 0
+        self.coalesced = 0
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    def mark_dirty(self):
+        """Demande une écriture ; sans boucle asyncio active, écrit tout de suite"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        if self.dirty:
+            self.coalesced += 1
+        self.dirty = True
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        # Les modifications arrivées pendant une écriture déclenchent un nouveau tour
+        while self.dirty:
+            await asyncio.sleep(self.delay)
+            await self.flush()
+
+    async def flush(self):
+        """Écrit l'état s'il est sale (une seule écriture à la fois)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            snapshot = self.capture()
+            try:
+                await asyncio.to_thread(self.write, snapshot)
+                self.writes += 1
+            except Exception as e:
+                self.dirty = True
+                logger.error("❌ Erreur sauvegarde %s: %s", self.name, e)
+
+    def flush_sync(self):
+        """Capture et écrit immédiatement, dans le thread courant"""
+        self.dirty = False
+        try:
+            self.write(self.capture())
+            self.writes += 1
+        except Exception as e:
+            logger.error("❌ Erreur sauvegarde %s: %s", self.name, e)
+
+
+class PersistenceService:
+    """Ensemble des états sauvegardés en différé, vidés ensemble à l'arrêt"""
+
+    def __init__(self, delay: Optional[float] = None):
+        """
+        Args:
+            delay: Secondes de regroupement des écritures (PERSIST_DELAY, 1.0 par défaut)
+        """
+        self.delay = float(os.getenv('PERSIST_DELAY', '1.0')) if delay is None else delay
+        self._writers: List[WriteBehind] = []
+
+    def track(self, name: str, capture: Callable[[], Any], write: Callable[[Any], None]) -> WriteBehind:
+        writer = WriteBehind(name, capture, write, self.delay)
+        self._writers.append(writer)
+        return writer
+
+    async def flush(self):
+        """Écrit tout état encore sale (à appeler à l'arrêt)"""
+        for writer in self._writers:
+            # Une écriture différée encore en attente ne trouvera plus rien à écrire
+            await writer.flush()
+
+    def stats(self):
+        return {writer.name: {'dirty': writer.dirty, 'writes': writer.writes, 'coalesced': writer.coalesced}
+                for writer in self._writers}
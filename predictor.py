@@ -1,105 +1,247 @@
-import re
-import random
-from typing import Tuple, Optional, List
+import heapq
+import logging
+from collections import deque
+from itertools import islice
+from typing import Dict, Tuple, Optional, List, Union
+from message_parser import (
+    ParsedStatMessage, ensure_parsed, GAME_NUMBER_RE, ALT_GAME_NUMBER_RE, GROUPS_RE
+)
+from card_codec import count_cards, normalize_suits
+from dedup import MessageGameIndex, MessageWatermarks
+from retention import BoundedSet, RetentionWindow
+from rolling_stats import PredictionStats, win_offset
+from trigger_policy import create_policy
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
 
 class CardPredictor:
     """Card game prediction engine with pattern matching and result verification"""
     
-    def __init__(self):
-        self.last_predictions = []  # Liste [(numéro, combinaison)]
+    def __init__(self, history_size: int = 500, retention_window: int = 1000,
+                 dedup_size: int = 5000, dedup_ttl: Optional[float] = None,
+                 dedup_window: int = 32,
+                 rolling_size: int = 20, rolling_seconds: int = 3600,
+                 trigger_policy: Optional[str] = None):
+        """
+        Args:
+            history_size: Taille des tampons circulaires status_log / last_predictions
+            retention_window: Nombre de prédictions résolues conservées dans
+                prediction_status / prediction_messages
+            dedup_size: Capacité des ensembles de jeux traités / réservés (LRU)
+            dedup_ttl: Durée de vie (secondes) d'une entrée de ces ensembles
+            dedup_window: Fenêtre de désordre des identifiants de messages par chat
+            rolling_size: Nombre de derniers résultats des agrégats glissants
+            rolling_seconds: Durée de la fenêtre temporelle des agrégats glissants
+            trigger_policy: 'fixed' ou 'adaptive' (TRIGGER_POLICY par défaut)
+        """
+        self.last_predictions = deque(maxlen=history_size)  # Liste [(numéro, combinaison)]
         self.prediction_status = {}  # Statut des prédictions par numéro
-        self.processed_messages = set()  # Pour éviter les doublons
-        self.status_log = []  # Historique des statuts
+        self.seen_messages = MessageWatermarks(dedup_window)  # Dédup par (chat_id, message_id)
+        self.message_games = MessageGameIndex()  # (chat_id, message_id) -> jeu, pour les modifications
+        self.processed_games = BoundedSet(dedup_size, dedup_ttl)  # Jeux déclencheurs déjà utilisés
+        self.auto_predictions = BoundedSet(dedup_size, dedup_ttl)  # Jeux réservés par le planificateur
+        self.status_log = deque(maxlen=history_size)  # Historique des statuts
+        self.stats = PredictionStats(rolling_size, rolling_seconds)  # Compteurs O(1)
         self.prediction_messages = {}  # Stockage des IDs de messages de prédiction
+        self._resolved_window = RetentionWindow(retention_window)
         self.trigger_numbers = [6, 7, 8, 9]  # Numéros déclencheurs variables
         self.last_trigger_used = None  # Dernier déclencheur utilisé pour éviter répétition
+        self.policy = create_policy(trigger_policy)  # Choix / saut des déclencheurs
+        self._prediction_triggers = {}  # Chiffre déclencheur de chaque prédiction ⌛
+        self._pending = set()  # Index des prédictions ⌛ (recherche O(1) des offsets 0/1/2)
+        self._pending_heap = []  # Tas min des numéros ⌛ pour détecter les expirations en O(log n)
         
     def reset(self):
         """Reset all prediction data"""
         self.last_predictions.clear()
         self.prediction_status.clear()
-        self.processed_messages.clear()
+        self._pending.clear()
+        self._pending_heap.clear()
+        self.seen_messages.clear()
+        self.message_games.clear()
+        self.processed_games.clear()
+        self.auto_predictions.clear()
         self.status_log.clear()
+        self.stats.reset()
         self.prediction_messages.clear()
+        self._resolved_window.clear()
         self.last_trigger_used = None
-        print("Données de prédiction réinitialisées")
+        self.policy.reset()
+        self._prediction_triggers.clear()
+        logger.info("Données de prédiction réinitialisées")
+
+    def add_pending(self, game_number: int):
+        """Register a pending (⌛) prediction in the status map and the pending index"""
+        self.prediction_status[game_number] = '⌛'
+        if game_number not in self._pending:
+            self._pending.add(game_number)
+            heapq.heappush(self._pending_heap, game_number)
+
+    def _resolve(self, game_number: int, statut: str):
+        """Record the final status of a prediction and drop it from the pending index"""
+        self.prediction_status[game_number] = statut
+        self._pending.discard(game_number)
+        self.status_log.append((game_number, statut))
+        self.stats.record(statut)
+        digit = self._prediction_triggers.pop(game_number, None)
+        if digit is not None:
+            self.policy.record(digit, win_offset(statut))
+
+        # Éviction des prédictions résolues sorties de la fenêtre de rétention
+        for old in self._resolved_window.push(game_number):
+            if old not in self._pending:
+                self.prediction_status.pop(old, None)
+                self.prediction_messages.pop(old, None)
+
+    def _oldest_expired(self, game_number: int) -> Optional[int]:
+        """Return the oldest pending prediction expired by this game (game > prediction+2)"""
+        heap = self._pending_heap
+        # Suppression paresseuse des entrées déjà résolues
+        while heap and heap[0] not in self._pending:
+            heapq.heappop(heap)
+        if heap and game_number > heap[0] + 2:
+            return heap[0]
+        return None
+
+    def export_state(self) -> Dict:
+        """Copy of the restart-relevant state (see snapshot.py), taken on the event loop"""
+        stats = self.stats
+        return {
+            'last_trigger_used': self.last_trigger_used,
+            'trigger_numbers': list(self.trigger_numbers),
+            'counters': [stats.total, *stats.wins_by_offset, stats.losses],
+            'pending': sorted(self._pending),
+            'statuses': list(self.prediction_status.items()),
+            'resolved': list(self._resolved_window),
+            'messages': [(game, info['chat_id'], info['message_id'])
+                         for game, messages in self.prediction_messages.items()
+                         for info in messages],
+            'status_log': list(self.status_log),
+            'last_predictions': list(self.last_predictions),
+            'dedup': list(self.processed_games),
+            'auto_predictions': list(self.auto_predictions),
+            'watermarks': self.seen_messages.export_state(),
+            'triggers': list(self._prediction_triggers.items()),
+            'policy_mode': self.policy.mode,
+            'policy': self.policy.export_state(),
+        }
+
+    def restore_state(self, state: Dict):
+        """Restore a state produced by export_state (warm restart)"""
+        self.reset()
+        self.last_trigger_used = state['last_trigger_used']
+        if state['trigger_numbers']:
+            self.trigger_numbers = list(state['trigger_numbers'])
+        total, win0, win1, win2, losses = state['counters']
+        self.stats.total = total
+        self.stats.wins_by_offset = [win0, win1, win2]
+        self.stats.losses = losses
+        self.prediction_status.update(state['statuses'])
+        self._pending.update(state['pending'])
+        self._pending_heap = sorted(self._pending)  # Une liste triée est un tas valide
+        for game in state['resolved']:
+            self._resolved_window.push(game)
+        for game, chat_id, message_id in state['messages']:
+            self.store_prediction_message(game, message_id, chat_id)
+        self.status_log.extend(state['status_log'])
+        self.last_predictions.extend(state['last_predictions'])
+        for item in state['dedup']:
+            # Instantanés v1/v2 : jeux et réservations « auto_prediction_N » mélangés
+            if isinstance(item, str) and item.startswith('auto_prediction_'):
+                self.auto_predictions.add(int(item[len('auto_prediction_'):]))
+            else:
+                self.processed_games.add(item)
+        for game in state.get('auto_predictions', ()):
+            self.auto_predictions.add(game)
+        self.seen_messages.restore_state(state.get('watermarks', ()))
+        self._prediction_triggers.update(state.get('triggers', ()))
+        if state.get('policy_mode') == self.policy.mode:
+            self.policy.restore_state(state.get('policy', []))
+        # L'agrégat des N derniers se reconstruit depuis l'historique des statuts
+        recent = list(self.status_log)[-self.stats.last_n.size:]
+        for _, statut in recent:
+            self.stats.last_n.add(win_offset(statut) is not None)
+        logger.info("♻️ État restauré: %s prédictions ⌛, %s statuts finaux", len(self._pending), total)
+
+    def is_new_message(self, chat_id: int, message_id: int) -> bool:
+        """First delivery of this Telegram message? (O(1), stable across restarts)"""
+        return self.seen_messages.is_new(chat_id, message_id)
+
+    def remember_message(self, chat_id: int, message_id: int, game_number: Optional[int]):
+        """Index the game of a stat message so a later edit can find it"""
+        if game_number is not None:
+            self.message_games.add(chat_id, message_id, game_number)
+
+    def game_for_message(self, chat_id: int, message_id: int) -> Optional[int]:
+        """Game number of an indexed stat message (None if unknown or evicted)"""
+        return self.message_games.get(chat_id, message_id)
+
+    def awaits_result(self, game_number: int) -> bool:
+        """Could this game still resolve a pending prediction (offsets 0/1/2)?"""
+        pending = self._pending
+        return game_number in pending or game_number - 1 in pending or game_number - 2 in pending
+
+    def mark_auto_prediction(self, game_number: int):
+        """Reserve a game for the scheduler so no manual prediction is made for it"""
+        self.auto_predictions.add(game_number)
+
+    @property
+    def status_total(self) -> int:
+        """Number of final statuses recorded since start (or last reset)"""
+        return self.stats.total
+
+    def pending_count(self) -> int:
+        """Number of pending (⌛) predictions"""
+        return len(self._pending)
+
+    def pending_predictions(self) -> List[int]:
+        """Pending (⌛) prediction numbers, sorted"""
+        return sorted(self._pending)
 
     def extract_game_number(self, message: str) -> Optional[int]:
         """Extract game number from message using pattern #N followed by digits"""
         try:
             # Look for patterns like "#N 123", "#N123", "#N60.", etc.
-            match = re.search(r"#N\s*(\d+)\.?", message, re.IGNORECASE)
+            match = GAME_NUMBER_RE.search(message)
             if match:
                 number = int(match.group(1))
-                print(f"Numéro de jeu extrait: {number}")
+                logger.debug("Numéro de jeu extrait: %s", number)
                 return number
             
             # Alternative pattern matching
-            match = re.search(r"jeu\s*#?\s*(\d+)", message, re.IGNORECASE)
+            match = ALT_GAME_NUMBER_RE.search(message)
             if match:
                 number = int(match.group(1))
-                print(f"Numéro de jeu alternatif extrait: {number}")
+                logger.debug("Numéro de jeu alternatif extrait: %s", number)
                 return number
                 
-            print(f"Aucun numéro de jeu trouvé dans: {message}")
+            logger.debug("Aucun numéro de jeu trouvé dans: %s", message)
             return None
         except (ValueError, AttributeError) as e:
-            print(f"Erreur extraction numéro: {e}")
+            logger.error("Erreur extraction numéro: %s", e)
             return None
 
     def extract_symbols_from_parentheses(self, message: str) -> List[str]:
         """Extract content from parentheses in the message"""
         try:
-            return re.findall(r"\(([^)]*)\)", message)
+            return GROUPS_RE.findall(message)
         except Exception:
             return []
 
     def count_total_cards(self, symbols_str: str) -> int:
-        """Count total card symbols in a string"""
-        # Compter d'abord les versions emoji, puis les versions simples
-        # pour éviter le double comptage
-        emoji_symbols = ['♠️', '♥️', '♦️', '♣️']
-        simple_symbols = ['♠', '♥', '♦', '♣']
-        
-        # Remplacer les emojis par des marqueurs temporaires pour éviter le double comptage
-        temp_str = symbols_str
-        emoji_count = 0
-        
-        for emoji in emoji_symbols:
-            count = temp_str.count(emoji)
-            emoji_count += count
-            # Remplacer par des marqueurs pour éviter le recomptage
-            temp_str = temp_str.replace(emoji, 'X')
-        
-        # Compter les symboles simples restants
-        simple_count = 0
-        for symbol in simple_symbols:
-            simple_count += temp_str.count(symbol)
-            
-        total = emoji_count + simple_count
-        print(f"Comptage cartes détaillé: emoji={emoji_count}, simple={simple_count}, total={total} dans '{symbols_str}'")
-        return total
+        """Count total card symbols in a string (♠️ and ♠ both count as one card)"""
+        return count_cards(symbols_str)
 
     def normalize_suits(self, suits_str: str) -> str:
         """Normalize and sort card suits"""
-        # Map emoji versions to simple versions
-        suit_map = {
-            '♠️': '♠', '♥️': '♥', '♦️': '♦', '♣️': '♣'
-        }
-        
-        normalized = suits_str
-        for emoji, simple in suit_map.items():
-            normalized = normalized.replace(emoji, simple)
-        
-        # Extract only card symbols and sort them
-        suits = [c for c in normalized if c in '♠♥♦♣']
-        return ''.join(sorted(set(suits)))
+        return normalize_suits(suits_str)
 
-    def should_predict(self, message: str) -> Tuple[bool, Optional[int], Optional[str]]:
+    def should_predict(self, message: Union[str, ParsedStatMessage]) -> Tuple[bool, Optional[int], Optional[str]]:
         """Determine if a prediction should be made based on the message"""
         try:
-            # Extract game number
-            game_number = self.extract_game_number(message)
+            parsed = ensure_parsed(message)
+            game_number = parsed.game_number
             if game_number is None:
                 return False, None, None
 
@@ -107,215 +249,213 @@ class CardPredictor:
             last_digit = game_number % 10
             if last_digit not in self.trigger_numbers:
                 return False, None, None
-            
-            # Si c'est le même déclencheur que la dernière fois, parfois ignorer pour variabilité
-            if (self.last_trigger_used == last_digit and 
-                len(self.last_predictions) > 0 and 
-                random.random() < 0.3):  # 30% chance d'ignorer pour forcer variabilité
-                print(f"🔄 Déclencheur {last_digit} ignoré pour variabilité (dernier: {self.last_trigger_used})")
-                return False, None, None
 
             # Calculate predicted game number
             predicted_game = ((game_number // 10) + 1) * 10
             
             # ANTI-DOUBLON: Check if predicted game already has a prediction (any status)
             if predicted_game in self.prediction_status:
-                print(f"❌ Prédiction déjà existante pour le jeu #{predicted_game} (statut: {self.prediction_status[predicted_game]}), ignoré")
+                logger.debug("❌ Prédiction déjà existante pour le jeu #%s (statut: %s), ignoré", predicted_game, self.prediction_status[predicted_game])
                 return False, None, None
             
             # ANTI-DOUBLON: Double check from processed messages to avoid scheduler conflicts
-            if f"auto_prediction_{predicted_game}" in self.processed_messages:
-                print(f"❌ Prédiction automatique déjà planifiée pour #{predicted_game}, ignoré")
+            if predicted_game in self.auto_predictions:
+                logger.debug("❌ Prédiction automatique déjà planifiée pour #%s, ignoré", predicted_game)
                 return False, None, None
             
             # Check if current game already processed
-            if game_number in self.processed_messages:
-                print(f"Jeu #{game_number} déjà traité, ignoré")
+            if game_number in self.processed_games:
+                logger.debug("Jeu #%s déjà traité, ignoré", game_number)
                 return False, None, None
 
-            # Extract symbols from parentheses
-            matches = self.extract_symbols_from_parentheses(message)
-            if not matches:
+            # Couleurs normalisées du premier groupe (déjà calculées par le parseur)
+            if not parsed.groups:
                 return False, None, None
 
-            # Get first group of symbols
-            first_group = matches[0]
-            suits = self.normalize_suits(first_group)
+            suits = parsed.suits[0]
             
             if not suits:
                 return False, None, None
 
+            # Politique de déclenchement : saut aléatoire d'un chiffre répété (fixed)
+            # ou chiffre sous-performant (adaptive). Consultée en dernier : seuls les
+            # messages qui créeraient une prédiction comptent comme sauts ou essais.
+            if not self.policy.allow(last_digit, self.last_trigger_used):
+                logger.debug("🔄 Déclencheur %s ignoré par la politique %s (dernier: %s)",
+                             last_digit, self.policy.mode, self.last_trigger_used)
+                return False, None, None
+
             # Mark current game as processed and update last trigger used
-            self.processed_messages.add(game_number)
+            self.processed_games.add(game_number)
             self.last_trigger_used = last_digit
             
             # Create prediction for target game
-            self.prediction_status[predicted_game] = '⌛'
+            self.add_pending(predicted_game)
+            self._prediction_triggers[predicted_game] = last_digit
             self.last_predictions.append((predicted_game, suits))
             
-            print(f"✅ Prédiction manuelle créée: Jeu #{predicted_game} -> {suits} (déclenchée par #{game_number}, trigger={last_digit})")
-            print(f"📊 Prédictions actives: {[k for k, v in self.prediction_status.items() if v == '⌛']}")
+            logger.info("✅ Prédiction manuelle créée: Jeu #%s -> %s (déclenchée par #%s, trigger=%s)", predicted_game, suits, game_number, last_digit)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("📊 Prédictions actives: %s", self.pending_predictions())
             return True, predicted_game, suits
 
         except Exception as e:
-            print(f"Erreur dans should_predict: {e}")
+            logger.error("Erreur dans should_predict: %s", e)
             return False, None, None
     
     def store_prediction_message(self, game_number: int, message_id: int, chat_id: int):
-        """Store prediction message ID for later editing"""
-        self.prediction_messages[game_number] = {'message_id': message_id, 'chat_id': chat_id}
+        """Store prediction message ID for later editing (one entry per display channel)"""
+        messages = self.prediction_messages.setdefault(game_number, [])
+        for info in messages:
+            if info['chat_id'] == chat_id:
+                info['message_id'] = message_id
+                return
+        messages.append({'message_id': message_id, 'chat_id': chat_id})
         
     def get_prediction_message(self, game_number: int):
-        """Get stored prediction message details"""
-        return self.prediction_messages.get(game_number)
+        """Get stored prediction message details (first display channel)"""
+        messages = self.prediction_messages.get(game_number)
+        return messages[0] if messages else None
 
-    def verify_prediction(self, message: str) -> Tuple[Optional[bool], Optional[int]]:
+    def get_prediction_messages(self, game_number: int) -> List[Dict]:
+        """Get stored prediction message details for every display channel"""
+        return list(self.prediction_messages.get(game_number, ()))
+
+    def verify_prediction(self, message: Union[str, ParsedStatMessage]) -> Tuple[Optional[bool], Optional[int]]:
         """Verify prediction results based on verification message"""
         try:
+            parsed = ensure_parsed(message)
+
             # Check for verification tags
-            if not any(tag in message for tag in ["✅", "🔰", "❌", "⭕", "⏰"]):
+            if not parsed.is_verification:
                 return None, None
 
-            # Extract game number
-            game_number = self.extract_game_number(message)
+            game_number = parsed.game_number
             if game_number is None:
-                print(f"Aucun numéro de jeu trouvé dans: {message}")
+                logger.debug("Aucun numéro de jeu trouvé dans: %s", parsed.text)
                 return None, None
 
-            print(f"Numéro de jeu du résultat: {game_number}")
+            logger.debug("Numéro de jeu du résultat: %s", game_number)
 
             # Si le message contient ⏰, considérer comme plus de 2 cartes et continuer la vérification
-            if "⏰" in message:
-                print(f"⏰ détecté dans le message - considéré comme plus de 2 cartes")
+            if parsed.has_clock:
+                logger.debug("⏰ détecté dans le message - considéré comme plus de 2 cartes")
                 
-                # Vérifier s'il y a des prédictions expirées (jeu > prédiction+2)
-                expired_predictions = []
-                for pred_num, status in self.prediction_status.items():
-                    if status == '⌛' and game_number > pred_num + 2:
-                        expired_predictions.append(pred_num)
-                
-                # Marquer les prédictions expirées comme échouées
-                for pred_num in expired_predictions:
-                    statut = '❌❌'
-                    self.prediction_status[pred_num] = statut
-                    self.status_log.append((pred_num, statut))
-                    print(f"Prédiction expirée: #{pred_num} marquée comme échouée (jeu {game_number} > {pred_num}+2)")
+                # Vérifier s'il y a une prédiction expirée (jeu > prédiction+2)
+                pred_num = self._oldest_expired(game_number)
+                if pred_num is not None:
+                    # Marquer la prédiction expirée comme échouée
+                    self._resolve(pred_num, '❌❌')
+                    logger.info("Prédiction expirée: #%s marquée comme échouée (jeu %s > %s+2)", pred_num, game_number, pred_num)
                     return False, pred_num
                 
                 # Si aucune prédiction expirée, continuer l'attente
-                print(f"Jeu #{game_number} avec ⏰ - aucune prédiction expirée, continuer l'attente")
+                logger.debug("Jeu #%s avec ⏰ - aucune prédiction expirée, continuer l'attente", game_number)
                 return None, None
 
-            # Extract symbol groups
-            groups = self.extract_symbols_from_parentheses(message)
+            # Symbol groups and card counts come from the parsed record
+            groups = parsed.groups
             if len(groups) < 2:
-                print(f"Groupes de symboles insuffisants: {groups}")
+                logger.debug("Groupes de symboles insuffisants: %s", groups)
                 return None, None
 
-            first_group = groups[0]
-            second_group = groups[1]
-            print(f"Groupes extraits: '{first_group}' et '{second_group}'")
-
-            def is_valid_result():
-                """Check if the result has valid card distribution (2+2)"""
-                count1 = self.count_total_cards(first_group)
-                count2 = self.count_total_cards(second_group)
-                print(f"Comptage cartes: groupe1={count1}, groupe2={count2}")
-                return count1 == 2 and count2 == 2
-
-            # Vérifier les prédictions en attente dans le bon ordre
-            # 1. Chercher d'abord si ce jeu correspond exactement à une prédiction (offset 0)
-            # 2. Puis vérifier si c'est le jeu suivant d'une prédiction (offset +1)
-            # 3. Puis vérifier si c'est 2 jeux après une prédiction (offset +2)
-            
-            for offset in range(3):  # Check 0, 1, 2 offsets
-                predicted_number = game_number - offset
-                print(f"Vérification si le jeu #{game_number} correspond à la prédiction #{predicted_number} (offset {offset})")
-                
-                if (predicted_number in self.prediction_status and 
-                    self.prediction_status[predicted_number] == '⌛'):
-                    print(f"Prédiction en attente trouvée: #{predicted_number}")
-                    
-                    if is_valid_result():
-                        # Success with offset indicator
-                        if offset == 0:
-                            statut = '✅0️⃣'  # Perfect timing
-                        elif offset == 1:
-                            statut = '✅1️⃣'  # 1 game late
-                        else:
-                            statut = '✅2️⃣'  # 2 games late
-                            
-                        self.prediction_status[predicted_number] = statut
-                        self.status_log.append((predicted_number, statut))
-                        print(f"Prédiction réussie: #{predicted_number} validée par le jeu #{game_number} (offset {offset})")
-                        return True, predicted_number
-                    else:
-                        # Failed prediction - invalid card count
-                        statut = '❌❌'
-                        self.prediction_status[predicted_number] = statut
-                        self.status_log.append((predicted_number, statut))
-                        print(f"Prédiction échouée: #{predicted_number} - résultat invalide (cartes incorrectes)")
-                        return False, predicted_number
-
-            # Si aucune prédiction trouvée dans les 3 offsets, chercher les prédictions expirées
-            expired_predictions = []
-            for pred_num, status in self.prediction_status.items():
-                if status == '⌛' and game_number > pred_num + 2:
-                    expired_predictions.append(pred_num)
-            
-            # Marquer les prédictions expirées comme échouées
-            for pred_num in expired_predictions:
-                statut = '❌❌'
-                self.prediction_status[pred_num] = statut
-                self.status_log.append((pred_num, statut))
-                print(f"Prédiction expirée: #{pred_num} marquée comme échouée")
+            logger.debug("Groupes extraits: '%s' et '%s'", groups[0], groups[1])
+
+            verified, predicted_number = self._verify_window(parsed)
+            if predicted_number is not None:
+                return verified, predicted_number
+
+            # Si aucune prédiction trouvée dans les 3 offsets, chercher une prédiction expirée
+            pred_num = self._oldest_expired(game_number)
+            if pred_num is not None:
+                self._resolve(pred_num, '❌❌')
+                logger.info("Prédiction expirée: #%s marquée comme échouée", pred_num)
                 return False, pred_num
 
-            print(f"Aucune prédiction correspondante trouvée pour le jeu #{game_number}")
-            print(f"Prédictions actuelles en attente: {[k for k, v in self.prediction_status.items() if v == '⌛']}")
+            logger.debug("Aucune prédiction correspondante trouvée pour le jeu #%s", game_number)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Prédictions actuelles en attente: %s", self.pending_predictions())
             return None, None
 
         except Exception as e:
-            print(f"Erreur dans verify_prediction: {e}")
+            logger.error("Erreur dans verify_prediction: %s", e)
             return None, None
 
-    def get_statistics(self) -> dict:
-        """Get prediction statistics"""
+    def _verify_window(self, parsed: ParsedStatMessage) -> Tuple[Optional[bool], Optional[int]]:
+        """Resolve the pending prediction this result matches (offsets 0/1/2), if any"""
+        game_number = parsed.game_number
+
+        def is_valid_result():
+            """Check if the result has valid card distribution (2+2)"""
+            count1, count2 = parsed.card_counts[0], parsed.card_counts[1]
+            logger.debug("Comptage cartes: groupe1=%s, groupe2=%s", count1, count2)
+            return count1 == 2 and count2 == 2
+
+        # Vérifier les prédictions en attente dans le bon ordre
+        # 1. Chercher d'abord si ce jeu correspond exactement à une prédiction (offset 0)
+        # 2. Puis vérifier si c'est le jeu suivant d'une prédiction (offset +1)
+        # 3. Puis vérifier si c'est 2 jeux après une prédiction (offset +2)
+        
+        for offset in range(3):  # Check 0, 1, 2 offsets
+            predicted_number = game_number - offset
+            logger.debug("Vérification si le jeu #%s correspond à la prédiction #%s (offset %s)", game_number, predicted_number, offset)
+            
+            if predicted_number in self._pending:
+                logger.debug("Prédiction en attente trouvée: #%s", predicted_number)
+                
+                if is_valid_result():
+                    # Success with offset indicator
+                    if offset == 0:
+                        statut = '✅0️⃣'  # Perfect timing
+                    elif offset == 1:
+                        statut = '✅1️⃣'  # 1 game late
+                    else:
+                        statut = '✅2️⃣'  # 2 games late
+                        
+                    self._resolve(predicted_number, statut)
+                    logger.info("Prédiction réussie: #%s validée par le jeu #%s (offset %s)", predicted_number, game_number, offset)
+                    return True, predicted_number
+                else:
+                    # Failed prediction - invalid card count
+                    self._resolve(predicted_number, '❌❌')
+                    logger.info("Prédiction échouée: #%s - résultat invalide (cartes incorrectes)", predicted_number)
+                    return False, predicted_number
+
+        return None, None
+
+    def verify_edited(self, message: Union[str, ParsedStatMessage]) -> Tuple[Optional[bool], Optional[int]]:
+        """Re-verify an edited stat message: only its own game window, no expiry scan"""
         try:
-            total_predictions = len(self.status_log)
-            if total_predictions == 0:
-                return {
-                    'total': 0,
-                    'wins': 0,
-                    'losses': 0,
-                    'pending': len([s for s in self.prediction_status.values() if s == '⌛']),
-                    'win_rate': 0.0
-                }
-
-            wins = sum(1 for _, status in self.status_log if '✅' in status)
-            losses = sum(1 for _, status in self.status_log if '❌' in status or '⭕' in status)
-            pending = len([s for s in self.prediction_status.values() if s == '⌛'])
-            win_rate = (wins / total_predictions * 100) if total_predictions > 0 else 0.0
-
-            return {
-                'total': total_predictions,
-                'wins': wins,
-                'losses': losses,
-                'pending': pending,
-                'win_rate': win_rate
-            }
+            parsed = ensure_parsed(message)
+            if (not parsed.is_verification or parsed.has_clock
+                    or parsed.game_number is None or len(parsed.groups) < 2):
+                return None, None
+            return self._verify_window(parsed)
         except Exception as e:
-            print(f"Erreur dans get_statistics: {e}")
-            return {'total': 0, 'wins': 0, 'losses': 0, 'pending': 0, 'win_rate': 0.0}
+            logger.error("Erreur dans verify_edited: %s", e)
+            return None, None
+
+    def get_statistics(self) -> dict:
+        """Get prediction statistics (running counters, constant time)"""
+        statistics = self.stats.snapshot(len(self._pending))
+        statistics['policy'] = self.policy.snapshot()
+        return statistics
+
+    def get_recent_statuses(self, count: int = 20) -> List[Tuple[int, str]]:
+        """Get the last final statuses, oldest first"""
+        recent = list(islice(reversed(self.status_log), count))
+        recent.reverse()
+        return recent
 
     def get_recent_predictions(self, count: int = 10) -> List[Tuple[int, str]]:
         """Get recent predictions with their status"""
         try:
             recent = []
-            for game_num, suits in self.last_predictions[-count:]:
+            last = list(islice(reversed(self.last_predictions), count))
+            for game_num, suits in reversed(last):
                 status = self.prediction_status.get(game_num, '⌛')
                 recent.append((game_num, suits, status))
             return recent
         except Exception as e:
-            print(f"Erreur dans get_recent_predictions: {e}")
+            logger.error("Erreur dans get_recent_predictions: %s", e)
             return []
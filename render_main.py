@@ -1,10 +1,25 @@
+# First import: times the following imports with --profile-startup
+from startup_profile import profiler
 import os
 import asyncio
 import re
 from telethon import TelegramClient, events
 from predictor import CardPredictor
+from router import ChannelRouter
+from outbox import OutboundQueue, PRIORITY_PREDICTION, PRIORITY_RESULT, PRIORITY_REPORT
+from entity_cache import EntityCache
+from chat_filter import FilteredHandler
+from commands import CommandDispatcher
+from session import create_session, has_auth_key, StartupTimer
+from metrics import (REGISTRY, MESSAGES, PREDICTIONS_CREATED, PREDICTIONS_VERIFIED, HANDLER_SECONDS,
+                     OUTBOX_DEPTH, timed, monitor_event_loop)
+from tracing import tracer
+from report import ReportScheduler
 from aiohttp import web
-import time
+from bot_logging import setup_logging, get_logger
+
+setup_logging()
+logger = get_logger('bot')
 
 # --- CONFIGURATION ---
 API_ID = int(os.getenv('API_ID', '0'))
@@ -18,43 +33,99 @@ detected_stat_channel = None
 detected_display_channel = None
 confirmation_pending = {}
 
-# Gestionnaire de prédictions
+# Gestionnaire de prédictions (table principale /set_stat + /set_display)
 predictor = CardPredictor()
 
-# Initialize Telegram client with unique session name
-session_name = f'bot_session_{int(time.time())}'
-client = TelegramClient(session_name, API_ID, API_HASH)
+# Routage multi-tables : chaque canal de statistiques a son propre prédicteur
+router = ChannelRouter()
+
+def sync_default_route():
+    """Align the router's main table with the configured stat/display channels"""
+    router.set_default(detected_stat_channel, detected_display_channel, predictor)
+    bind_stat_handlers()
+
+def bind_stat_handlers():
+    """Re-register the stat-channel handlers with a chats= filter built from the routes"""
+    for handler in stat_handlers:
+        handler.bind(router.stat_channels())
+
+# Initialize Telegram client with a stable session (auth key reused across restarts)
+session_info = create_session('bot_session')
+client = TelegramClient(session_info.session, API_ID, API_HASH)
+startup = StartupTimer(session_info.mode, profiler.started)
+
+# File d'envoi partagée (limitation par chat, FloodWait, priorités)
+outbox = OutboundQueue(client)
+OUTBOX_DEPTH.set_function(outbox.__len__)
+
+# Identité du bot et entités des canaux (get_me / get_entity mis en cache)
+entity_cache = EntityCache(client)
+
+# Commandes d'administration : un seul gestionnaire, table nom → commande
+commands = CommandDispatcher(ADMIN_ID)
+client.add_event_handler(commands.dispatch, events.NewMessage())
+
+# Réponse aux non-administrateurs pour les commandes de configuration
+ADMIN_ONLY = "❌ Seul l'administrateur peut configurer les canaux"
 
 # Health check server for Render
 async def health_check(request):
     return web.Response(text="Bot is running!", status=200)
 
+async def metrics_endpoint(request):
+    """Prometheus text exposition of the in-process metrics"""
+    return web.Response(text=REGISTRY.render(), content_type='text/plain')
+
+async def debug_traces(request):
+    """Most recent stat-message traces (?limit=N, ?slow=1 for slow ones only)"""
+    try:
+        limit = int(request.query.get('limit', '50'))
+    except ValueError:
+        limit = 50
+    slow_only = request.query.get('slow') in ('1', 'true', 'yes')
+    return web.json_response({"stats": tracer.stats(), "traces": tracer.recent(limit, slow_only)})
+
 async def start_web_server():
     """Start web server for Render health checks"""
     app = web.Application()
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/debug/traces', debug_traces)
     
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, '0.0.0.0', PORT)
     await site.start()
-    print(f"✅ Serveur web démarré sur 0.0.0.0:{PORT} (Render.com)")
-    print(f"🌍 Health check disponible sur: http://0.0.0.0:{PORT}/health")
+    logger.info("✅ Serveur web démarré sur 0.0.0.0:%s (Render.com)", PORT)
+    logger.info("🌍 Health check disponible sur: http://0.0.0.0:%s/health", PORT)
 
 async def start_bot():
     """Start the bot with proper error handling"""
     try:
-        await client.start(bot_token=BOT_TOKEN)
-        print("Bot démarré avec succès...")
+        auth_reused = has_auth_key(client)
+        with profiler.phase('connect'):
+            await client.connect()
+        startup.connected(auth_reused)
+        profiler.milestone('connected')
+        with profiler.phase('authorize'):
+            await client.start(bot_token=BOT_TOKEN)
+        logger.info("Bot démarré avec succès...")
         
         # Get bot info
-        me = await client.get_me()
+        me = await entity_cache.get_me()
         username = getattr(me, 'username', 'Unknown') or f"ID:{me.id}"
-        print(f"Bot connecté: @{username}")
-        
+        logger.info("Bot connecté: @%s", username)
+
+        # Préchargement des canaux routés (titres pour les invitations et /status)
+        with profiler.phase('entity_cache'):
+            await entity_cache.warm(channel for shard in router for channel in (shard.stat_channel, *shard.display_channels))
+        startup.ready()
+        profiler.milestone('ready')
+        profiler.report()
+
     except Exception as e:
-        print(f"Erreur lors du démarrage du bot: {e}")
+        logger.error("Erreur lors du démarrage du bot: %s", e)
         return False
     
     return True
@@ -66,24 +137,24 @@ async def handler_join(event):
     global confirmation_pending
     
     try:
-        print(f"ChatAction event: {event}")
-        print(f"user_joined: {event.user_joined}, user_added: {event.user_added}")
-        print(f"user_id: {event.user_id}, chat_id: {event.chat_id}")
+        logger.debug("ChatAction event: %s", event)
+        logger.debug("user_joined: %s, user_added: %s", event.user_joined, event.user_added)
+        logger.debug("user_id: %s, chat_id: %s", event.user_id, event.chat_id)
         
+        # Titre modifié ou bot retiré : l'entité en cache n'est plus à jour
+        if event.new_title or event.user_left or event.user_kicked:
+            entity_cache.invalidate(event.chat_id)
+
         if event.user_joined or event.user_added:
-            me = await client.get_me()
-            me_id = getattr(me, 'id', None)
-            print(f"Mon ID: {me_id}, Event user_id: {event.user_id}")
+            me_id = await entity_cache.me_id()
+            logger.debug("Mon ID: %s, Event user_id: %s", me_id, event.user_id)
             
             if event.user_id == me_id:
                 confirmation_pending[event.chat_id] = 'waiting_confirmation'
                 
-                # Get channel info
-                try:
-                    chat = await client.get_entity(event.chat_id)
-                    chat_title = getattr(chat, 'title', f'Canal {event.chat_id}')
-                except:
-                    chat_title = f'Canal {event.chat_id}'
+                # Get channel info (fresh entity: the bot has just been given access)
+                entity_cache.invalidate(event.chat_id)
+                chat_title = await entity_cache.title(event.chat_id)
                 
                 # Send private invitation to admin
                 invitation_msg = f"""🔔 **Nouveau canal détecté**
@@ -99,29 +170,21 @@ Envoyez votre choix en réponse à ce message."""
 
                 try:
                     await client.send_message(ADMIN_ID, invitation_msg)
-                    print(f"Invitation envoyée à l'admin pour le canal: {chat_title} ({event.chat_id})")
+                    logger.info("Invitation envoyée à l'admin pour le canal: %s (%s)", chat_title, event.chat_id)
                 except Exception as e:
-                    print(f"Erreur envoi invitation privée: {e}")
+                    logger.error("Erreur envoi invitation privée: %s", e)
                     # Fallback: send to the channel temporarily for testing
                     await client.send_message(event.chat_id, f"⚠️ Impossible d'envoyer l'invitation privée. Canal ID: {event.chat_id}")
-                    print(f"Message fallback envoyé dans le canal {event.chat_id}")
+                    logger.info("Message fallback envoyé dans le canal %s", event.chat_id)
     except Exception as e:
-        print(f"Erreur dans handler_join: {e}")
+        logger.error("Erreur dans handler_join: %s", e)
 
-@client.on(events.NewMessage(pattern=r'/set_stat (-?\d+)'))
+@commands.command('set_stat', args=r'(-?\d+)', private=True, deny=ADMIN_ONLY)
 async def set_stat_channel(event):
     """Set statistics channel (only admin in private)"""
     global detected_stat_channel, confirmation_pending
     
     try:
-        # Only allow in private chat with admin
-        if event.is_group or event.is_channel:
-            return
-        
-        if event.sender_id != ADMIN_ID:
-            await event.respond("❌ Seul l'administrateur peut configurer les canaux")
-            return
-            
         # Extract channel ID from command
         match = event.pattern_match
         channel_id = int(match.group(1))
@@ -133,33 +196,22 @@ async def set_stat_channel(event):
             
         detected_stat_channel = channel_id
         confirmation_pending[channel_id] = 'configured_stat'
+        sync_default_route()
         
-        try:
-            chat = await client.get_entity(channel_id)
-            chat_title = getattr(chat, 'title', f'Canal {channel_id}')
-        except:
-            chat_title = f'Canal {channel_id}'
+        chat_title = await entity_cache.title(channel_id)
             
         await event.respond(f"✅ **Canal de statistiques configuré**\n📋 {chat_title}\n\n✨ Le bot surveillera ce canal pour les prédictions - développé par Sossou Kouamé Appolinaire")
-        print(f"Canal de statistiques configuré: {channel_id}")
+        logger.info("Canal de statistiques configuré: %s", channel_id)
         
     except Exception as e:
-        print(f"Erreur dans set_stat_channel: {e}")
+        logger.error("Erreur dans set_stat_channel: %s", e)
 
-@client.on(events.NewMessage(pattern=r'/set_display (-?\d+)'))
+@commands.command('set_display', args=r'(-?\d+)', private=True, deny=ADMIN_ONLY)
 async def set_display_channel(event):
     """Set display channel (only admin in private)"""
     global detected_display_channel, confirmation_pending
     
     try:
-        # Only allow in private chat with admin
-        if event.is_group or event.is_channel:
-            return
-        
-        if event.sender_id != ADMIN_ID:
-            await event.respond("❌ Seul l'administrateur peut configurer les canaux")
-            return
-            
         # Extract channel ID from command
         match = event.pattern_match
         channel_id = int(match.group(1))
@@ -171,21 +223,18 @@ async def set_display_channel(event):
             
         detected_display_channel = channel_id
         confirmation_pending[channel_id] = 'configured_display'
+        sync_default_route()
         
-        try:
-            chat = await client.get_entity(channel_id)
-            chat_title = getattr(chat, 'title', f'Canal {channel_id}')
-        except:
-            chat_title = f'Canal {channel_id}'
+        chat_title = await entity_cache.title(channel_id)
             
         await event.respond(f"✅ **Canal de diffusion configuré**\n📋 {chat_title}\n\n🚀 Le bot publiera les prédictions dans ce canal - développé par Sossou Kouamé Appolinaire")
-        print(f"Canal de diffusion configuré: {channel_id}")
+        logger.info("Canal de diffusion configuré: %s", channel_id)
         
     except Exception as e:
-        print(f"Erreur dans set_display_channel: {e}")
+        logger.error("Erreur dans set_display_channel: %s", e)
 
 # --- COMMANDES DE BASE ---
-@client.on(events.NewMessage(pattern='/start'))
+@commands.command('start', admin=False)
 async def start_command(event):
     """Send welcome message when user starts the bot"""
     try:
@@ -207,12 +256,15 @@ async def start_command(event):
 **Commandes** :
 • `/start` - Ce message
 • `/status` - État du bot (admin)
+• `/routes` - Tables configurées (admin)
+• `/route_add [stats] [display]` - Ajouter une table ou un canal de diffusion (admin)
+• `/route_remove [stats] [display]` - Retirer une route (admin)
 • `/reset` - Réinitialiser (admin)
 
 Le bot est prêt à analyser vos jeux ! 🚀"""
         
         await event.respond(welcome_msg)
-        print(f"Message de bienvenue envoyé à l'utilisateur {event.sender_id}")
+        logger.info("Message de bienvenue envoyé à l'utilisateur %s", event.sender_id)
         
         # Test message private pour vérifier la connectivité
         if event.sender_id == ADMIN_ID:
@@ -221,54 +273,107 @@ Le bot est prêt à analyser vos jeux ! 🚀"""
             await event.respond(test_msg)
         
     except Exception as e:
-        print(f"Erreur dans start_command: {e}")
+        logger.error("Erreur dans start_command: %s", e)
 
 # --- COMMANDES ADMINISTRATIVES ---
-@client.on(events.NewMessage(pattern='/status'))
+@commands.command('status')
 async def show_status(event):
     """Show bot status (admin only)"""
     try:
-        if event.sender_id != ADMIN_ID:
-            return
-            
+        stats = predictor.get_statistics()
+        outbox_stats = outbox.stats()
+        stat_title = await entity_cache.title(detected_stat_channel) if detected_stat_channel else ''
+        display_title = await entity_cache.title(detected_display_channel) if detected_display_channel else ''
         status_msg = f"""📊 **Statut du Bot**
         
-Canal statistiques: {'✅ Configuré' if detected_stat_channel else '❌ Non configuré'} ({detected_stat_channel})
-Canal diffusion: {'✅ Configuré' if detected_display_channel else '❌ Non configuré'} ({detected_display_channel})
-Prédictions actives: {len(predictor.prediction_status)}
-Dernières prédictions: {len(predictor.last_predictions)}
-Messages traités: {len(predictor.processed_messages)}
+Canal statistiques: {'✅ Configuré' if detected_stat_channel else '❌ Non configuré'} {stat_title} ({detected_stat_channel})
+Canal diffusion: {'✅ Configuré' if detected_display_channel else '❌ Non configuré'} {display_title} ({detected_display_channel})
+Tables routées: {len(router)}
+Prédictions actives: {stats['pending']}
+Prédictions terminées: {stats['total']} (✅ {stats['wins']} / ❌ {stats['losses']})
+Dernière heure: {stats['last_hour']['wins']}/{stats['last_hour']['total']} ({stats['last_hour']['win_rate']:.1f}%)
+Messages traités: {predictor.seen_messages.accepted} (doublons ignorés: {predictor.seen_messages.rejected})
+File d'envoi: {outbox_stats['depth']} en attente (max {outbox_stats['max_depth']}), attente moyenne {outbox_stats['wait']['prediction']['avg_ms']:.0f} ms, FloodWait: {outbox_stats['flood_waits']}
+Démarrage: prêt en {startup.ready_ms or 0:.0f} ms (session {startup.mode}, autorisation {'réutilisée' if startup.auth_reused else 'nouvelle'})
 """
         await event.respond(status_msg)
     except Exception as e:
-        print(f"Erreur dans show_status: {e}")
+        logger.error("Erreur dans show_status: %s", e)
+
+@commands.command('route_add', args=r'(-?\d+) (-?\d+)', private=True, deny=ADMIN_ONLY)
+async def route_add(event):
+    """Add a display channel to a table, creating the table if needed (admin only)"""
+    try:
+        stat_id = int(event.pattern_match.group(1))
+        display_id = int(event.pattern_match.group(2))
+        shard = router.add_route(stat_id, display_id)
+        bind_stat_handlers()
+
+        await event.respond(f"✅ **Route ajoutée**\n📊 {stat_id} → 📤 {display_id}\n"
+                            f"Canaux de diffusion de la table: {len(shard.display_channels)}")
+        logger.info("Route ajoutée: %s → %s", stat_id, display_id)
+    except Exception as e:
+        logger.error("Erreur dans route_add: %s", e)
+
+@commands.command('route_remove', args=r'(-?\d+)(?: (-?\d+))?', private=True, deny=ADMIN_ONLY)
+async def route_remove(event):
+    """Remove a display channel, or a whole table when only the stat channel is given (admin only)"""
+    try:
+        stat_id = int(event.pattern_match.group(1))
+        display = event.pattern_match.group(2)
+        if display is None and stat_id == router.default_stat:
+            await event.respond("⚠️ Table principale : utilisez `/set_stat` ou `/reset`")
+            return
+
+        if router.remove_route(stat_id, int(display) if display else None):
+            bind_stat_handlers()
+            await event.respond(f"🗑️ **Route retirée**: {stat_id}" + (f" → {display}" if display else ""))
+            logger.info("Route retirée: %s → %s", stat_id, display or 'toute la table')
+        else:
+            await event.respond("❌ Route introuvable")
+    except Exception as e:
+        logger.error("Erreur dans route_remove: %s", e)
+
+@commands.command('routes')
+async def list_routes(event):
+    """List routed tables and their display channels (admin only)"""
+    try:
+        if not len(router):
+            await event.respond("ℹ️ Aucune table configurée\n\nUtilisez `/route_add [stats] [display]`")
+            return
+
+        lines = [f"🧭 **Tables routées** ({len(router)})", ""]
+        for shard in router:
+            stats = shard.predictor.get_statistics()
+            marker = " (principale)" if shard.stat_channel == router.default_stat else ""
+            displays = ', '.join(str(d) for d in shard.display_channels) or 'aucun'
+            lines.append(f"📊 {shard.stat_channel}{marker} → 📤 {displays}")
+            lines.append(f"   ⌛ {stats['pending']} | ✅ {stats['wins']} / ❌ {stats['losses']}")
+        await event.respond('\n'.join(lines))
+    except Exception as e:
+        logger.error("Erreur dans list_routes: %s", e)
 
-@client.on(events.NewMessage(pattern='/reset'))
+@commands.command('reset')
 async def reset_bot(event):
     """Reset bot configuration (admin only)"""
     global detected_stat_channel, detected_display_channel, confirmation_pending
     
     try:
-        if event.sender_id != ADMIN_ID:
-            return
-            
         detected_stat_channel = None
         detected_display_channel = None
         confirmation_pending.clear()
         predictor.reset()
+        sync_default_route()
         
         await event.respond("🔄 Bot réinitialisé avec succès")
-        print("Bot réinitialisé par l'administrateur")
+        logger.info("Bot réinitialisé par l'administrateur")
     except Exception as e:
-        print(f"Erreur dans reset_bot: {e}")
+        logger.error("Erreur dans reset_bot: %s", e)
 
-@client.on(events.NewMessage(pattern='/test_invite'))
+@commands.command('test_invite')
 async def test_invite(event):
     """Test sending invitation (admin only)"""
     try:
-        if event.sender_id != ADMIN_ID:
-            return
-            
         # Test invitation message
         test_msg = f"""🔔 **Test d'invitation**
 
@@ -282,18 +387,15 @@ async def test_invite(event):
 Ceci est un message de test pour vérifier les invitations."""
 
         await event.respond(test_msg)
-        print(f"Message de test envoyé à l'admin")
+        logger.info("Message de test envoyé à l'admin")
         
     except Exception as e:
-        print(f"Erreur dans test_invite: {e}")
+        logger.error("Erreur dans test_invite: %s", e)
 
-@client.on(events.NewMessage(pattern='/sta'))
+@commands.command('sta')
 async def show_trigger_numbers(event):
     """Show current trigger numbers for automatic predictions"""
     try:
-        if event.sender_id != ADMIN_ID:
-            return
-            
         trigger_nums = list(predictor.trigger_numbers)
         trigger_nums.sort()
         
@@ -307,167 +409,228 @@ async def show_trigger_numbers(event):
 • Format: "🔵 {{numéro}} 📌 D🔵 statut :''⌛''"
 
 📈 **Statistiques actuelles**:
-• Prédictions actives: {len([s for s in predictor.prediction_status.values() if s == '⌛'])}
+• Prédictions actives: {predictor.pending_count()}
 • Canal stats configuré: {'✅' if detected_stat_channel else '❌'}
 • Canal affichage configuré: {'✅' if detected_display_channel else '❌'}
 
 💡 **Canal détecté**: {detected_stat_channel if detected_stat_channel else 'Aucun'}"""
 
         await event.respond(msg)
-        print(f"Statut des déclencheurs envoyé à l'admin")
+        logger.info("Statut des déclencheurs envoyé à l'admin")
         
     except Exception as e:
-        print(f"Erreur dans show_trigger_numbers: {e}")
+        logger.error("Erreur dans show_trigger_numbers: %s", e)
         await event.respond(f"❌ Erreur: {e}")
 
 # --- TRAITEMENT DES MESSAGES DU CANAL DE STATISTIQUES ---
-@client.on(events.NewMessage())
 async def handle_messages(event):
-    """Handle messages from statistics channel"""
+    """Handle messages from statistics channels (registered by bind_stat_handlers)"""
     try:
-        # Ignore if no stat channel configured or message not from stat channel
-        if detected_stat_channel is None or event.chat_id != detected_stat_channel:
+        profiler.first_message()
+        MESSAGES.inc('received')
+
+        # Route the message to its table (O(1) lookup by chat_id)
+        shard = router.route(event.chat_id)
+        if shard is None:
+            MESSAGES.inc('filtered')
             return
+        table_predictor = shard.predictor
 
         message_text = event.message.message
         if not message_text:
+            MESSAGES.inc('filtered')
             return
 
-        print(f"📨 Message reçu du canal {event.chat_id}: {message_text}")
+        # Déduplication par (chat_id, message_id) : O(1) et stable entre redémarrages
+        if not table_predictor.is_new_message(event.chat_id, event.message.id):
+            logger.debug("🔁 Message %s déjà traité, ignoré", event.message.id)
+            MESSAGES.inc('filtered')
+            return
+
+        logger.debug("📨 Message reçu du canal %s: %s", event.chat_id, message_text)
+        table_predictor.remember_message(event.chat_id, event.message.id,
+                                         table_predictor.extract_game_number(message_text))
+        MESSAGES.inc('parsed')
+        tracer.mark('parse')
 
         # Check for prediction trigger
-        predicted, predicted_game, suit = predictor.should_predict(message_text)
+        predicted, predicted_game, suit = table_predictor.should_predict(message_text)
+        tracer.mark('should_predict')
         if predicted:
             prediction_text = f"🔵 {predicted_game} 📌 D🔵 statut :''⌛''"
-            sent_messages = await broadcast(prediction_text)
-            
-            # Store message IDs for later editing
-            if sent_messages and predicted_game:
-                for chat_id, message_id in sent_messages:
-                    predictor.store_prediction_message(predicted_game, message_id, chat_id)
-            
-            print(f"✅ Prédiction générée pour le jeu #{predicted_game}: {suit}")
+            # Message IDs are stored for later editing once the queue has sent them
+            await broadcast(prediction_text, shard, predicted_game, PRIORITY_PREDICTION)
+            PREDICTIONS_CREATED.inc('manual')
+
+            logger.info("✅ Prédiction générée pour le jeu #%s: %s (table %s)", predicted_game, suit, shard.stat_channel)
 
         # Check for prediction verification
-        verified, number = predictor.verify_prediction(message_text)
+        verified, number = table_predictor.verify_prediction(message_text)
+        tracer.mark('verify_prediction')
         if verified is not None and number is not None:
-            statut = predictor.prediction_status.get(number, 'Inconnu')
+            statut = table_predictor.prediction_status.get(number, 'Inconnu')
+            PREDICTIONS_VERIFIED.inc(statut)
             # Edit the original prediction message instead of sending new message
-            success = await edit_prediction_message(number, statut)
+            success = await edit_prediction_message(number, statut, shard)
             if success:
-                print(f"✅ Message de prédiction #{number} mis à jour avec statut: {statut}")
+                logger.info("✅ Message de prédiction #%s mis à jour avec statut: %s", number, statut)
             else:
-                print(f"⚠️ Impossible de mettre à jour le message #{number}, envoi d'un nouveau message")
+                logger.warning("⚠️ Impossible de mettre à jour le message #%s, envoi d'un nouveau message", number)
                 status_text = f"📍 Distribution 📌 Jeu #{number}: statut '{statut}'"
-                await broadcast(status_text)
+                await broadcast(status_text, shard)
 
-        # Generate periodic report every 20 predictions
-        if len(predictor.status_log) > 0 and len(predictor.status_log) % 20 == 0:
-            await generate_report()
+        # Reports are built and sent by the background report scheduler
+        reports.notify()
 
     except Exception as e:
-        print(f"Erreur dans handle_messages: {e}")
+        logger.error("Erreur dans handle_messages: %s", e)
 
-async def generate_report():
-    """Generate and broadcast periodic report with updated format"""
+async def handle_edited_messages(event):
+    """Re-verify only the game of an edited statistics message (⏰ → final result)"""
     try:
-        bilan = "📊 Bilan des 20 dernières prédictions :\n"
-        
-        recent_predictions = predictor.status_log[-20:]
-        for num, statut in recent_predictions:
-            bilan += f"🔵{num}📌 D🔵 statut :{statut}\n"
-        
-        # Calculate statistics
-        total = len(recent_predictions)
-        wins = sum(1 for _, status in recent_predictions if '✅' in status)
-        win_rate = (wins / total * 100) if total > 0 else 0
-        
-        bilan += f"\n📈 Statistiques: {wins}/{total} ({win_rate:.1f}% de réussite)"
-        
-        await broadcast(bilan)
-        print(f"Rapport généré: {wins}/{total} prédictions réussies")
-        
-    except Exception as e:
-        print(f"Erreur dans generate_report: {e}")
+        shard = router.route(event.chat_id)
+        if shard is None or not event.message:
+            return
+        table_predictor = shard.predictor
 
-# --- ENVOI VERS LES CANAUX ---
-async def broadcast(message):
-    """Broadcast message to display channel"""
-    global detected_display_channel
-    
-    sent_messages = []
-    if detected_display_channel:
-        try:
-            sent_message = await client.send_message(detected_display_channel, message)
-            sent_messages.append((detected_display_channel, sent_message.id))
-            print(f"Message diffusé: {message}")
-        except Exception as e:
-            print(f"Erreur lors de l'envoi: {e}")
-    else:
-        print("⚠️ Canal d'affichage non configuré")
-    
-    return sent_messages
+        game_number = table_predictor.game_for_message(event.chat_id, event.message.id)
+        if game_number is None or not table_predictor.awaits_result(game_number):
+            return
+
+        verified, number = table_predictor.verify_edited(event.message.message or "")
+        tracer.mark('verify_prediction')
+        if verified is not None and number is not None:
+            statut = table_predictor.prediction_status.get(number, 'Inconnu')
+            PREDICTIONS_VERIFIED.inc(statut)
+            if await edit_prediction_message(number, statut, shard):
+                logger.info("✏️ Message de prédiction #%s mis à jour après modification: %s", number, statut)
+            reports.notify()
 
-async def edit_prediction_message(game_number: int, new_status: str):
-    """Edit prediction message with new status"""
-    try:
-        message_info = predictor.get_prediction_message(game_number)
-        if message_info:
-            chat_id = message_info['chat_id']
-            message_id = message_info['message_id']
-            new_text = f"🔵 {game_number} 📌 D🔵 statut :{new_status}"
-            
-            await client.edit_message(chat_id, message_id, new_text)
-            print(f"Message de prédiction #{game_number} mis à jour avec statut: {new_status}")
-            return True
     except Exception as e:
-        print(f"Erreur lors de la modification du message: {e}")
-    return False
+        logger.error("Erreur dans handle_edited_messages: %s", e)
+
+# Stat-channel handlers, filtered by chat inside Telethon (re-bound when routes change)
+stat_handlers = (
+    FilteredHandler(client, timed(HANDLER_SECONDS, 'messages')(tracer.traced(handle_messages)), events.NewMessage),
+    FilteredHandler(client, timed(HANDLER_SECONDS, 'edited')(tracer.traced(handle_edited_messages)),
+                    events.MessageEdited),
+)
+
+def build_report(shard):
+    """Text of a table's report, from the predictor's rolling aggregates"""
+    table_predictor = shard.predictor
+    lines = ["📊 Bilan des 20 dernières prédictions :"]
+    lines.extend(f"🔵{num}📌 D🔵 statut :{statut}"
+                 for num, statut in table_predictor.get_recent_statuses(20))
+
+    # Agrégat glissant des derniers résultats, maintenu par le prédicteur
+    last_n = table_predictor.get_statistics()['last_n']
+    lines.append(f"\n📈 Statistiques: {last_n['wins']}/{last_n['total']} ({last_n['win_rate']:.1f}% de réussite)")
+    return "\n".join(lines)
+
+async def send_report(shard, text):
+    """Queue a report for the table's display channels at the lowest priority"""
+    await broadcast(text, shard, priority=PRIORITY_REPORT)
+
+# Reports are published by a background task, once per 20-result boundary
+reports = ReportScheduler(router, build_report, send_report)
+
+# --- ENVOI VERS LES CANAUX ---
+def prediction_key(table_predictor, game_number):
+    """Outbox key of a game's prediction sends (edits chain on them while still queued)"""
+    return (id(table_predictor), game_number)
+
+async def broadcast(message, shard=None, game_number=None, priority=PRIORITY_RESULT):
+    """Queue a message for the display channels of a table (main table by default)
+
+    The outbox fans the sends out concurrently, so latency does not grow with the
+    number of display channels. Returns the number of channels the message was
+    queued for. When game_number is given, each channel's message id is stored
+    on the table's predictor so later edits fan out the same way.
+    """
+    shard = shard or router.route(detected_stat_channel)
+
+    if not (shard and shard.display_channels):
+        logger.warning("⚠️ Canal d'affichage non configuré")
+        return 0
+
+    table_predictor = shard.predictor
+    key = prediction_key(table_predictor, game_number) if game_number else None
+    for channel_id in shard.display_channels:
+        on_sent = None
+        if game_number:
+            on_sent = (lambda sent, chat_id=channel_id:
+                       table_predictor.store_prediction_message(game_number, sent.id, chat_id))
+        outbox.send(channel_id, message, priority, on_sent, key)
+        logger.debug("Message mis en file pour %s: %s", channel_id, message)
+    return len(shard.display_channels)
+
+async def edit_prediction_message(game_number: int, new_status: str, shard=None):
+    """Queue an edit of the prediction messages with their new status on every display channel"""
+    table_predictor = shard.predictor if shard else predictor
+    new_text = f"🔵 {game_number} 📌 D🔵 statut :{new_status}"
+    messages = table_predictor.get_prediction_messages(game_number)
+    for message_info in messages:
+        outbox.edit(message_info['chat_id'], message_info['message_id'], new_text)
+    # Sends still queued (token bucket, FloodWait): chain the edit on them
+    known_chats = {message_info['chat_id'] for message_info in messages}
+    sends = outbox.pending_sends(prediction_key(table_predictor, game_number))
+    pending = {chat_id: sent for chat_id, sent in sends.items() if chat_id not in known_chats}
+    for chat_id, sent in pending.items():
+        outbox.edit_after(sent, chat_id, new_text)
+    if messages or pending:
+        logger.info("Message de prédiction #%s mis en file avec statut: %s", game_number, new_status)
+    return bool(messages or pending)
 
 # --- GESTION D'ERREURS ET RECONNEXION ---
 async def handle_connection_error():
     """Handle connection errors and attempt reconnection"""
-    print("Tentative de reconnexion...")
+    logger.info("Tentative de reconnexion...")
     await asyncio.sleep(5)
     try:
         await client.connect()
-        print("Reconnexion réussie")
+        logger.info("Reconnexion réussie")
     except Exception as e:
-        print(f"Échec de la reconnexion: {e}")
+        logger.error("Échec de la reconnexion: %s", e)
 
 # --- LANCEMENT ---
 async def main():
     """Main function to start the bot"""
-    print("Démarrage du bot Telegram sur Render.com...")
-    print(f"API_ID: {API_ID}")
-    print(f"Bot Token configuré: {'Oui' if BOT_TOKEN else 'Non'}")
-    print(f"Port configuré: {PORT}")
+    logger.info("Démarrage du bot Telegram sur Render.com...")
+    logger.info("API_ID: %s", API_ID)
+    logger.info("Bot Token configuré: %s", 'Oui' if BOT_TOKEN else 'Non')
+    logger.info("Port configuré: %s", PORT)
     
     # Validate configuration
     if not API_ID or not API_HASH or not BOT_TOKEN:
-        print("❌ Configuration manquante! Vérifiez vos variables d'environnement")
+        logger.error("❌ Configuration manquante! Vérifiez vos variables d'environnement")
         return
     
+    loop_monitor = asyncio.create_task(monitor_event_loop())
     try:
         # Start web server for health checks
         await start_web_server()
         
         # Start the bot
         if await start_bot():
-            print("✅ Bot en ligne et en attente de messages...")
+            logger.info("✅ Bot en ligne et en attente de messages...")
+            reports.start()
             await client.run_until_disconnected()
         else:
-            print("❌ Échec du démarrage du bot")
+            logger.error("❌ Échec du démarrage du bot")
             
     except KeyboardInterrupt:
-        print("\n🛑 Arrêt du bot demandé par l'utilisateur")
+        logger.info("🛑 Arrêt du bot demandé par l'utilisateur")
     except Exception as e:
-        print(f"❌ Erreur critique: {e}")
+        logger.error("❌ Erreur critique: %s", e)
         await handle_connection_error()
     finally:
+        loop_monitor.cancel()
+        reports.stop()
+        await outbox.close()
         try:
             await client.disconnect()
-            print("Bot déconnecté proprement")
+            logger.info("Bot déconnecté proprement")
         except:
             pass
 
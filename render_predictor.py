@@ -1,26 +1,83 @@
 import re
 import random
-from typing import Tuple, Optional, List
+from collections import deque
+from itertools import islice
+from typing import Dict, Tuple, Optional, List
+from card_codec import count_cards, normalize_suits
+from dedup import MessageGameIndex, MessageWatermarks
+from retention import RetentionWindow
+from rolling_stats import PredictionStats
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
 
 class CardPredictor:
     """Card game prediction engine with pattern matching and result verification"""
     
-    def __init__(self):
-        self.last_predictions = []  # Liste [(numéro, combinaison)]
+    def __init__(self, history_size: int = 500, retention_window: int = 1000,
+                 dedup_window: int = 32,
+                 rolling_size: int = 20, rolling_seconds: int = 3600):
+        self.last_predictions = deque(maxlen=history_size)  # Liste [(numéro, combinaison)]
         self.prediction_status = {}  # Statut des prédictions par numéro
-        self.processed_messages = set()  # Pour éviter les doublons
-        self.status_log = []  # Historique des statuts
+        self.seen_messages = MessageWatermarks(dedup_window)  # Dédup par (chat_id, message_id)
+        self.message_games = MessageGameIndex()  # (chat_id, message_id) -> jeu, pour les modifications
+        self.status_log = deque(maxlen=history_size)  # Historique des statuts
+        self.stats = PredictionStats(rolling_size, rolling_seconds)  # Compteurs O(1)
+        self._pending_count = 0  # Nombre de prédictions ⌛
         self.prediction_messages = {}  # Stockage des IDs de messages de prédiction
         self.trigger_numbers = [5, 7, 8]  # Numéros déclencheurs
+        self._resolved_window = RetentionWindow(retention_window)
         
     def reset(self):
         """Reset all prediction data"""
         self.last_predictions.clear()
         self.prediction_status.clear()
-        self.processed_messages.clear()
+        self.seen_messages.clear()
+        self.message_games.clear()
         self.status_log.clear()
+        self.stats.reset()
+        self._pending_count = 0
         self.prediction_messages.clear()
-        print("Données de prédiction réinitialisées")
+        self._resolved_window.clear()
+        logger.info("Données de prédiction réinitialisées")
+
+    def _set_final_status(self, game_number: int, statut: str):
+        """Store a non-pending status and evict entries leaving the retention window"""
+        if self.prediction_status.get(game_number) == '⌛':
+            self._pending_count -= 1
+        self.prediction_status[game_number] = statut
+        self.status_log.append((game_number, statut))
+        self.stats.record(statut)
+        for old in self._resolved_window.push(game_number):
+            if self.prediction_status.get(old) != '⌛':
+                self.prediction_status.pop(old, None)
+                self.prediction_messages.pop(old, None)
+
+    def is_new_message(self, chat_id: int, message_id: int) -> bool:
+        """First delivery of this Telegram message? (O(1), stable across restarts)"""
+        return self.seen_messages.is_new(chat_id, message_id)
+
+    def remember_message(self, chat_id: int, message_id: int, game_number: Optional[int]):
+        """Index the game of a stat message so a later edit can find it"""
+        if game_number is not None:
+            self.message_games.add(chat_id, message_id, game_number)
+
+    def game_for_message(self, chat_id: int, message_id: int) -> Optional[int]:
+        """Game number of an indexed stat message (None if unknown or evicted)"""
+        return self.message_games.get(chat_id, message_id)
+
+    def awaits_result(self, game_number: int) -> bool:
+        """Could this game still resolve a pending prediction (offsets 0/1/2)?"""
+        return any(self.prediction_status.get(game_number - offset) == '⌛' for offset in range(3))
+
+    @property
+    def status_total(self) -> int:
+        """Number of final statuses recorded since start (or last reset)"""
+        return self.stats.total
+
+    def pending_count(self) -> int:
+        """Number of pending (⌛) predictions"""
+        return self._pending_count
 
     def extract_game_number(self, message: str) -> Optional[int]:
         """Extract game number from message using pattern #N followed by digits"""
@@ -47,27 +104,12 @@ class CardPredictor:
             return []
 
     def count_total_cards(self, symbols_str: str) -> int:
-        """Count total card symbols in a string"""
-        card_symbols = ['♠️', '♥️', '♦️', '♣️', '♠', '♥', '♦', '♣']
-        count = 0
-        for symbol in card_symbols:
-            count += symbols_str.count(symbol)
-        return count
+        """Count total card symbols in a string (♠️ and ♠ both count as one card)"""
+        return count_cards(symbols_str)
 
     def normalize_suits(self, suits_str: str) -> str:
         """Normalize and sort card suits"""
-        # Map emoji versions to simple versions
-        suit_map = {
-            '♠️': '♠', '♥️': '♥', '♦️': '♦', '♣️': '♣'
-        }
-        
-        normalized = suits_str
-        for emoji, simple in suit_map.items():
-            normalized = normalized.replace(emoji, simple)
-        
-        # Extract only card symbols and sort them
-        suits = [c for c in normalized if c in '♠♥♦♣']
-        return ''.join(sorted(set(suits)))
+        return normalize_suits(suits_str)
 
     def should_predict(self, message: str) -> Tuple[bool, Optional[int], Optional[str]]:
         """Determine if a prediction should be made based on the message"""
@@ -99,35 +141,38 @@ class CardPredictor:
             if not suits:
                 return False, None, None
 
-            # Check for message duplication
-            message_hash = hash(message.strip())
-            if message_hash in self.processed_messages:
-                self.prediction_status[game_number] = 'déjà traité'
-                return False, None, None
-
-            # Mark as processed and create prediction
-            self.processed_messages.add(message_hash)
-            
             # Always predict for the next game ending in 0
             predicted_game = ((game_number // 10) + 1) * 10
             
+            if self.prediction_status.get(predicted_game) != '⌛':
+                self._pending_count += 1
             self.prediction_status[predicted_game] = '⌛'
             self.last_predictions.append((predicted_game, suits))
             
-            print(f"Prédiction créée: Jeu #{predicted_game} -> {suits} (basée sur #{game_number})")
+            logger.info("Prédiction créée: Jeu #%s -> %s (basée sur #%s)", predicted_game, suits, game_number)
             return True, predicted_game, suits
 
         except Exception as e:
-            print(f"Erreur dans should_predict: {e}")
+            logger.error("Erreur dans should_predict: %s", e)
             return False, None, None
     
     def store_prediction_message(self, game_number: int, message_id: int, chat_id: int):
-        """Store prediction message ID for later editing"""
-        self.prediction_messages[game_number] = {'message_id': message_id, 'chat_id': chat_id}
+        """Store prediction message ID for later editing (one entry per display channel)"""
+        messages = self.prediction_messages.setdefault(game_number, [])
+        for info in messages:
+            if info['chat_id'] == chat_id:
+                info['message_id'] = message_id
+                return
+        messages.append({'message_id': message_id, 'chat_id': chat_id})
         
     def get_prediction_message(self, game_number: int):
-        """Get stored prediction message details"""
-        return self.prediction_messages.get(game_number)
+        """Get stored prediction message details (first display channel)"""
+        messages = self.prediction_messages.get(game_number)
+        return messages[0] if messages else None
+
+    def get_prediction_messages(self, game_number: int) -> List[Dict]:
+        """Get stored prediction message details for every display channel"""
+        return list(self.prediction_messages.get(game_number, ()))
 
     def verify_prediction(self, message: str) -> Tuple[Optional[bool], Optional[int]]:
         """Verify prediction results based on verification message"""
@@ -170,61 +215,44 @@ class CardPredictor:
                         else:
                             statut = '✅2️⃣'  # 2 games late
                             
-                        self.prediction_status[target_number] = statut
-                        self.status_log.append((target_number, statut))
-                        print(f"Prédiction réussie: Jeu #{target_number} avec offset {offset}")
+                        self._set_final_status(target_number, statut)
+                        logger.info("Prédiction réussie: Jeu #%s avec offset %s", target_number, offset)
                         return True, target_number
                     else:
                         # Failed prediction
-                        statut = '❌❌'
-                        self.prediction_status[target_number] = statut
-                        self.status_log.append((target_number, statut))
-                        print(f"Prédiction échouée: Jeu #{target_number}")
+                        self._set_final_status(target_number, '❌❌')
+                        logger.info("Prédiction échouée: Jeu #%s", target_number)
                         return False, target_number
 
             return None, None
 
         except Exception as e:
-            print(f"Erreur dans verify_prediction: {e}")
+            logger.error("Erreur dans verify_prediction: %s", e)
             return None, None
 
+    def verify_edited(self, message: str) -> Tuple[Optional[bool], Optional[int]]:
+        """Re-verify an edited stat message (verification only looks at its own game window)"""
+        return self.verify_prediction(message)
+
     def get_statistics(self) -> dict:
-        """Get prediction statistics"""
-        try:
-            total_predictions = len(self.status_log)
-            if total_predictions == 0:
-                return {
-                    'total': 0,
-                    'wins': 0,
-                    'losses': 0,
-                    'pending': len([s for s in self.prediction_status.values() if s == '⏳']),
-                    'win_rate': 0.0
-                }
-
-            wins = sum(1 for _, status in self.status_log if '✅' in status)
-            losses = sum(1 for _, status in self.status_log if '❌' in status or '⭕' in status)
-            pending = len([s for s in self.prediction_status.values() if s == '⌛'])
-            win_rate = (wins / total_predictions * 100) if total_predictions > 0 else 0.0
-
-            return {
-                'total': total_predictions,
-                'wins': wins,
-                'losses': losses,
-                'pending': pending,
-                'win_rate': win_rate
-            }
-        except Exception as e:
-            print(f"Erreur dans get_statistics: {e}")
-            return {'total': 0, 'wins': 0, 'losses': 0, 'pending': 0, 'win_rate': 0.0}
+        """Get prediction statistics (running counters, constant time)"""
+        return self.stats.snapshot(self._pending_count)
+
+    def get_recent_statuses(self, count: int = 20) -> List[Tuple[int, str]]:
+        """Get the last final statuses, oldest first"""
+        recent = list(islice(reversed(self.status_log), count))
+        recent.reverse()
+        return recent
 
     def get_recent_predictions(self, count: int = 10) -> List[Tuple[int, str]]:
         """Get recent predictions with their status"""
         try:
             recent = []
-            for game_num, suits in self.last_predictions[-count:]:
+            last = list(islice(reversed(self.last_predictions), count))
+            for game_num, suits in reversed(last):
                 status = self.prediction_status.get(game_num, '⌛')
                 recent.append((game_num, suits, status))
             return recent
         except Exception as e:
-            print(f"Erreur dans get_recent_predictions: {e}")
+            logger.error("Erreur dans get_recent_predictions: %s", e)
             return []
\ No newline at end of file
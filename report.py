@@ -0,0 +1,103 @@
+"""
+Bilans périodiques des tables, construits et envoyés hors du chemin des messages.
+
+Avant, ``handle_messages`` produisait le bilan dès que ``status_total % 20 == 0`` :
+tant qu'aucun nouveau résultat n'arrivait, chaque message suivant renvoyait le
+même bilan. Ici, le gestionnaire de messages se contente de ``notify`` (réveil
+d'une tâche de fond, coût constant) ; la tâche compare pour chaque table le
+palier atteint (``status_total // every``) au dernier palier publié, et n'envoie
+qu'un bilan par palier franchi. Avec ``interval`` (REPORT_INTERVAL), un bilan
+part aussi toutes les ``interval`` secondes pour une table ayant de nouveaux
+résultats depuis le précédent.
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ReportScheduler:
+    """Tâche de fond publiant un bilan par palier de ``every`` résultats (et par intervalle)"""
+
+    def __init__(self, router, build: Callable[[object], str], send: Callable[[object, str], Awaitable],
+                 every: Optional[int] = None, interval: Optional[float] = None):
+        """
+        Args:
+            router: Routeur des tables (itérable de shards)
+            build: Texte du bilan d'une table (agrégats glissants du prédicteur)
+            send: Envoi du bilan aux canaux d'affichage de la table (priorité basse)
+            every: Résultats par bilan (REPORT_EVERY, 20 par défaut)
+            interval: Secondes entre deux bilans périodiques (REPORT_INTERVAL, 0 = désactivé)
+        """
+        self.router = router
+        self.build = build
+        self.send = send
+        self.every = every or int(os.getenv('REPORT_EVERY', '20'))
+        self.interval = float(os.getenv('REPORT_INTERVAL', '0')) if interval is None else interval
+        self._boundaries: Dict[int, int] = {}  # canal stats -> dernier palier publié
+        self._totals: Dict[int, int] = {}  # canal stats -> status_total au dernier bilan
+        self._last_report: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.sent = 0
+
+    def start(self):
+        """Lance la tâche de fond ; les paliers déjà atteints ne sont pas republiés"""
+        for shard in self.router:
+            self._remember(shard, time.monotonic())
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def notify(self):
+        """Un résultat a peut-être été enregistré (appel depuis le chemin des messages)"""
+        self._wakeup.set()
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _remember(self, shard, now: float):
+        total = shard.predictor.status_total
+        self._boundaries[shard.stat_channel] = total // self.every
+        self._totals[shard.stat_channel] = total
+        self._last_report[shard.stat_channel] = now
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval or None)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.check()
+            except Exception as e:
+                logger.error("Erreur dans le planificateur de bilans: %s", e)
+
+    async def check(self):
+        """Publie les bilans dus : palier franchi, ou intervalle écoulé avec de nouveaux résultats"""
+        now = time.monotonic()
+        for shard in list(self.router):
+            channel = shard.stat_channel
+            total = shard.predictor.status_total
+            if channel not in self._boundaries or total < self._totals[channel]:
+                # Nouvelle table ou compteurs remis à zéro : repartir du palier courant
+                self._remember(shard, now)
+                continue
+
+            boundary_crossed = total // self.every > self._boundaries[channel]
+            interval_due = (self.interval and total > self._totals[channel]
+                            and now - self._last_report[channel] >= self.interval)
+            if boundary_crossed or interval_due:
+                self._remember(shard, now)
+                await self.send(shard, self.build(shard))
+                self.sent += 1
+                logger.info("📊 Bilan publié pour la table %s (%s résultats)", channel, total)
+
+    def stats(self) -> Dict[str, float]:
+        return {'sent': self.sent, 'every': self.every, 'interval': self.interval}
@@ -0,0 +1,77 @@
+"""
+Structures à mémoire bornée pour l'état du prédicteur.
+
+Le bot tourne pendant des semaines : tout ce qui est conservé par message
+(déduplication, statuts résolus, IDs de messages) doit plafonner en mémoire.
+"""
+import time
+from collections import OrderedDict, deque
+from typing import Hashable, Iterator, List, Optional
+
+
+class BoundedSet:
+    """Ensemble LRU borné, avec durée de vie optionnelle, pour la déduplication"""
+
+    def __init__(self, maxlen: int = 5000, ttl: Optional[float] = None):
+        """
+        Args:
+            maxlen: Nombre maximal d'éléments conservés (les plus anciens sont évincés)
+            ttl: Durée de vie en secondes d'un élément (None = illimitée)
+        """
+        self.maxlen = maxlen
+        self.ttl = ttl
+        self._items = OrderedDict()
+
+    def __contains__(self, item: Hashable) -> bool:
+        added_at = self._items.get(item)
+        if added_at is None:
+            return False
+        if self.ttl is not None and time.monotonic() - added_at > self.ttl:
+            del self._items[item]
+            return False
+        self._items.move_to_end(item)
+        return True
+
+    def add(self, item: Hashable):
+        """Ajoute (ou rafraîchit) un élément et évince les plus anciens"""
+        self._items[item] = time.monotonic()
+        self._items.move_to_end(item)
+        while len(self._items) > self.maxlen:
+            self._items.popitem(last=False)
+
+    def discard(self, item: Hashable):
+        self._items.pop(item, None)
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._items))
+
+
+class RetentionWindow:
+    """Fenêtre glissante des N dernières clés résolues, dans l'ordre de résolution"""
+
+    def __init__(self, size: int = 1000):
+        self.size = size
+        self._order = deque()
+
+    def push(self, key: Hashable) -> List[Hashable]:
+        """Enregistre une clé résolue et retourne les clés sorties de la fenêtre"""
+        self._order.append(key)
+        evicted = []
+        while len(self._order) > self.size:
+            evicted.append(self._order.popleft())
+        return evicted
+
+    def clear(self):
+        self._order.clear()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._order))
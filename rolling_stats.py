@@ -0,0 +1,138 @@
+"""
+Agrégats glissants à taille fixe pour les statistiques de prédiction.
+
+Mis à jour en O(1) au moment où une prédiction reçoit son statut final, pour que
+/status, /info, /report et les bilans répondent en temps constant.
+"""
+import time
+from collections import deque
+from typing import Dict, Optional
+
+WIN_OFFSETS = {'✅0️⃣': 0, '✅1️⃣': 1, '✅2️⃣': 2}
+
+
+def win_offset(statut: str) -> Optional[int]:
+    """Offset d'une réussite (0, 1, 2) ou None si le statut n'est pas une réussite"""
+    offset = WIN_OFFSETS.get(statut)
+    if offset is None and '✅' in statut:
+        return 0
+    return offset
+
+
+class RollingCounter:
+    """Réussites parmi les N derniers résultats (somme courante sur un tampon circulaire)"""
+
+    def __init__(self, size: int = 20):
+        self.size = size
+        self._results = deque(maxlen=size)
+        self._wins = 0
+
+    def add(self, win: bool):
+        if len(self._results) == self.size:
+            self._wins -= self._results[0]
+        self._results.append(win)
+        self._wins += win
+
+    def clear(self):
+        self._results.clear()
+        self._wins = 0
+
+    def snapshot(self) -> Dict[str, float]:
+        total = len(self._results)
+        return {
+            'total': total,
+            'wins': self._wins,
+            'win_rate': (self._wins / total * 100) if total else 0.0,
+        }
+
+
+class TimeWindowCounter:
+    """Réussites sur une fenêtre de temps glissante, découpée en seaux de taille fixe"""
+
+    def __init__(self, window_seconds: int = 3600, buckets: int = 60):
+        self.bucket_seconds = max(1, window_seconds // buckets)
+        self.buckets = buckets
+        self._ids = [-1] * buckets
+        self._totals = [0] * buckets
+        self._wins = [0] * buckets
+
+    def _slot(self, now: float) -> int:
+        bucket_id = int(now // self.bucket_seconds)
+        slot = bucket_id % self.buckets
+        if self._ids[slot] != bucket_id:
+            # Seau réutilisé : il appartenait à une période sortie de la fenêtre
+            self._ids[slot] = bucket_id
+            self._totals[slot] = 0
+            self._wins[slot] = 0
+        return slot
+
+    def add(self, win: bool, now: Optional[float] = None):
+        slot = self._slot(time.time() if now is None else now)
+        self._totals[slot] += 1
+        self._wins[slot] += win
+
+    def clear(self):
+        self._ids = [-1] * self.buckets
+        self._totals = [0] * self.buckets
+        self._wins = [0] * self.buckets
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, float]:
+        current = int((time.time() if now is None else now) // self.bucket_seconds)
+        oldest = current - self.buckets + 1
+        total = wins = 0
+        for slot in range(self.buckets):
+            if self._ids[slot] >= oldest:
+                total += self._totals[slot]
+                wins += self._wins[slot]
+        return {
+            'total': total,
+            'wins': wins,
+            'win_rate': (wins / total * 100) if total else 0.0,
+        }
+
+
+class PredictionStats:
+    """Compteurs cumulés et fenêtres glissantes des statuts finaux"""
+
+    def __init__(self, last_n: int = 20, window_seconds: int = 3600):
+        self.last_n = RollingCounter(last_n)
+        self.last_hour = TimeWindowCounter(window_seconds)
+        self.reset()
+
+    def reset(self):
+        self.total = 0
+        self.wins_by_offset = [0, 0, 0]
+        self.losses = 0
+        self.last_n.clear()
+        self.last_hour.clear()
+
+    @property
+    def wins(self) -> int:
+        return sum(self.wins_by_offset)
+
+    def record(self, statut: str):
+        """Enregistre un statut final (réussite ✅N️⃣ ou échec ❌/⭕)"""
+        self.total += 1
+        offset = win_offset(statut)
+        win = offset is not None
+        if win:
+            self.wins_by_offset[min(offset, 2)] += 1
+        elif '❌' in statut or '⭕' in statut:
+            self.losses += 1
+        self.last_n.add(win)
+        self.last_hour.add(win)
+
+    def snapshot(self, pending: int) -> Dict:
+        wins = self.wins
+        return {
+            'total': self.total,
+            'wins': wins,
+            'wins_by_offset': {'✅0️⃣': self.wins_by_offset[0],
+                               '✅1️⃣': self.wins_by_offset[1],
+                               '✅2️⃣': self.wins_by_offset[2]},
+            'losses': self.losses,
+            'pending': pending,
+            'win_rate': (wins / self.total * 100) if self.total else 0.0,
+            'last_n': self.last_n.snapshot(),
+            'last_hour': self.last_hour.snapshot(),
+        }
@@ -0,0 +1,147 @@
+"""
+Routage multi-tables : un processus, plusieurs paires canal stats → canaux d'affichage.
+
+Chaque canal de statistiques possède son propre shard (CardPredictor dédié,
+planificateur optionnel, ensemble de canaux d'affichage). La résolution d'un
+message entrant est une simple recherche dans un dictionnaire (O(1)).
+"""
+from typing import Callable, Dict, Iterator, List, Optional
+
+from predictor import CardPredictor
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class ChannelShard:
+    """Une table de jeu : canal de statistiques, prédicteur et canaux d'affichage"""
+
+    def __init__(self, stat_channel: int, predictor, display_channels: Optional[List[int]] = None):
+        self.stat_channel = stat_channel
+        self.predictor = predictor
+        self.display_channels = list(dict.fromkeys(display_channels or []))
+        self.scheduler = None
+
+    def add_display(self, channel_id: int) -> bool:
+        if channel_id in self.display_channels:
+            return False
+        self.display_channels.append(channel_id)
+        return True
+
+    def remove_display(self, channel_id: int) -> bool:
+        if channel_id not in self.display_channels:
+            return False
+        self.display_channels.remove(channel_id)
+        return True
+
+
+class ChannelRouter:
+    """Associe chaque chat_id de statistiques à son shard"""
+
+    def __init__(self, predictor_factory: Callable[[], object] = CardPredictor):
+        self.predictor_factory = predictor_factory
+        self._shards: Dict[int, ChannelShard] = {}
+        # Paire historique /set_stat + /set_display, sauvegardée à part
+        self.default_stat: Optional[int] = None
+        self.default_display: Optional[int] = None
+
+    def route(self, chat_id: int) -> Optional[ChannelShard]:
+        """Shard du canal de statistiques, ou None si le chat n'est pas routé"""
+        return self._shards.get(chat_id)
+
+    def add_route(self, stat_channel: int, display_channel: Optional[int] = None) -> ChannelShard:
+        """Ajoute un canal d'affichage à une table (créée avec son propre prédicteur si besoin)"""
+        shard = self._shards.get(stat_channel)
+        if shard is None:
+            shard = ChannelShard(stat_channel, self.predictor_factory())
+            self._shards[stat_channel] = shard
+            logger.info("🧭 Nouvelle table: canal stats %s", stat_channel)
+        if display_channel is not None and shard.add_display(display_channel):
+            logger.info("🧭 Route ajoutée: %s → %s", stat_channel, display_channel)
+        return shard
+
+    def remove_route(self, stat_channel: int, display_channel: Optional[int] = None) -> bool:
+        """Retire un canal d'affichage, ou toute la table si display_channel est None"""
+        shard = self._shards.get(stat_channel)
+        if shard is None:
+            return False
+        if display_channel is None:
+            if stat_channel == self.default_stat:
+                return False  # La paire historique se gère via /set_stat et /reset
+            del self._shards[stat_channel]
+            logger.info("🧭 Table supprimée: canal stats %s", stat_channel)
+            return True
+        removed = shard.remove_display(display_channel)
+        if removed:
+            logger.info("🧭 Route retirée: %s → %s", stat_channel, display_channel)
+        return removed
+
+    def set_default(self, stat_channel: Optional[int], display_channel: Optional[int], predictor):
+        """Synchronise la paire historique (detected_stat_channel / detected_display_channel)"""
+        previous = self._shards.get(self.default_stat) if self.default_stat is not None else None
+        if previous is not None:
+            if self.default_display is not None:
+                previous.remove_display(self.default_display)
+            if previous.stat_channel != stat_channel:
+                if previous.display_channels:
+                    # L'ancienne table garde ses routes mais plus le prédicteur historique
+                    previous.predictor = self.predictor_factory()
+                    previous.scheduler = None
+                else:
+                    del self._shards[previous.stat_channel]
+
+        self.default_stat = stat_channel
+        self.default_display = display_channel
+        if stat_channel is None:
+            return None
+        shard = self._shards.get(stat_channel)
+        if shard is None:
+            shard = ChannelShard(stat_channel, predictor)
+            self._shards[stat_channel] = shard
+        else:
+            shard.predictor = predictor
+        if display_channel is not None:
+            shard.add_display(display_channel)
+        return shard
+
+    def stat_channels(self) -> List[int]:
+        return list(self._shards)
+
+    def to_config(self) -> Dict[str, List[int]]:
+        """Routes sérialisables (hors paire historique, sauvegardée à part)"""
+        routes = {}
+        for stat, shard in self._shards.items():
+            displays = [d for d in shard.display_channels
+                        if not (stat == self.default_stat and d == self.default_display)]
+            if displays or stat != self.default_stat:
+                routes[str(stat)] = displays
+        return routes
+
+    def load_config(self, routes: Optional[Dict[str, List[int]]]):
+        """Recharge les routes sauvegardées par to_config()"""
+        for stat, displays in (routes or {}).items():
+            shard = self.add_route(int(stat))
+            for display in displays:
+                shard.add_display(int(display))
+
+    def export_states(self) -> Dict[int, Dict]:
+        """État de chaque prédicteur, indexé par canal de statistiques (voir snapshot.py)"""
+        return {stat: shard.predictor.export_state() for stat, shard in self._shards.items()}
+
+    def restore_states(self, states: Dict[int, Dict]) -> int:
+        """Restaure les tables encore routées et retourne leur nombre"""
+        restored = 0
+        for stat, state in states.items():
+            shard = self._shards.get(stat)
+            if shard is None:
+                logger.info("🧭 Instantané de la table %s ignoré (plus routée)", stat)
+                continue
+            shard.predictor.restore_state(state)
+            restored += 1
+        return restored
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def __iter__(self) -> Iterator[ChannelShard]:
+        return iter(list(self._shards.values()))
@@ -1,15 +1,25 @@
 import random
 import asyncio
+import copy
 import yaml
 import os
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 from telethon import TelegramClient
+from message_parser import ParsedStatMessage, ensure_parsed
+from card_codec import count_cards
+from outbox import OutboundQueue, PRIORITY_PREDICTION
+from persistence import PersistenceService, atomic_write
+from bot_logging import get_logger
+from metrics import PREDICTIONS_CREATED, SCHEDULER_LAG
+
+logger = get_logger(__name__)
 
 class PredictionScheduler:
     """Système de planification automatique des prédictions"""
     
-    def __init__(self, client: TelegramClient, predictor, source_channel_id: int, target_channel_id: int):
+    def __init__(self, client: TelegramClient, predictor, source_channel_id: int, target_channel_id: int,
+                 outbox: Optional[OutboundQueue] = None, *, persistence: PersistenceService):
         """
         Initialise le planificateur
         
@@ -18,14 +28,21 @@ class PredictionScheduler:
             predictor: Instance du CardPredictor
             source_channel_id: ID du canal source pour vérification
             target_channel_id: ID du canal cible pour diffusion
+            outbox: File d'envoi partagée avec le bot (une file dédiée sinon)
+            persistence: Écritures différées du bot, vidées à l'arrêt (obligatoire : un
+                service propre au planificateur ne serait jamais vidé)
         """
         self.client = client
+        self.outbox = outbox or OutboundQueue(client)
         self.predictor = predictor
         self.source_channel_id = source_channel_id
         self.target_channel_id = target_channel_id
         self.schedule_file = "prediction.yaml"
         self.is_running = False
         self.schedule_data = {}
+        self._schedule_to_save: Dict[str, Any] = {}
+        self._schedule_writer = persistence.track(
+            'planification', self._capture_schedule, self._write_schedule)
         
     def generate_next_prediction_time(self, current_time: datetime = None) -> Dict[str, Any]:
         """Génère la prochaine prédiction avec lancement variable (1-4 min avant)"""
@@ -96,18 +113,28 @@ class PredictionScheduler:
                 "launch_offset": launch_offset_minutes
             }
         
-        print(f"✅ Planification avec lancement variable générée: {num_predictions} prédictions")
-        print(f"    Variations de lancement: 1-4 minutes avant chaque prédiction")
+        logger.info("✅ Planification avec lancement variable générée: %s prédictions", num_predictions)
+        logger.info("    Variations de lancement: 1-4 minutes avant chaque prédiction")
         return planification
     
     def save_schedule(self, schedule_data: Dict[str, Any]):
-        """Sauvegarde la planification dans le fichier YAML"""
-        try:
-            with open(self.schedule_file, "w", encoding='utf-8') as f:
-                yaml.dump(schedule_data, f, allow_unicode=True, default_flow_style=False)
-            print(f"✅ Planification sauvegardée dans {self.schedule_file}")
-        except Exception as e:
-            print(f"❌ Erreur sauvegarde planification: {e}")
+        """Demande la sauvegarde de la planification (différée, regroupée et atomique)"""
+        self._schedule_to_save = schedule_data
+        self._schedule_writer.mark_dirty()
+
+    async def flush_schedule(self) -> bool:
+        """Écrit sans attendre la planification en attente de sauvegarde ; faux si l'écriture a échoué"""
+        await self._schedule_writer.flush()
+        return not self._schedule_writer.dirty
+
+    def _capture_schedule(self) -> Dict[str, Any]:
+        # Copie prise sur la boucle : le thread d'écriture ne voit pas les modifications suivantes
+        return copy.deepcopy(self._schedule_to_save)
+
+    def _write_schedule(self, schedule_data: Dict[str, Any]):
+        text = yaml.dump(schedule_data, allow_unicode=True, default_flow_style=False)
+        atomic_write(self.schedule_file, text.encode('utf-8'))
+        logger.info("✅ Planification sauvegardée dans %s", self.schedule_file)
     
     def load_schedule(self) -> Dict[str, Any]:
         """Charge la planification depuis le fichier YAML"""
@@ -115,13 +142,13 @@ class PredictionScheduler:
             if os.path.exists(self.schedule_file):
                 with open(self.schedule_file, "r", encoding='utf-8') as f:
                     data = yaml.safe_load(f) or {}
-                print(f"✅ Planification chargée: {len(data)} entrées")
+                logger.info("✅ Planification chargée: %s entrées", len(data))
                 return data
             else:
-                print("ℹ️ Aucune planification existante, génération d'une nouvelle")
+                logger.info("ℹ️ Aucune planification existante, génération d'une nouvelle")
                 return {}
         except Exception as e:
-            print(f"❌ Erreur chargement planification: {e}")
+            logger.error("❌ Erreur chargement planification: %s", e)
             return {}
     
     def get_current_time_slot(self) -> str:
@@ -157,11 +184,11 @@ class PredictionScheduler:
             self.schedule_data[numero] = new_prediction
             self.save_schedule(self.schedule_data)
             
-            print(f"✅ Nouvelle prédiction ajoutée: {numero} à {new_prediction['heure_lancement']}")
+            logger.info("✅ Nouvelle prédiction ajoutée: %s à %s", numero, new_prediction['heure_lancement'])
             return numero
             
         except Exception as e:
-            print(f"❌ Erreur ajout prédiction: {e}")
+            logger.error("❌ Erreur ajout prédiction: %s", e)
             return None
     
     def get_predictions_to_verify(self) -> list:
@@ -174,17 +201,27 @@ class PredictionScheduler:
                 to_verify.append((numero, data))
         return to_verify
     
+    @staticmethod
+    def launch_lag(heure_lancement: str, now: datetime = None) -> float:
+        """Secondes écoulées depuis l'heure de lancement prévue (HH:MM, aujourd'hui)"""
+        now = now or datetime.now()
+        hour, minute = map(int, heure_lancement.split(':'))
+        planned = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return max(0.0, (now - planned).total_seconds())
+
     async def launch_prediction(self, numero: str, data: Dict[str, Any]):
         """Lance une prédiction automatique selon le nouveau format"""
         try:
+            SCHEDULER_LAG.observe(self.launch_lag(data['heure_lancement']))
+
             # Vérifier les doublons avant de lancer
             game_number = int(numero.replace('N', ''))
             if game_number in self.predictor.prediction_status:
-                print(f"❌ Prédiction déjà existante pour {numero}, abandon du lancement automatique")
+                logger.warning("❌ Prédiction déjà existante pour %s, abandon du lancement automatique", numero)
                 return False
             
             # Marquer comme prédiction automatique pour éviter les conflits
-            self.predictor.processed_messages.add(f"auto_prediction_{game_number}")
+            self.predictor.mark_auto_prediction(game_number)
             
             # Génère une prédiction aléatoire de couleurs (2K/2K format)
             suit_prediction = self.generate_suit_prediction()
@@ -193,8 +230,11 @@ class PredictionScheduler:
             game_number = int(numero.replace('N', ''))
             prediction_text = f"🎯Nº:{game_number} 🔵Dis🔵tri🚥:statut :⌛"
             
-            # Envoie le message au canal cible
-            sent_message = await self.client.send_message(self.target_channel_id, prediction_text)
+            # Envoie le message au canal cible (file d'envoi prioritaire)
+            sent_message = await self.outbox.send(self.target_channel_id, prediction_text, PRIORITY_PREDICTION)
+            if sent_message is None:
+                logger.error("❌ Envoi de la prédiction automatique %s impossible", numero)
+                return False
             
             # Met à jour les données
             data["launched"] = True
@@ -202,17 +242,18 @@ class PredictionScheduler:
             data["chat_id"] = self.target_channel_id
             data["prediction_format"] = suit_prediction
             
-            # Ajouter à la prédiction status pour éviter les doublons
-            self.predictor.prediction_status[game_number] = '⌛'
+            # Ajouter aux prédictions en attente (statut + index) pour éviter les doublons
+            self.predictor.add_pending(game_number)
+            PREDICTIONS_CREATED.inc('auto')
             
             # Sauvegarde
             self.save_schedule(self.schedule_data)
             
-            print(f"🚀 Prédiction automatique lancée: {numero} ({suit_prediction}) à {data['heure_lancement']}")
+            logger.info("🚀 Prédiction automatique lancée: %s (%s) à %s", numero, suit_prediction, data['heure_lancement'])
             return True
             
         except Exception as e:
-            print(f"❌ Erreur lancement prédiction {numero}: {e}")
+            logger.error("❌ Erreur lancement prédiction %s: %s", numero, e)
             return False
     
     def generate_suit_prediction(self) -> str:
@@ -234,7 +275,7 @@ class PredictionScheduler:
         3. Vérifie le numéro +2 (offset 2) → ✅2️⃣
         4. Sinon → 📌❌
         """
-        print(f"🔍 Vérification du statut pour {numero}")
+        logger.info("🔍 Vérification du statut pour %s", numero)
         
         # Cette fonction sera appelée depuis le bot principal lors du traitement des messages
         # Elle ne fait plus de requêtes API directes mais utilise les messages reçus
@@ -248,71 +289,49 @@ class PredictionScheduler:
                 game_number = int(numero.replace('N', ''))
                 new_text = f"🎯Nº:{game_number} 🔵Dis🔵tri🚥:statut :{new_status}"
 
-                await self.client.edit_message(
-                    data["chat_id"], 
-                    data["message_id"], 
-                    new_text
-                )
-                print(f"📝 Message automatique {numero} mis à jour: {new_status}")
+                # Mis en file : le gestionnaire de messages n'attend pas Telegram
+                self.outbox.edit(data["chat_id"], data["message_id"], new_text)
+                logger.info("📝 Message automatique %s mis en file: %s", numero, new_status)
         except Exception as e:
-            print(f"❌ Erreur mise à jour message {numero}: {e}")
+            logger.error("❌ Erreur mise à jour message %s: %s", numero, e)
     
     def check_card_distribution(self, group1: str, group2: str) -> bool:
         """
         Vérifie si chaque groupe a exactement 2 cartes (symboles)
-        Selon l'algorithme : ne compte que ♠️, ♣️, ♥️, ♦️
+        Selon l'algorithme : ne compte que ♠️, ♣️, ♥️, ♦️ (codec partagé card_codec)
         """
-        def count_cards(symbols_str: str) -> int:
-            # Compter d'abord les versions emoji, puis les versions simples
-            emoji_symbols = ['♠️', '♥️', '♦️', '♣️']
-            simple_symbols = ['♠', '♥', '♦', '♣']
-            
-            temp_str = symbols_str
-            emoji_count = 0
-            
-            for emoji in emoji_symbols:
-                count = temp_str.count(emoji)
-                emoji_count += count
-                temp_str = temp_str.replace(emoji, 'X')
-            
-            simple_count = 0
-            for symbol in simple_symbols:
-                simple_count += temp_str.count(symbol)
-                
-            return emoji_count + simple_count
-        
         count1 = count_cards(group1)
         count2 = count_cards(group2)
         
-        print(f"🃏 Comptage cartes: groupe1='{group1}'→{count1}, groupe2='{group2}'→{count2}")
+        logger.debug("🃏 Comptage cartes: groupe1='%s'→%s, groupe2='%s'→%s", group1, count1, group2, count2)
         return count1 == 2 and count2 == 2
     
-    def verify_prediction_from_message(self, message_text: str, predicted_numbers: list) -> tuple:
+    def verify_prediction_from_message(self, message: Union[str, ParsedStatMessage], predicted_numbers: list) -> tuple:
         """
         Vérifie une prédiction selon l'algorithme spécifié :
         1. Cherche le numéro exact (offset 0) → ✅0️⃣
         2. Cherche le numéro suivant (offset 1) → ✅1️⃣  
         3. Cherche le numéro +2 (offset 2) → ✅2️⃣
         4. Sinon → 📌❌
+
+        Accepte le texte brut ou le ParsedStatMessage déjà produit par le bot.
         """
-        import re
-        
-        # Extrait le numéro du message
-        match = re.search(r"#N(\d+)\.", message_text)
-        if not match:
+        parsed = ensure_parsed(message)
+
+        current_number = parsed.game_number
+        if current_number is None:
             return None, None
-        
-        current_number = int(match.group(1))
-        print(f"🔍 Message reçu pour #N{current_number}")
-        
-        # Extrait les groupes de cartes entre parenthèses
-        groups = re.findall(r"\(([^)]*)\)", message_text)
-        if len(groups) < 2:
-            print(f"❌ Groupes insuffisants dans le message: {groups}")
+
+        logger.debug("🔍 Message reçu pour #N%s", current_number)
+
+        # Groupes de cartes déjà extraits par le parseur
+        if len(parsed.groups) < 2:
+            logger.debug("❌ Groupes insuffisants dans le message: %s", list(parsed.groups))
             return None, None
-        
-        group1, group2 = groups[0], groups[1]
-        
+
+        group1, group2 = parsed.groups[0], parsed.groups[1]
+        count1, count2 = parsed.card_counts[0], parsed.card_counts[1]
+
         # Vérifie si ce message correspond à une prédiction
         for predicted_num in predicted_numbers:
             # Offsets possibles : 0, 1, 2
@@ -320,10 +339,11 @@ class PredictionScheduler:
                 target_number = predicted_num + offset
                 
                 if current_number == target_number:
-                    print(f"🎯 Correspondance trouvée: prédiction N{predicted_num:03d} vs message N{current_number} (offset {offset})")
+                    logger.debug("🎯 Correspondance trouvée: prédiction N%03d vs message N%s (offset %s)", predicted_num, current_number, offset)
+                    logger.debug("🃏 Comptage cartes: groupe1='%s'→%s, groupe2='%s'→%s", group1, count1, group2, count2)
                     
                     # Vérifie la distribution des cartes
-                    if self.check_card_distribution(group1, group2):
+                    if count1 == 2 and count2 == 2:
                         # Détermine le statut selon l'offset
                         if offset == 0:
                             status = "✅0️⃣"
@@ -332,18 +352,18 @@ class PredictionScheduler:
                         else:  # offset == 2
                             status = "✅2️⃣"
                         
-                        print(f"✅ Prédiction réussie N{predicted_num:03d}: {status}")
+                        logger.info("✅ Prédiction réussie N%03d: %s", predicted_num, status)
                         return predicted_num, status
                     else:
                         # Distribution incorrecte
-                        print(f"❌ Distribution incorrecte pour N{predicted_num:03d}")
+                        logger.info("❌ Distribution incorrecte pour N%03d", predicted_num)
                         return predicted_num, "📌❌"
         
         return None, None
     
     async def run_scheduler(self):
         """Boucle principale du planificateur"""
-        print("🚀 Démarrage du planificateur automatique")
+        logger.info("🚀 Démarrage du planificateur automatique")
         
         # Charge ou génère la planification
         self.schedule_data = self.load_schedule()
@@ -369,13 +389,13 @@ class PredictionScheduler:
                 await asyncio.sleep(30)
                 
             except Exception as e:
-                print(f"❌ Erreur dans le planificateur: {e}")
+                logger.error("❌ Erreur dans le planificateur: %s", e)
                 await asyncio.sleep(60)  # Attendre plus longtemps en cas d'erreur
     
     def stop_scheduler(self):
         """Arrête le planificateur"""
         self.is_running = False
-        print("🛑 Planificateur arrêté")
+        logger.info("🛑 Planificateur arrêté")
     
     def get_schedule_status(self) -> Dict[str, Any]:
         """Retourne le statut actuel de la planification"""
@@ -408,16 +428,19 @@ class PredictionScheduler:
         """Régénère une nouvelle planification quotidienne"""
         self.schedule_data = self.generate_daily_schedule()
         self.save_schedule(self.schedule_data)
-        print("🔄 Nouvelle planification générée")
+        logger.info("🔄 Nouvelle planification générée")
 
 # Exemple d'utilisation
 if __name__ == "__main__":
+    from bot_logging import setup_logging
+    setup_logging()
+
     # Génération d'un exemple de planification
     from unittest.mock import Mock
     mock_client = Mock()
     mock_predictor = Mock()
-    scheduler = PredictionScheduler(mock_client, mock_predictor, 0, 0)
+    scheduler = PredictionScheduler(mock_client, mock_predictor, 0, 0, persistence=PersistenceService())
     schedule = scheduler.generate_daily_schedule()
     scheduler.schedule_data = schedule
     scheduler.save_schedule(schedule)
-    print("✅ Exemple de planification généré dans prediction.yaml")
\ No newline at end of file
+    logger.info("✅ Exemple de planification généré dans prediction.yaml")
\ No newline at end of file
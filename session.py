@@ -0,0 +1,109 @@
+"""
+Session Telegram stable entre les redémarrages.
+
+Une session neuve à chaque démarrage (nom horodaté) impose une autorisation
+complète par jeton, la négociation du datacenter et un cache d'entités vide, et
+des redémarrages fréquents exposent aux limites d'autorisation. Modes
+(``SESSION_MODE``) :
+
+- ``file`` (défaut) : fichier de session SQLite au nom stable (``SESSION_NAME``),
+  réutilisé tant que le disque est conservé ;
+- ``string`` : ``StringSession`` lue dans ``TELEGRAM_SESSION`` ou en base de
+  données (clé ``telegram_session``), et réenregistrée en base après connexion ;
+  adapté aux hébergeurs à disque éphémère ;
+- ``ephemeral`` : ancien comportement, une session neuve à chaque démarrage.
+"""
+import os
+import time
+from typing import NamedTuple, Optional
+
+from telethon.sessions import StringSession
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+SESSION_CONFIG_KEY = 'telegram_session'
+
+
+class SessionInfo(NamedTuple):
+    """Session à passer à TelegramClient, et son mode"""
+    session: object
+    mode: str
+
+
+def create_session(default_name: str, database=None) -> SessionInfo:
+    """
+    Session selon SESSION_MODE.
+
+    Args:
+        default_name: Nom du fichier de session si SESSION_NAME n'est pas défini
+        database: Base de données où lire la StringSession (mode ``string``)
+    """
+    mode = os.getenv('SESSION_MODE', 'file').lower()
+    if mode == 'string':
+        saved = os.getenv('TELEGRAM_SESSION')
+        if not saved and database:
+            try:
+                saved = database.get_config(SESSION_CONFIG_KEY)
+            except Exception as e:
+                logger.warning("⚠️ Lecture de la session en base impossible: %s", e)
+        if not saved and database is None:
+            logger.warning("⚠️ SESSION_MODE=string sans TELEGRAM_SESSION ni base : la session ne survivra pas au redémarrage")
+        return SessionInfo(StringSession(saved or None), mode)
+    if mode == 'ephemeral':
+        return SessionInfo(f'{default_name}_{int(time.time())}', mode)
+    if mode != 'file':
+        logger.warning("⚠️ SESSION_MODE inconnu '%s', mode file utilisé", mode)
+    return SessionInfo(os.getenv('SESSION_NAME', default_name), 'file')
+
+
+def has_auth_key(client) -> bool:
+    """Vrai si la session apporte déjà une clé d'autorisation (à vérifier avant ``start``)"""
+    return getattr(client.session, 'auth_key', None) is not None
+
+
+def store_string_session(client, database) -> bool:
+    """Enregistre la StringSession courante en base (mode ``string``) pour le prochain démarrage"""
+    if database is None or not isinstance(client.session, StringSession):
+        return False
+    try:
+        database.set_config(SESSION_CONFIG_KEY, client.session.save())
+        return True
+    except Exception as e:
+        logger.warning("⚠️ Enregistrement de la session en base impossible: %s", e)
+        return False
+
+
+class StartupTimer:
+    """Durées du démarrage à froid (connexion, bot prêt), pour les journaux et /status"""
+
+    def __init__(self, mode: str, started: Optional[float] = None):
+        """
+        Args:
+            mode: Mode de session (file, string, ephemeral)
+            started: Origine des durées (perf_counter), maintenant par défaut
+        """
+        self.mode = mode
+        self.started = time.perf_counter() if started is None else started
+        self.auth_reused: Optional[bool] = None
+        self.connect_ms: Optional[float] = None
+        self.ready_ms: Optional[float] = None
+
+    def connected(self, auth_reused: bool):
+        self.auth_reused = auth_reused
+        self.connect_ms = (time.perf_counter() - self.started) * 1000
+
+    def ready(self):
+        self.ready_ms = (time.perf_counter() - self.started) * 1000
+        logger.info("⏱️ Démarrage: connexion %.0f ms, prêt en %.0f ms (session %s, autorisation %s)",
+                    self.connect_ms or 0, self.ready_ms, self.mode,
+                    'réutilisée' if self.auth_reused else 'nouvelle')
+
+    def snapshot(self) -> dict:
+        return {
+            'session_mode': self.mode,
+            'auth_reused': self.auth_reused,
+            'connect_ms': self.connect_ms,
+            'ready_ms': self.ready_ms,
+        }
@@ -0,0 +1,244 @@
+"""
+Instantanés binaires de l'état des prédicteurs (redémarrage à chaud).
+
+Format versionné et compact :
+
+    en-tête  : magic ``CPSN`` | version (u8) | drapeaux (u8) | CRC32 du corps (u32)
+    corps    : zlib( nombre de tables (u32) | pour chaque table : clé (i64) + état )
+
+L'état d'une table est une suite de sections à taille préfixée (entiers i64 et
+flottants f64 big-endian, textes UTF-8 préfixés par leur longueur u16). L'écriture est
+atomique (``persistence.atomic_write`` : fichier temporaire, fsync, os.replace) et se
+fait hors de la boucle asyncio via ``save_snapshot``.
+"""
+import asyncio
+import struct
+import zlib
+from typing import Any, Dict, Hashable, List, Tuple
+
+from bot_logging import get_logger
+from persistence import atomic_write
+
+logger = get_logger(__name__)
+
+MAGIC = b'CPSN'
+# v2 : chiffre déclencheur des prédictions ⌛ et politique de déclenchement
+# v3 : réservations du planificateur et marques (chat_id, message_id)
+VERSION = 3
+FLAG_ZLIB = 0x01
+
+_HEADER = struct.Struct('>4sBBI')
+_I64 = struct.Struct('>q')
+_U32 = struct.Struct('>I')
+_U16 = struct.Struct('>H')
+_F64 = struct.Struct('>d')
+_NONE = -(1 << 63)  # Sentinelle i64 pour None
+
+# Types des éléments de l'ensemble de déduplication
+_ITEM_INT = 0
+_ITEM_STR = 1
+
+
+class SnapshotError(ValueError):
+    """Instantané illisible (magic, version ou somme de contrôle invalide)"""
+
+
+class _Writer:
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def int(self, value):
+        self.buffer += _I64.pack(_NONE if value is None else value)
+
+    def count(self, value: int):
+        self.buffer += _U32.pack(value)
+
+    def text(self, value: str):
+        data = value.encode('utf-8')
+        self.buffer += _U16.pack(len(data))
+        self.buffer += data
+
+    def ints(self, values: List[int]):
+        self.count(len(values))
+        self.buffer += struct.pack(f'>{len(values)}q', *values)
+
+    def pairs(self, values: List[Tuple[int, str]]):
+        self.count(len(values))
+        for number, label in values:
+            self.int(number)
+            self.text(label)
+
+    def floats(self, values: List[float]):
+        self.count(len(values))
+        self.buffer += struct.pack(f'>{len(values)}d', *values)
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.view = memoryview(data)
+        self.offset = 0
+
+    def _unpack(self, fmt: struct.Struct):
+        value = fmt.unpack_from(self.view, self.offset)[0]
+        self.offset += fmt.size
+        return value
+
+    def int(self):
+        value = self._unpack(_I64)
+        return None if value == _NONE else value
+
+    def count(self) -> int:
+        return self._unpack(_U32)
+
+    def text(self) -> str:
+        size = self._unpack(_U16)
+        value = bytes(self.view[self.offset:self.offset + size]).decode('utf-8')
+        self.offset += size
+        return value
+
+    def ints(self) -> List[int]:
+        size = self.count()
+        values = list(struct.unpack_from(f'>{size}q', self.view, self.offset))
+        self.offset += _I64.size * size
+        return values
+
+    def pairs(self) -> List[Tuple[int, str]]:
+        return [(self.int(), self.text()) for _ in range(self.count())]
+
+    def floats(self) -> List[float]:
+        size = self.count()
+        values = list(struct.unpack_from(f'>{size}d', self.view, self.offset))
+        self.offset += _F64.size * size
+        return values
+
+
+def _write_state(writer: _Writer, state: Dict[str, Any]):
+    writer.int(state['last_trigger_used'])
+    writer.ints(state['trigger_numbers'])
+    writer.ints(state['counters'])
+    writer.ints(state['pending'])
+    writer.pairs(state['statuses'])
+    writer.ints(state['resolved'])
+    writer.count(len(state['messages']))
+    for game, chat_id, message_id in state['messages']:
+        writer.int(game)
+        writer.int(chat_id)
+        writer.int(message_id)
+    writer.pairs(state['status_log'])
+    writer.pairs(state['last_predictions'])
+    writer.count(len(state['dedup']))
+    for item in state['dedup']:
+        if isinstance(item, int):
+            writer.buffer.append(_ITEM_INT)
+            writer.int(item)
+        else:
+            writer.buffer.append(_ITEM_STR)
+            writer.text(str(item))
+    triggers = state.get('triggers', [])
+    writer.ints([value for pair in triggers for value in pair])
+    writer.text(state.get('policy_mode', ''))
+    writer.floats(state.get('policy', []))
+    writer.ints(state.get('auto_predictions', []))
+    watermarks = state.get('watermarks', [])
+    writer.ints([value for row in watermarks for value in row])
+
+
+def _read_state(reader: _Reader, version: int) -> Dict[str, Any]:
+    state = {
+        'last_trigger_used': reader.int(),
+        'trigger_numbers': reader.ints(),
+        'counters': reader.ints(),
+        'pending': reader.ints(),
+        'statuses': reader.pairs(),
+        'resolved': reader.ints(),
+        'messages': [(reader.int(), reader.int(), reader.int()) for _ in range(reader.count())],
+        'status_log': reader.pairs(),
+        'last_predictions': reader.pairs(),
+    }
+    dedup: List[Hashable] = []
+    for _ in range(reader.count()):
+        kind = reader.view[reader.offset]
+        reader.offset += 1
+        dedup.append(reader.int() if kind == _ITEM_INT else reader.text())
+    state['dedup'] = dedup
+    if version >= 2:
+        flat = reader.ints()
+        state['triggers'] = list(zip(flat[0::2], flat[1::2]))
+        state['policy_mode'] = reader.text()
+        state['policy'] = reader.floats()
+    if version >= 3:
+        state['auto_predictions'] = reader.ints()
+        flat = reader.ints()
+        state['watermarks'] = list(zip(flat[0::3], flat[1::3], flat[2::3]))
+    return state
+
+
+def encode_snapshot(tables: Dict[int, Dict[str, Any]]) -> bytes:
+    """Encode l'état de plusieurs tables (clé = canal de statistiques)"""
+    writer = _Writer()
+    writer.count(len(tables))
+    for key, state in tables.items():
+        writer.int(key)
+        _write_state(writer, state)
+    body = zlib.compress(bytes(writer.buffer), 6)
+    return _HEADER.pack(MAGIC, VERSION, FLAG_ZLIB, zlib.crc32(body)) + body
+
+
+def decode_snapshot(data: bytes) -> Dict[int, Dict[str, Any]]:
+    """Décode un instantané produit par encode_snapshot"""
+    if len(data) < _HEADER.size:
+        raise SnapshotError("instantané tronqué")
+    magic, version, flags, checksum = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("magic invalide")
+    if version > VERSION:
+        raise SnapshotError(f"version {version} non prise en charge (max {VERSION})")
+    body = data[_HEADER.size:]
+    if zlib.crc32(body) != checksum:
+        raise SnapshotError("somme de contrôle invalide")
+    if flags & FLAG_ZLIB:
+        try:
+            body = zlib.decompress(body)
+        except zlib.error as e:
+            raise SnapshotError(f"contenu compressé corrompu: {e}") from e
+
+    reader = _Reader(body)
+    try:
+        tables = {}
+        for _ in range(reader.count()):
+            key = reader.int()
+            tables[key] = _read_state(reader, version)
+        return tables
+    except (struct.error, UnicodeDecodeError) as e:
+        raise SnapshotError(f"contenu corrompu: {e}") from e
+
+
+def write_snapshot(path: str, tables: Dict[int, Dict[str, Any]]) -> int:
+    """Écrit l'instantané de façon atomique et retourne sa taille en octets"""
+    return atomic_write(path, encode_snapshot(tables))
+
+
+def read_snapshot(path: str) -> Dict[int, Dict[str, Any]]:
+    """Charge un instantané ; dictionnaire vide s'il est absent ou illisible"""
+    try:
+        with open(path, 'rb') as f:
+            return decode_snapshot(f.read())
+    except FileNotFoundError:
+        return {}
+    except (OSError, SnapshotError, zlib.error) as e:
+        logger.warning("⚠️ Instantané %s ignoré: %s", path, e)
+        return {}
+
+
+async def save_snapshot(path: str, tables: Dict[int, Dict[str, Any]]) -> int:
+    """Encode et écrit l'instantané dans un thread, sans bloquer la boucle asyncio
+
+    Annuler l'appelant ne l'interrompt pas avant la fin de l'écriture en cours : un
+    instantané plus ancien ne peut pas remplacer (os.replace) un instantané écrit après lui.
+    """
+    write = asyncio.ensure_future(asyncio.to_thread(write_snapshot, path, tables))
+    try:
+        return await asyncio.shield(write)
+    except asyncio.CancelledError:
+        await write
+        raise
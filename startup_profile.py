@@ -0,0 +1,119 @@
+"""
+Profil du démarrage à froid (``--profile-startup`` ou ``PROFILE_STARTUP=1``).
+
+Mesure, depuis l'import de ce module (premier import des points d'entrée) :
+
+- le temps d'import de chaque module, inclusif et propre (sans ses propres
+  imports), comme ``python -X importtime`` ;
+- la durée des étapes d'initialisation nommées (``phase``) ;
+- les jalons (connexion, bot prêt, premier message traité).
+
+Sans le drapeau, les étapes et jalons restent horodatés (coût négligeable) mais
+les imports ne sont pas instrumentés et aucun rapport n'est journalisé.
+"""
+import builtins
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+PROCESS_START = time.perf_counter()
+
+
+def profiling_requested(argv: Optional[List[str]] = None) -> bool:
+    """Vrai si ``--profile-startup`` est passé ou PROFILE_STARTUP activé"""
+    argv = sys.argv if argv is None else argv
+    return '--profile-startup' in argv or os.getenv('PROFILE_STARTUP', '').lower() in ('1', 'true', 'yes')
+
+
+class StartupProfiler:
+    """Imports, étapes et jalons du démarrage, en millisecondes depuis PROCESS_START"""
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.started = PROCESS_START
+        self.imports: Dict[str, Tuple[float, float]] = {}  # module -> (inclusif, propre)
+        self.phases: List[Tuple[str, float]] = []
+        self.milestones: Dict[str, float] = {}
+        self._stack: List[float] = []
+        self._original_import = None
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def install(self):
+        """Instrumente les imports (uniquement si le profil est demandé)"""
+        if self.enabled and self._original_import is None:
+            self._original_import = builtins.__import__
+            builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += elapsed
+            self.imports.setdefault(name, (elapsed, elapsed - children))
+
+    @contextmanager
+    def phase(self, name: str):
+        """Chronomètre une étape d'initialisation"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def milestone(self, name: str) -> float:
+        """Enregistre un jalon (la première occurrence seulement) et retourne son horodatage"""
+        return self.milestones.setdefault(name, self.elapsed_ms())
+
+    def first_message(self):
+        """À appeler pour chaque message traité ; journalise le délai au premier"""
+        if 'first_message' not in self.milestones:
+            elapsed = self.milestone('first_message')
+            if self.enabled:
+                from bot_logging import get_logger
+                get_logger(__name__).info("⏱️ Premier message traité %.0f ms après le lancement", elapsed)
+
+    def report(self, top: int = 15):
+        """Journalise les imports les plus lents, les étapes et les jalons, puis retire l'instrumentation"""
+        self.uninstall()
+        if not self.enabled:
+            return
+        from bot_logging import get_logger
+        logger = get_logger(__name__)
+
+        logger.info("⏱️ Profil du démarrage (%s modules importés):", len(self.imports))
+        slowest = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (inclusive, own) in slowest:
+            logger.info("   import %-28s %8.1f ms (propre %.1f ms)", name, inclusive, own)
+        for name, elapsed in self.phases:
+            logger.info("   étape  %-28s %8.1f ms", name, elapsed)
+        for name, elapsed in self.milestones.items():
+            logger.info("   jalon  %-28s %8.1f ms", name, elapsed)
+
+    def snapshot(self) -> dict:
+        return {
+            'phases_ms': dict(self.phases),
+            'milestones_ms': dict(self.milestones),
+            'imports_ms': {name: round(inclusive, 1) for name, (inclusive, _) in self.imports.items()},
+        }
+
+
+profiler = StartupProfiler(profiling_requested())
+profiler.install()
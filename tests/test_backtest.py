@@ -0,0 +1,53 @@
+"""Cas limites du backtest hors ligne"""
+import pytest
+
+pytest.importorskip('numpy')
+
+from backtest import encode_messages, run_backtest
+from benchmarks.generator import StatMessageGenerator
+from message_parser import parse_stat_message
+from predictor import CardPredictor
+from trigger_policy import FixedTriggerPolicy
+
+
+def test_trigger_without_resolving_message_stays_pending():
+    # Export tronqué : un déclencheur, aucun message résolvant
+    result = run_backtest(encode_messages(['#N17. 5(K♠️Q♥️) - 3(7♦️8♣️)']), [7])
+    assert result['overall']['predictions'] == 1
+    assert result['overall']['pending'] == 1
+    assert result['overall']['wins'] == 0
+
+
+def test_empty_history():
+    result = run_backtest(encode_messages([]), [7])
+    assert result['overall']['predictions'] == 0
+
+
+def _replay_live(messages, triggers):
+    """Rejoue les messages dans le CardPredictor du bot (sans saut aléatoire)"""
+    predictor = CardPredictor(history_size=len(messages), retention_window=len(messages),
+                              dedup_size=len(messages))
+    predictor.trigger_numbers = list(triggers)
+    predictor.policy = FixedTriggerPolicy(repeat_skip=0)
+    created = 0
+    for text in messages:
+        parsed = parse_stat_message(text)
+        created += predictor.should_predict(parsed)[0]
+        predictor.verify_prediction(parsed)
+    return created, predictor
+
+
+@pytest.mark.parametrize('seed', [1, 7, 42])
+@pytest.mark.parametrize('triggers', [(6, 7, 8, 9), (5, 7, 8)])
+def test_parity_with_the_live_predictor(seed, triggers):
+    messages = StatMessageGenerator(seed).batch(3000)
+    created, predictor = _replay_live(messages, triggers)
+    result = run_backtest(encode_messages(messages), triggers)
+
+    stats = predictor.stats
+    overall = result['overall']
+    assert created and overall['predictions'] == created
+    assert overall['wins'] == stats.wins
+    assert overall['losses_invalid'] + overall['losses_expired'] == stats.losses
+    assert overall['pending'] == predictor.pending_count()
+    assert [result['by_offset'][str(offset)]['wins'] for offset in range(3)] == stats.wins_by_offset
@@ -0,0 +1,38 @@
+"""Codec des symboles de cartes"""
+import pytest
+
+from card_codec import SUIT_BITS, count_cards, decode_group, mask_to_suits, normalize_suits, suit_mask
+
+
+@pytest.mark.parametrize('group, count, mask', [
+    ('', 0, 0),
+    ('K♠️', 1, 0b0001),
+    ('K♠', 1, 0b0001),
+    ('♠️10♥️K', 2, 0b0011),
+    ('K♠️Q♠️', 2, 0b0001),
+    ('7♦️8♣️', 2, 0b1100),
+    ('K♠️Q♥️9♦️', 3, 0b0111),
+    ('A♠️K♥️Q♦️J♣️', 4, 0b1111),
+])
+def test_decode_group(group, count, mask):
+    assert decode_group(group) == (count, mask)
+    assert count_cards(group) == count
+    assert suit_mask(group) == mask
+
+
+def test_variation_selector_is_not_a_card():
+    assert count_cards('️️') == 0
+    assert decode_group('K♠️Q♥️') == decode_group('K♠Q♥')
+
+
+def test_suit_bits():
+    assert SUIT_BITS == {'♠': 1, '♥': 2, '♦': 4, '♣': 8}
+
+
+def test_mask_suits_follow_the_historical_sort():
+    for mask in range(16):
+        suits = mask_to_suits(mask)
+        assert suits == ''.join(sorted(suits))
+        assert len(suits) == bin(mask).count('1')
+    assert normalize_suits('J♣️Q♦️K♠️A♥️') == ''.join(sorted('♠♥♦♣'))
+    assert normalize_suits('♥️♥️') == '♥'
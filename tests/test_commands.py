@@ -0,0 +1,120 @@
+"""Dispatcher unique des commandes d'administration"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from commands import CommandDispatcher
+
+ADMIN = 42
+
+
+class FakeEvent:
+    def __init__(self, text, sender_id=ADMIN, is_group=False, is_channel=False):
+        self.message = SimpleNamespace(message=text)
+        self.sender_id = sender_id
+        self.is_group = is_group
+        self.is_channel = is_channel
+        self.pattern_match = None
+        self.responses = []
+
+    async def respond(self, text):
+        self.responses.append(text)
+
+
+def _dispatch(dispatcher, event):
+    return asyncio.run(dispatcher.dispatch(event))
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('/status', ('status', '')),
+    ('/set_stat -100123', ('set_stat', '-100123')),
+    ('/set_stat@MonBot -100123', ('set_stat', '-100123')),
+    ('/route_add  1 2 ', ('route_add', '1 2')),
+    ('/sta\nsuite', ('sta', '')),
+    ('bonjour', (None, '')),
+    ('', (None, '')),
+])
+def test_parse(text, expected):
+    assert CommandDispatcher.parse(text) == expected
+
+
+def test_exact_names_and_arguments():
+    dispatcher = CommandDispatcher(ADMIN)
+    calls = []
+
+    @dispatcher.command('sta')
+    async def sta(event):
+        calls.append('sta')
+
+    @dispatcher.command('set_stat', args=r'(-?\d+)')
+    async def set_stat(event):
+        calls.append(int(event.pattern_match.group(1)))
+
+    assert _dispatch(dispatcher, FakeEvent('/sta'))
+    assert not _dispatch(dispatcher, FakeEvent('/start'))  # /sta ne capture plus /start
+    assert _dispatch(dispatcher, FakeEvent('/set_stat -100'))
+    assert _dispatch(dispatcher, FakeEvent('/set_stat abc'))  # Reconnue, arguments refusés
+    assert not _dispatch(dispatcher, FakeEvent('texte libre'))
+    assert calls == ['sta', -100]
+    assert dispatcher.names() == ['set_stat', 'sta']
+
+
+def test_admin_deny_and_silent_ignore():
+    dispatcher = CommandDispatcher(ADMIN)
+    calls = []
+
+    @dispatcher.command('set_stat', args=r'(-?\d+)', deny='❌ admin')
+    async def set_stat(event):
+        calls.append('set_stat')
+
+    @dispatcher.command('reset')
+    async def reset(event):
+        calls.append('reset')
+
+    @dispatcher.command('start', admin=False)
+    async def start(event):
+        calls.append('start')
+
+    denied = FakeEvent('/set_stat 1', sender_id=7)
+    _dispatch(dispatcher, denied)
+    ignored = FakeEvent('/reset', sender_id=7)
+    _dispatch(dispatcher, ignored)
+    _dispatch(dispatcher, FakeEvent('/start', sender_id=7))
+    assert denied.responses == ['❌ admin']
+    assert ignored.responses == []
+    assert calls == ['start']
+
+
+def test_private_commands_ignore_groups_and_channels():
+    dispatcher = CommandDispatcher(ADMIN)
+    calls = []
+
+    @dispatcher.command('set_display', args=r'(-?\d+)', private=True)
+    async def set_display(event):
+        calls.append(event.pattern_match.group(1))
+
+    _dispatch(dispatcher, FakeEvent('/set_display 5', is_group=True))
+    _dispatch(dispatcher, FakeEvent('/set_display 6', is_channel=True))
+    _dispatch(dispatcher, FakeEvent('/set_display 7'))
+    assert calls == ['7']
+
+
+def test_every_matching_callback_runs_in_order():
+    # Comme /deploy dans Jhh : deux gestionnaires pour la même commande
+    dispatcher = CommandDispatcher(ADMIN)
+    calls = []
+
+    @dispatcher.command('deploy')
+    async def deploy_command(event):
+        calls.append('deploy_command')
+        raise RuntimeError('zip impossible')
+
+    @dispatcher.command('deploy')
+    async def deploy_package(event):
+        calls.append('deploy_package')
+
+    assert _dispatch(dispatcher, FakeEvent('/deploy'))
+    # L'erreur du premier est journalisée, le second s'exécute quand même
+    assert calls == ['deploy_command', 'deploy_package']
+    assert len(dispatcher) == 1
@@ -0,0 +1,117 @@
+"""Déduplication par marques hautes et index message → jeu"""
+import pytest
+
+from dedup import MessageGameIndex, MessageWatermarks
+from predictor import CardPredictor
+
+
+def test_in_order_and_duplicates():
+    marks = MessageWatermarks(window=8)
+    assert marks.is_new(1, 100)
+    assert marks.is_new(1, 101)
+    assert not marks.is_new(1, 101)
+    assert not marks.is_new(1, 100)
+    assert marks.high_water(1) == 101
+    assert (marks.accepted, marks.rejected) == (2, 2)
+
+
+def test_out_of_order_inside_window():
+    marks = MessageWatermarks(window=8)
+    assert marks.is_new(1, 110)
+    # Messages plus anciens, arrivés en retard, dans la fenêtre
+    assert marks.is_new(1, 105)
+    assert marks.is_new(1, 103)
+    assert not marks.is_new(1, 105)
+    assert marks.is_new(1, 112)  # Décale le masque : 105 et 103 restent connus
+    assert not marks.is_new(1, 105)
+    assert not marks.is_new(1, 103)
+    assert marks.is_new(1, 106)
+    assert marks.high_water(1) == 112
+
+
+def test_out_of_order_outside_window_is_rejected():
+    marks = MessageWatermarks(window=8)
+    assert marks.is_new(1, 110)
+    assert marks.is_new(1, 103)  # delta 7, dernier identifiant de la fenêtre
+    assert not marks.is_new(1, 102)  # delta 8, trop ancien
+    assert not marks.is_new(1, 50)
+
+
+def test_chats_are_independent():
+    marks = MessageWatermarks(window=8)
+    assert marks.is_new(1, 100)
+    assert marks.is_new(2, 100)
+    assert not marks.is_new(1, 100)
+    assert len(marks) == 2
+
+
+def test_max_window_fits_a_signed_64_bit_integer():
+    marks = MessageWatermarks(window=MessageWatermarks.MAX_WINDOW)
+    for message_id in range(1, 200):
+        assert marks.is_new(1, message_id)
+    (_, _, bits), = marks.export_state()
+    assert bits == (1 << 63) - 1
+    assert bits < 2 ** 63
+    with pytest.raises(ValueError):
+        MessageWatermarks(window=64)
+    with pytest.raises(ValueError):
+        MessageWatermarks(window=0)
+
+
+def test_duplicates_after_restart():
+    marks = MessageWatermarks(window=16)
+    for message_id in (200, 198, 195):
+        marks.is_new(1, message_id)
+    marks.is_new(2, 7)
+
+    restarted = MessageWatermarks(window=16)
+    restarted.restore_state(marks.export_state())
+    assert not restarted.is_new(1, 200)
+    assert not restarted.is_new(1, 198)
+    assert not restarted.is_new(1, 195)
+    assert restarted.is_new(1, 197)  # Jamais reçu, toujours dans la fenêtre
+    assert not restarted.is_new(2, 7)
+    assert restarted.is_new(2, 8)
+
+
+def test_restore_keeps_the_highest_mark():
+    marks = MessageWatermarks(window=16)
+    marks.is_new(1, 300)
+    marks.restore_state([(1, 250, 1), (3, 40, 1)])
+    assert marks.high_water(1) == 300
+    assert marks.high_water(3) == 40
+    # Masque d'une fenêtre plus large tronqué à la fenêtre courante
+    narrow = MessageWatermarks(window=4)
+    narrow.restore_state([(1, 100, (1 << 20) - 1)])
+    assert narrow.export_state() == [(1, 100, 0b1111)]
+
+
+def test_predictor_rejects_duplicates_after_warm_restart():
+    predictor = CardPredictor()
+    assert predictor.is_new_message(-100, 42)
+    assert not predictor.is_new_message(-100, 42)
+
+    restarted = CardPredictor()
+    restarted.restore_state(predictor.export_state())
+    assert not restarted.is_new_message(-100, 42)
+    assert restarted.is_new_message(-100, 43)
+
+
+def test_game_index_cap_evicts_oldest():
+    index = MessageGameIndex(maxlen=3)
+    for message_id in range(1, 5):
+        index.add(1, message_id, 100 + message_id)
+    assert len(index) == 3
+    assert index.get(1, 1) is None
+    assert index.get(1, 4) == 104
+
+
+def test_game_index_refresh_moves_entry_to_the_end():
+    index = MessageGameIndex(maxlen=3)
+    index.add(1, 1, 101)
+    index.add(1, 2, 102)
+    index.add(1, 3, 103)
+    index.add(1, 1, 111)  # Modification : l'entrée redevient la plus récente
+    index.add(1, 4, 104)
+    assert index.get(1, 1) == 111
+    assert index.get(1, 2) is None
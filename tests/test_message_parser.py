@@ -0,0 +1,59 @@
+"""Analyse unique des messages du canal de statistiques"""
+import pytest
+
+from message_parser import ensure_parsed, extract_game_number, parse_stat_message
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('#N 123 5(K♠️Q♥️)', 123),
+    ('#n123. 5(K♠️Q♥️)', 123),
+    ('#N60. ✅', 60),
+    ('#N60 ✅', 60),  # Sans point final
+    ('Résultat du jeu #45', 45),
+    ('jeu 7', 7),
+    ('aucun numéro (K♠️)', None),
+])
+def test_game_number_forms(text, expected):
+    assert extract_game_number(text) == expected
+    assert parse_stat_message(text).game_number == expected
+
+
+def test_emoji_and_plain_suits_are_equivalent():
+    emoji = parse_stat_message('#N12. 5(K♠️Q♥️) - 3(7♦️8♣️)')
+    plain = parse_stat_message('#N12. 5(K♠Q♥) - 3(7♦8♣)')
+    assert emoji.card_counts == plain.card_counts == (2, 2)
+    assert emoji.suits == plain.suits == ('♠♥', '♣♦')
+    assert emoji.suit_masks == plain.suit_masks == (0b0011, 0b1100)
+    assert emoji.groups != plain.groups  # Texte d'origine conservé
+
+
+def test_three_card_group():
+    parsed = parse_stat_message('#N12. ✅ 5(K♠️Q♥️9♠️) - 3(7♦️8♣️)')
+    assert parsed.card_counts == (3, 2)
+    assert parsed.suits[0] == '♠♥'
+
+
+@pytest.mark.parametrize('tag', ['✅', '🔰', '❌', '⭕'])
+def test_verification_tags(tag):
+    parsed = parse_stat_message(f'#N12. {tag} 5(K♠️Q♥️) - 3(7♦️8♣️)')
+    assert parsed.is_verification
+    assert not parsed.has_clock
+    assert tag in parsed.tags
+
+
+def test_clock_flag():
+    parsed = parse_stat_message('#N12. ⏰ 5(K♠️Q♥️) - 3(7♦️8♣️)')
+    assert parsed.has_clock
+    assert parsed.is_verification
+
+
+def test_message_without_tags_or_groups():
+    parsed = parse_stat_message('#N12.')
+    assert not parsed.is_verification
+    assert parsed.groups == parsed.card_counts == parsed.suits == ()
+
+
+def test_ensure_parsed_reuses_the_record():
+    parsed = parse_stat_message('#N12. 5(K♠️Q♥️)')
+    assert ensure_parsed(parsed) is parsed
+    assert ensure_parsed('#N12. 5(K♠️Q♥️)') == parsed
@@ -0,0 +1,86 @@
+"""Format d'exposition Prometheus des métriques"""
+import asyncio
+
+import pytest
+
+from metrics import Registry, timed
+
+
+def test_counter_with_labels():
+    registry = Registry()
+    counter = registry.counter('bot_messages_total', 'Messages', ('stage',))
+    counter.inc('received')
+    counter.inc('received')
+    counter.inc('parsed', amount=0.5)
+    assert registry.render().splitlines() == [
+        '# HELP bot_messages_total Messages',
+        '# TYPE bot_messages_total counter',
+        'bot_messages_total{stage="received"} 2',
+        'bot_messages_total{stage="parsed"} 0.5',
+    ]
+    assert counter.value('received') == 2
+    assert counter.value('filtered') == 0
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter('c', 'Aide', ('name',)).inc('a"b\\c\nd')
+    assert 'c{name="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_gauge_value_and_function():
+    registry = Registry()
+    registry.gauge('depth', 'Profondeur').set_function(lambda: 7)
+    broken = registry.gauge('broken', 'Erreur')
+    broken.set_function(lambda: 1 / 0)
+    lines = registry.render().splitlines()
+    assert 'depth 7' in lines
+    assert '# TYPE broken gauge' in lines
+    assert not any(line.startswith('broken ') for line in lines)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latence', ('method',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, 'send')
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latence',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{method="send",le="0.1"} 2',  # Borne incluse
+        'latency_seconds_bucket{method="send",le="1"} 3',
+        'latency_seconds_bucket{method="send",le="+Inf"} 4',
+        'latency_seconds_sum{method="send"} 3.65',
+        'latency_seconds_count{method="send"} 4',
+    ]
+    assert histogram.count('send') == 4
+    assert histogram.count('edit') == 0
+
+
+def test_histogram_without_labels():
+    registry = Registry()
+    histogram = registry.histogram('lag_seconds', 'Retard', buckets=(1,))
+    histogram.observe(2)
+    lines = registry.render().splitlines()
+    assert 'lag_seconds_bucket{le="1"} 0' in lines
+    assert 'lag_seconds_bucket{le="+Inf"} 1' in lines
+    assert 'lag_seconds_sum 2' in lines
+
+
+def test_timed_decorator_for_functions_and_coroutines():
+    registry = Registry()
+    histogram = registry.histogram('handler_seconds', 'Durée', ('handler',))
+
+    @timed(histogram, 'sync')
+    def work():
+        return 1
+
+    @timed(histogram, 'async')
+    async def async_work():
+        raise ValueError('échec')
+
+    assert work() == 1
+    with pytest.raises(ValueError):
+        asyncio.run(async_work())
+    assert histogram.count('sync') == 1
+    assert histogram.count('async') == 1  # Mesuré même en cas d'exception
@@ -0,0 +1,253 @@
+"""File d'envoi : seaux à jetons, FloodWait, priorités et enchaînement des modifications"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('telethon')
+
+from telethon.errors import FloodWaitError, MessageNotModifiedError
+
+from outbox import (PRIORITY_PREDICTION, PRIORITY_REPORT, PRIORITY_RESULT, OutboundQueue,
+                    TokenBucket, _Job)
+
+
+class FakeClient:
+    """Client Telegram en mémoire : journal des appels, erreurs programmables"""
+
+    def __init__(self, errors=(), latency: float = 0.0):
+        self.calls = []
+        self.times = []
+        self.errors = list(errors)
+        self.latency = latency
+        self.next_id = 100
+
+    async def _call(self, entry):
+        self.calls.append(entry)
+        self.times.append(time.monotonic())
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.errors:
+            error = self.errors.pop(0)
+            if error is not None:
+                raise error
+
+    async def send_message(self, chat_id, text):
+        await self._call(('send', chat_id, text))
+        self.next_id += 1
+        return SimpleNamespace(id=self.next_id - 1)
+
+    async def edit_message(self, chat_id, message_id, text):
+        await self._call(('edit', chat_id, message_id, text))
+        return SimpleNamespace(id=message_id)
+
+
+def _queue(client, **kwargs):
+    options = {'chat_rate': 100, 'chat_burst': 100, 'global_rate': 1000, 'edit_delay': 0}
+    options.update(kwargs)
+    return OutboundQueue(client, **options)
+
+
+def test_token_bucket_rate_and_burst():
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket.updated = 0.0
+    assert bucket.delay(0.0) == 0
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.delay(0.0) == pytest.approx(0.5)
+    assert bucket.delay(0.5) == 0
+
+
+def test_token_bucket_pause():
+    bucket = TokenBucket(rate=2, burst=2)
+    bucket.updated = 0.0
+    bucket.pause(3, now=10.0)
+    assert bucket.delay(11.0) == pytest.approx(2.0)
+    assert bucket.tokens == 0
+
+
+def test_chat_bucket_does_not_block_other_chats():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client, chat_rate=10, chat_burst=1)
+        futures = [queue.send(1, f'a{i}') for i in range(3)] + [queue.send(2, 'b')]
+        await asyncio.gather(*futures)
+        await queue.close()
+        return client
+
+    client = asyncio.run(scenario())
+    chat1 = [at for call, at in zip(client.calls, client.times) if call[1] == 1]
+    chat2 = [at for call, at in zip(client.calls, client.times) if call[1] == 2]
+    assert [call[2] for call in client.calls if call[1] == 1] == ['a0', 'a1', 'a2']
+    assert all(later - earlier >= 0.08 for earlier, later in zip(chat1, chat1[1:]))
+    assert chat2[0] < chat1[1]
+
+
+def test_global_bucket_limits_all_chats():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client, global_rate=10)  # Rafale globale de 10
+        await asyncio.gather(*(queue.send(chat, 'x') for chat in range(12)))
+        await queue.close()
+        return client
+
+    client = asyncio.run(scenario())
+    assert len(client.calls) == 12
+    assert client.times[-1] - client.times[0] >= 0.15
+
+
+def test_priority_order_within_a_chat():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client)
+        await asyncio.gather(queue.send(1, 'report', PRIORITY_REPORT),
+                             queue.send(1, 'result', PRIORITY_RESULT),
+                             queue.send(1, 'prediction', PRIORITY_PREDICTION))
+        await queue.close()
+        return client
+
+    client = asyncio.run(scenario())
+    assert [call[2] for call in client.calls] == ['prediction', 'result', 'report']
+
+
+def test_flood_wait_pauses_chat_and_keeps_sequence():
+    async def scenario():
+        client = FakeClient(errors=[FloodWaitError(request=None, capture=30)])
+        queue = _queue(client)
+        job = _Job(1, None, 'x', PRIORITY_RESULT, asyncio.get_running_loop().create_future(), None)
+        await queue._execute(job, 7)
+        return queue, job
+
+    queue, job = asyncio.run(scenario())
+    assert queue._heap == [(PRIORITY_RESULT, 7, job)]
+    assert job.attempts == 0
+    assert not job.future.done()
+    assert queue.flood_waits == 1
+    assert queue._bucket(1).delay(time.monotonic()) > 29
+
+
+def test_on_sent_error_does_not_resend_delivered_message():
+    def on_sent(message):
+        raise RuntimeError('stockage impossible')
+
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client)
+        message = await queue.send(1, 'prediction', PRIORITY_PREDICTION, on_sent)
+        await queue.close()
+        return client, queue, message
+
+    client, queue, message = asyncio.run(scenario())
+    assert message.id == 100
+    assert client.calls == [('send', 1, 'prediction')]
+    assert queue.failed == 0
+
+
+def test_edit_after_chains_on_pending_send():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client)
+        key = ('table', 20)
+        sent = queue.send(1, '⌛', PRIORITY_PREDICTION, key=key)
+        assert queue.pending_sends(key) == {1: sent}
+        edited = await queue.edit_after(sent, 1, '✅0️⃣')
+        await queue.close()
+        return client, queue, key, edited
+
+    client, queue, key, edited = asyncio.run(scenario())
+    assert client.calls == [('send', 1, '⌛'), ('edit', 1, 100, '✅0️⃣')]
+    assert edited.id == 100
+    assert queue.pending_sends(key) == {}
+
+
+def test_edit_after_failed_send_resolves_none():
+    async def scenario():
+        client = FakeClient(errors=[RuntimeError('réseau')])
+        queue = _queue(client, max_attempts=1)
+        sent = queue.send(1, '⌛', PRIORITY_PREDICTION, key='k')
+        edited = await queue.edit_after(sent, 1, '✅0️⃣')
+        await queue.close()
+        return client, edited
+
+    client, edited = asyncio.run(scenario())
+    assert edited is None
+    assert client.calls == [('send', 1, '⌛')]
+
+
+def test_queued_edits_of_a_message_are_coalesced():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client, edit_delay=0.05)
+        futures = [queue.edit(1, 10, text) for text in ('a', 'b', 'c')]
+        results = await asyncio.gather(*futures)
+        await queue.close()
+        return client, queue, futures, results
+
+    client, queue, futures, results = asyncio.run(scenario())
+    assert client.calls == [('edit', 1, 10, 'c')]
+    assert queue.coalesced == 2
+    assert futures[0] is futures[1] is futures[2]
+    assert results[0].id == 10
+
+
+def test_edit_with_unchanged_text_is_skipped():
+    async def scenario():
+        client = FakeClient()
+        queue = _queue(client)
+        message = await queue.send(1, 'x')
+        unchanged = await queue.edit(1, message.id, 'x')
+        await queue.close()
+        return client, queue, unchanged
+
+    client, queue, unchanged = asyncio.run(scenario())
+    assert unchanged is None
+    assert client.calls == [('send', 1, 'x')]
+    assert queue.unchanged == 1
+
+
+def test_message_not_modified_remembers_text():
+    async def scenario():
+        client = FakeClient(errors=[MessageNotModifiedError(request=None)])
+        queue = _queue(client)
+        first = await queue.edit(1, 10, 'x')
+        second = await queue.edit(1, 10, 'x')
+        await queue.close()
+        return client, queue, first, second
+
+    client, queue, first, second = asyncio.run(scenario())
+    assert first is None and second is None
+    assert client.calls == [('edit', 1, 10, 'x')]
+    assert queue.unchanged == 2
+
+
+def test_fan_out_runs_chats_concurrently_and_each_chat_in_order():
+    async def scenario():
+        client = FakeClient(latency=0.1)
+        queue = _queue(client, concurrency=4)
+        started = time.monotonic()
+        await asyncio.gather(*(queue.send(chat, 'a') for chat in range(4)),
+                             queue.send(0, 'b'))
+        elapsed = time.monotonic() - started
+        await queue.close()
+        return client, elapsed
+
+    client, elapsed = asyncio.run(scenario())
+    # Quatre chats en parallèle, puis le second envoi du chat 0 : deux latences, pas cinq
+    assert elapsed < 0.35
+    assert [call[2] for call in client.calls if call[1] == 0] == ['a', 'b']
+
+
+def test_concurrency_limit():
+    async def scenario():
+        client = FakeClient(latency=0.05)
+        queue = _queue(client, concurrency=2)
+        started = time.monotonic()
+        await asyncio.gather(*(queue.send(chat, 'a') for chat in range(4)))
+        await queue.close()
+        return client, time.monotonic() - started
+
+    client, elapsed = asyncio.run(scenario())
+    assert elapsed >= 0.09
+    # Deux envois partent tout de suite, les deux autres attendent une place
+    assert sum(at - client.times[0] < 0.03 for at in client.times) == 2
@@ -0,0 +1,104 @@
+"""Écriture atomique et sauvegardes différées"""
+import asyncio
+import json
+import os
+
+import pytest
+
+from persistence import PersistenceService, WriteBehind, atomic_write, atomic_write_json
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('ancien')
+    assert atomic_write(str(path), b'nouveau') == 7
+    assert path.read_bytes() == b'nouveau'
+    assert os.listdir(tmp_path) == ['config.json']  # Aucun fichier temporaire laissé
+
+
+def test_atomic_write_failure_keeps_the_old_file(tmp_path, monkeypatch):
+    path = tmp_path / 'config.json'
+    path.write_text('ancien')
+
+    def fail(src, dst):
+        raise OSError('disque plein')
+
+    monkeypatch.setattr(os, 'replace', fail)
+    with pytest.raises(OSError):
+        atomic_write(str(path), b'nouveau')
+    assert path.read_text() == 'ancien'
+    assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_atomic_write_json(tmp_path):
+    path = tmp_path / 'state.json'
+    atomic_write_json(str(path), {'canal': 'é'})
+    assert json.loads(path.read_text(encoding='utf-8')) == {'canal': 'é'}
+    assert 'é' in path.read_text(encoding='utf-8')
+
+
+def test_write_behind_coalesces_marks():
+    state = {'value': 0}
+    written = []
+
+    async def scenario():
+        writer = WriteBehind('test', lambda: dict(state), written.append, delay=0.05)
+        for value in range(1, 6):
+            state['value'] = value
+            writer.mark_dirty()
+        await asyncio.sleep(0.15)
+        return writer
+
+    writer = asyncio.run(scenario())
+    # Une seule écriture, avec l'état capturé au moment de l'écriture
+    assert written == [{'value': 5}]
+    assert writer.writes == 1
+    assert writer.coalesced == 4
+    assert not writer.dirty
+
+
+def test_flush_writes_without_waiting_for_the_delay():
+    written = []
+
+    async def scenario():
+        service = PersistenceService(delay=60)
+        first = service.track('a', lambda: 'a', written.append)
+        service.track('b', lambda: 'b', written.append)
+        first.mark_dirty()
+        await service.flush()
+        await service.flush()  # Plus rien de sale
+        return service
+
+    service = asyncio.run(scenario())
+    assert written == ['a']
+    assert service.stats()['a'] == {'dirty': False, 'writes': 1, 'coalesced': 0}
+
+
+def test_failed_write_stays_dirty():
+    attempts = []
+
+    def write(snapshot):
+        attempts.append(snapshot)
+        if len(attempts) == 1:
+            raise OSError('disque plein')
+
+    async def scenario():
+        writer = WriteBehind('test', lambda: 'état', write, delay=60)
+        writer.mark_dirty()
+        await writer.flush()
+        assert writer.dirty
+        await writer.flush()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert attempts == ['état', 'état']
+    assert not writer.dirty
+    assert writer.writes == 1
+
+
+def test_mark_dirty_without_a_loop_writes_immediately():
+    written = []
+    writer = WriteBehind('test', lambda: 'état', written.append, delay=60)
+    writer.mark_dirty()
+    assert written == ['état']
+    assert not writer.dirty
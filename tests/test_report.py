@@ -0,0 +1,123 @@
+"""Bilans périodiques : un bilan par palier franchi, et par intervalle"""
+import asyncio
+from types import SimpleNamespace
+
+import report
+from report import ReportScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _shard(channel, total=0):
+    return SimpleNamespace(stat_channel=channel, predictor=SimpleNamespace(status_total=total))
+
+
+def _scheduler(shards, **kwargs):
+    sent = []
+
+    async def send(shard, text):
+        sent.append((shard.stat_channel, text))
+
+    scheduler = ReportScheduler(shards, lambda shard: f'bilan {shard.predictor.status_total}', send, **kwargs)
+    return scheduler, sent
+
+
+def test_one_report_per_boundary():
+    shard = _shard(1, total=15)
+    scheduler, sent = _scheduler([shard], every=20, interval=0)
+
+    async def scenario():
+        scheduler.start()
+        for total in (19, 20, 20, 25, 39, 40, 85):
+            shard.predictor.status_total = total
+            await scheduler.check()
+        scheduler.stop()
+
+    asyncio.run(scenario())
+    # 20 et 40 franchis une fois chacun ; de 40 à 85, un seul bilan
+    assert sent == [(1, 'bilan 20'), (1, 'bilan 40'), (1, 'bilan 85')]
+    assert scheduler.stats() == {'sent': 3, 'every': 20, 'interval': 0}
+
+
+def test_boundary_reached_before_start_is_not_republished():
+    shard = _shard(1, total=40)
+    scheduler, sent = _scheduler([shard], every=20, interval=0)
+
+    async def scenario():
+        scheduler.start()
+        await scheduler.check()
+        scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sent == []
+
+
+def test_tables_are_independent_and_reset_restarts_counting():
+    first, second = _shard(1, total=0), _shard(2, total=0)
+    scheduler, sent = _scheduler([first, second], every=10, interval=0)
+
+    async def scenario():
+        scheduler.start()
+        first.predictor.status_total = 10
+        await scheduler.check()
+        first.predictor.status_total = 3  # /reset : compteurs remis à zéro
+        second.predictor.status_total = 10
+        await scheduler.check()
+        first.predictor.status_total = 10
+        await scheduler.check()
+        scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sent == [(1, 'bilan 10'), (2, 'bilan 10'), (1, 'bilan 10')]
+
+
+def test_interval_report_needs_new_results(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(report.time, 'monotonic', clock)
+    shard = _shard(1, total=0)
+    scheduler, sent = _scheduler([shard], every=20, interval=60)
+
+    async def scenario():
+        scheduler.start()
+        shard.predictor.status_total = 3
+        clock.now += 30
+        await scheduler.check()  # Intervalle pas encore écoulé
+        clock.now += 31
+        await scheduler.check()
+        clock.now += 120
+        await scheduler.check()  # Aucun nouveau résultat
+        shard.predictor.status_total = 4
+        await scheduler.check()
+        scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sent == [(1, 'bilan 3'), (1, 'bilan 4')]
+
+
+def test_interval_defaults_to_environment(monkeypatch):
+    monkeypatch.setenv('REPORT_EVERY', '5')
+    monkeypatch.setenv('REPORT_INTERVAL', '90')
+    scheduler, _ = _scheduler([])
+    assert (scheduler.every, scheduler.interval) == (5, 90)
+
+
+def test_notify_wakes_the_background_task():
+    shard = _shard(1, total=0)
+    scheduler, sent = _scheduler([shard], every=20, interval=0)
+
+    async def scenario():
+        scheduler.start()
+        shard.predictor.status_total = 20
+        scheduler.notify()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        scheduler.stop()
+
+    asyncio.run(scenario())
+    assert sent == [(1, 'bilan 20')]
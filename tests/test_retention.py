@@ -0,0 +1,85 @@
+"""Structures à mémoire bornée : éviction LRU, durée de vie, fenêtre de rétention"""
+import retention
+from predictor import CardPredictor
+from retention import BoundedSet, RetentionWindow
+from trigger_policy import FixedTriggerPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bounded_set_evicts_least_recently_used():
+    items = BoundedSet(maxlen=3)
+    for item in (1, 2, 3):
+        items.add(item)
+    assert 1 in items  # Consultation : 1 redevient le plus récent
+    items.add(4)
+    assert list(items) == [3, 1, 4]
+    assert 2 not in items
+    assert len(items) == 3
+
+
+def test_bounded_set_add_refreshes_existing_item():
+    items = BoundedSet(maxlen=2)
+    items.add('a')
+    items.add('b')
+    items.add('a')
+    items.add('c')
+    assert list(items) == ['a', 'c']
+
+
+def test_bounded_set_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(retention.time, 'monotonic', clock)
+    items = BoundedSet(maxlen=10, ttl=60)
+    items.add(1)
+    clock.now += 30
+    items.add(2)
+    clock.now += 31
+    assert 1 not in items  # 61 s : expiré et retiré
+    assert 2 in items
+    assert len(items) == 1
+    clock.now += 60
+    assert 2 not in items
+
+
+def test_bounded_set_discard_and_clear():
+    items = BoundedSet(maxlen=3)
+    items.add(1)
+    items.discard(1)
+    items.discard(2)
+    assert 1 not in items
+    items.add(3)
+    items.clear()
+    assert len(items) == 0
+
+
+def test_retention_window_returns_evicted_keys_in_order():
+    window = RetentionWindow(size=2)
+    assert window.push(1) == []
+    assert window.push(2) == []
+    assert window.push(3) == [1]
+    assert window.push(4) == [2]
+    assert list(window) == [3, 4]
+    window.size = 1
+    assert window.push(5) == [3, 4]
+
+
+def test_predictor_eviction_keeps_pending_predictions():
+    predictor = CardPredictor(retention_window=2)
+    predictor.trigger_numbers = [6]
+    predictor.policy = FixedTriggerPolicy(repeat_skip=0)
+    for decade in range(1, 6):
+        assert predictor.should_predict(f'#N{decade}6. 5(K♠️Q♥️) - 3(7♦️8♣️)')[0]
+    # #20 reste ⌛ ; #30, #40, #50 et #60 sont résolus, la fenêtre en garde 2
+    for game in (30, 40, 50, 60):
+        assert predictor.verify_prediction(f'#N{game}. ✅ 4(K♠️Q♥️) - 4(7♦️8♣️)') == (True, game)
+    assert predictor.pending_predictions() == [20]
+    assert predictor.prediction_status[20] == '⌛'
+    assert set(predictor.prediction_status) == {20, 50, 60}
+    assert predictor.verify_prediction('#N22. ✅ 4(K♠️Q♥️) - 4(7♦️8♣️)') == (True, 20)
@@ -0,0 +1,50 @@
+"""Compteurs O(1) et fenêtres glissantes des statistiques"""
+from rolling_stats import PredictionStats, RollingCounter, TimeWindowCounter, win_offset
+
+
+def test_win_offset():
+    assert [win_offset(s) for s in ('✅0️⃣', '✅1️⃣', '✅2️⃣')] == [0, 1, 2]
+    assert win_offset('✅') == 0
+    assert win_offset('❌❌') is None
+    assert win_offset('⭕') is None
+
+
+def test_rolling_counter_keeps_the_last_n_results():
+    counter = RollingCounter(size=3)
+    for win in (True, True, False, False):
+        counter.add(win)
+    assert counter.snapshot() == {'total': 3, 'wins': 1, 'win_rate': 1 / 3 * 100}
+    counter.add(False)
+    assert counter.snapshot()['wins'] == 0
+    counter.clear()
+    assert counter.snapshot() == {'total': 0, 'wins': 0, 'win_rate': 0.0}
+
+
+def test_time_window_counter_expires_old_buckets():
+    counter = TimeWindowCounter(window_seconds=60, buckets=6)  # Seaux de 10 s
+    counter.add(True, now=1000)
+    counter.add(False, now=1015)
+    counter.add(True, now=1055)
+    assert counter.snapshot(now=1059) == {'total': 3, 'wins': 2, 'win_rate': 2 / 3 * 100}
+    # À 1065 le seau de 1000-1009 est sorti de la fenêtre
+    assert counter.snapshot(now=1065)['total'] == 2
+    # Seau réutilisé une période plus tard : son ancien contenu est remis à zéro
+    counter.add(False, now=1075)
+    assert counter.snapshot(now=1075) == {'total': 2, 'wins': 1, 'win_rate': 50.0}
+    assert counter.snapshot(now=2000)['total'] == 0
+
+
+def test_prediction_stats_counts_offsets_and_losses():
+    stats = PredictionStats(last_n=2)
+    for statut in ('✅0️⃣', '✅2️⃣', '❌❌', '⭕', '✅1️⃣'):
+        stats.record(statut)
+    snapshot = stats.snapshot(pending=4)
+    assert snapshot['total'] == 5
+    assert snapshot['wins'] == 3
+    assert snapshot['wins_by_offset'] == {'✅0️⃣': 1, '✅1️⃣': 1, '✅2️⃣': 1}
+    assert snapshot['losses'] == 2
+    assert snapshot['pending'] == 4
+    assert snapshot['win_rate'] == 60.0
+    assert snapshot['last_n'] == {'total': 2, 'wins': 1, 'win_rate': 50.0}
+    stats.reset()
+    assert stats.snapshot(pending=0)['total'] == 0
@@ -0,0 +1,44 @@
+"""Sauvegarde de la planification par le service de persistance du bot"""
+import asyncio
+
+import pytest
+
+pytest.importorskip('telethon')
+yaml = pytest.importorskip('yaml')
+
+from persistence import PersistenceService
+from predictor import CardPredictor
+from scheduler import PredictionScheduler
+
+
+def test_persistence_is_required():
+    with pytest.raises(TypeError):
+        PredictionScheduler(None, CardPredictor(), 0, 0)
+
+
+def test_shutdown_flush_writes_a_pending_schedule(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario():
+        persistence = PersistenceService(delay=60)
+        scheduler = PredictionScheduler(None, CardPredictor(), 0, 0, persistence=persistence)
+        scheduler.save_schedule({'N1000': {'statut': '⌛'}})
+        assert not (tmp_path / 'prediction.yaml').exists()
+        # Arrêt du bot : le service partagé vide aussi la planification
+        await persistence.flush()
+
+    asyncio.run(scenario())
+    saved = yaml.safe_load((tmp_path / 'prediction.yaml').read_text(encoding='utf-8'))
+    assert saved == {'N1000': {'statut': '⌛'}}
+
+
+def test_flush_schedule(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    async def scenario():
+        scheduler = PredictionScheduler(None, CardPredictor(), 0, 0, persistence=PersistenceService(delay=60))
+        scheduler.save_schedule({'N1000': {'statut': '✅0️⃣'}})
+        return await scheduler.flush_schedule()
+
+    assert asyncio.run(scenario())
+    assert (tmp_path / 'prediction.yaml').exists()
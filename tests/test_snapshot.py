@@ -0,0 +1,128 @@
+"""Format binaire des instantanés : aller-retour, corruption et versions"""
+import struct
+import zlib
+
+import pytest
+
+import snapshot
+from predictor import CardPredictor
+from snapshot import (SnapshotError, _HEADER, _Writer, decode_snapshot, encode_snapshot,
+                      read_snapshot, write_snapshot)
+
+MESSAGES = [
+    '#N16. 5(K♠️Q♥️) - 3(7♦️8♣️)',
+    '#N17. 5(K♠️Q♥️) - 3(7♦️8♣️)',
+    '#N20. ✅ 4(K♠️Q♥️) - 4(7♦️8♣️)',
+    '#N27. 5(J♦️2♣️) - 3(7♦️8♣️)',
+    '#N31. ✅ 5(K♠️Q♥️9♦️) - 3(7♦️8♣️)',
+    '#N36. 5(A♥️Q♥️) - 3(7♦️8♣️)',
+]
+
+
+def _populated_predictor() -> CardPredictor:
+    predictor = CardPredictor(trigger_policy='adaptive')
+    for message_id, text in enumerate(MESSAGES, start=500):
+        predictor.is_new_message(-100, message_id)
+        predictor.should_predict(text)
+        predictor.verify_prediction(text)
+    predictor.mark_auto_prediction(50)
+    predictor.store_prediction_message(40, 9001, -200)
+    return predictor
+
+
+def test_round_trip_of_a_populated_predictor():
+    state = _populated_predictor().export_state()
+    assert state['pending'] and state['statuses'] and state['status_log']
+
+    decoded = decode_snapshot(encode_snapshot({-100: state}))
+    assert decoded == {-100: state}
+
+    restored = CardPredictor(trigger_policy='adaptive')
+    restored.restore_state(decoded[-100])
+    assert restored.export_state() == state
+
+
+def test_file_round_trip(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    state = _populated_predictor().export_state()
+    assert write_snapshot(path, {1: state}) > 0
+    assert read_snapshot(path) == {1: state}
+    assert read_snapshot(str(tmp_path / 'absent.snap')) == {}
+
+
+def test_crc_mismatch_is_rejected():
+    data = bytearray(encode_snapshot({1: _populated_predictor().export_state()}))
+    data[-1] ^= 0xFF
+    with pytest.raises(SnapshotError, match='somme de contrôle'):
+        decode_snapshot(bytes(data))
+
+
+def test_truncated_data_is_rejected(tmp_path):
+    data = encode_snapshot({1: _populated_predictor().export_state()})
+    with pytest.raises(SnapshotError):
+        decode_snapshot(data[:_HEADER.size - 1])
+    with pytest.raises(SnapshotError):
+        decode_snapshot(data[:-4])
+
+    # Corps tronqué mais somme de contrôle recalculée : flux zlib incomplet
+    body = data[_HEADER.size:-4]
+    forged = _HEADER.pack(snapshot.MAGIC, snapshot.VERSION, snapshot.FLAG_ZLIB, zlib.crc32(body)) + body
+    with pytest.raises(SnapshotError):
+        decode_snapshot(forged)
+
+    # Corps non compressé tronqué
+    raw = zlib.decompress(data[_HEADER.size:])[:-10]
+    forged = _HEADER.pack(snapshot.MAGIC, snapshot.VERSION, 0, zlib.crc32(raw)) + raw
+    with pytest.raises(SnapshotError, match='corrompu'):
+        decode_snapshot(forged)
+
+    path = tmp_path / 'broken.snap'
+    path.write_bytes(data[:-4])
+    assert read_snapshot(str(path)) == {}
+
+
+def test_bad_magic_and_newer_version_are_refused():
+    data = encode_snapshot({})
+    with pytest.raises(SnapshotError, match='magic'):
+        decode_snapshot(b'XXXX' + data[4:])
+    newer = _HEADER.pack(snapshot.MAGIC, snapshot.VERSION + 1, snapshot.FLAG_ZLIB,
+                         struct.unpack_from('>I', data, 6)[0]) + data[_HEADER.size:]
+    with pytest.raises(SnapshotError, match='version'):
+        decode_snapshot(newer)
+
+
+def test_version_1_snapshot_is_migrated():
+    # Instantané v1 : sans déclencheurs, politique, réservations ni marques ; les
+    # réservations du planificateur étaient mêlées aux jeux traités
+    writer = _Writer()
+    writer.count(1)
+    writer.int(-100)
+    writer.int(7)  # last_trigger_used
+    writer.ints([6, 7, 8, 9])
+    writer.ints([3, 1, 1, 0, 1])  # total, ✅0️⃣, ✅1️⃣, ✅2️⃣, ❌
+    writer.ints([40])
+    writer.pairs([(40, '⌛'), (30, '✅0️⃣')])
+    writer.ints([30])
+    writer.count(1)
+    for value in (40, -200, 9001):
+        writer.int(value)
+    writer.pairs([(30, '✅0️⃣')])
+    writer.pairs([(30, '♠♥'), (40, '♦♣')])
+    writer.count(2)
+    writer.buffer.append(snapshot._ITEM_INT)
+    writer.int(37)
+    writer.buffer.append(snapshot._ITEM_STR)
+    writer.text('auto_prediction_50')
+    body = zlib.compress(bytes(writer.buffer))
+    data = _HEADER.pack(snapshot.MAGIC, 1, snapshot.FLAG_ZLIB, zlib.crc32(body)) + body
+
+    state = decode_snapshot(data)[-100]
+    assert 'triggers' not in state and 'watermarks' not in state
+
+    predictor = CardPredictor()
+    predictor.restore_state(state)
+    assert predictor.pending_predictions() == [40]
+    assert 37 in predictor.processed_games
+    assert 50 in predictor.auto_predictions
+    assert predictor.get_prediction_message(40) == {'message_id': 9001, 'chat_id': -200}
+    assert predictor.status_total == 3
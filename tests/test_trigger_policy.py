@@ -0,0 +1,47 @@
+"""Politique de déclenchement adaptative et son appel depuis should_predict"""
+from predictor import CardPredictor
+from trigger_policy import AdaptiveTriggerPolicy
+
+
+def _mature_loser(policy: AdaptiveTriggerPolicy, digit: int):
+    """Chiffre ayant assez de résultats, tous perdants, sous le taux moyen"""
+    for _ in range(300):
+        policy.record(digit, None)
+        policy.record(5, 0)
+
+
+def test_skipped_digit_is_retried_every_n_skips():
+    policy = AdaptiveTriggerPolicy(retry_every=5)
+    _mature_loser(policy, 7)
+    decisions = [policy.allow(7, None) for _ in range(12)]
+    assert decisions == [False] * 5 + [True] + [False] * 5 + [True]
+    assert policy.skipped[7] == 10
+
+
+def test_skip_counters_survive_export_and_restore():
+    policy = AdaptiveTriggerPolicy(retry_every=5)
+    _mature_loser(policy, 7)
+    for _ in range(3):
+        policy.allow(7, None)
+    restored = AdaptiveTriggerPolicy(retry_every=5)
+    restored.restore_state(policy.export_state())
+    assert restored.skipped[7] == 3
+    assert restored.skip_streak[7] == 3
+    # Ancien format (sans compteurs de sauts) toujours accepté
+    legacy = AdaptiveTriggerPolicy()
+    legacy.restore_state(policy.export_state()[:2 + 10 * 5])
+    assert legacy.samples[7] == 300
+    assert legacy.skipped[7] == 0
+
+
+def test_duplicate_trigger_does_not_consume_policy_skips():
+    predictor = CardPredictor(trigger_policy='adaptive')
+    predictor.policy.retry_every = 4
+    _mature_loser(predictor.policy, 7)
+
+    assert predictor.should_predict('#N16. 5(K♠️Q♥️) - 3(7♦️8♣️)') == (True, 20, '♠♥')
+    for _ in range(4):
+        # #20 est déjà prédit : la politique ne doit pas être consultée
+        assert predictor.should_predict('#N17. 5(K♠️Q♥️) - 3(7♦️8♣️)') == (False, None, None)
+    assert predictor.policy.skipped[7] == 0
+    assert predictor.policy.skip_streak[7] == 0
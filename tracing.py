@@ -0,0 +1,172 @@
+"""
+Traces par message du pipeline des canaux de statistiques.
+
+Chaque message de statistiques reçoit une trace légère : un horodatage
+monotone par étape (analyse, déclenchement, vérification, planificateur), puis
+l'envoi ou la modification effective de chaque message Telegram qu'il a
+provoqué. La trace courante est portée par une ``ContextVar`` : la file d'envoi
+y rattache ses opérations sans que les fonctions intermédiaires la transmettent.
+
+Les ``TRACE_BUFFER`` dernières traces sont gardées dans un tampon circulaire
+(``/debug/traces``) ; une trace terminée au-delà de ``TRACE_SLOW_MS`` est
+journalisée avec le détail de ses étapes. ``TRACE_BUFFER=0`` désactive tout.
+"""
+import functools
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class Trace:
+    """Étapes d'un message, en millisecondes depuis sa réception"""
+
+    __slots__ = ('chat_id', 'message_id', 'received_at', 'age_ms', 'started', 'spans',
+                 'pending', 'handled', 'total_ms', 'tracer')
+
+    def __init__(self, tracer: 'Tracer', chat_id: int, message_id: int, age_ms: Optional[float]):
+        self.tracer = tracer
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.received_at = time.time()
+        self.age_ms = age_ms  # Âge du message à la réception (horloge Telegram, à la seconde)
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+        self.pending = 0  # Envois et modifications encore en file
+        self.handled = False
+        self.total_ms: Optional[float] = None
+
+    def mark(self, stage: str):
+        """Fin d'une étape"""
+        self.spans.append((stage, (time.perf_counter() - self.started) * 1000))
+
+    def track(self, future, stage: str):
+        """Rattache une opération de la file d'envoi : l'étape est marquée à sa fin"""
+        self.pending += 1
+        future.add_done_callback(lambda _: self._operation_done(stage))
+
+    def _operation_done(self, stage: str):
+        self.mark(stage)
+        self.pending -= 1
+        if self.handled and not self.pending:
+            self._complete()
+
+    def _handled(self):
+        self.mark('handled')
+        self.handled = True
+        if not self.pending:
+            self._complete()
+
+    def _complete(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        self.tracer._completed(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'chat_id': self.chat_id,
+            'message_id': self.message_id,
+            'received_at': self.received_at,
+            'age_ms': self.age_ms,
+            'spans': [{'stage': stage, 'at_ms': round(at, 3)} for stage, at in self.spans],
+            'pending': self.pending,
+            'total_ms': None if self.total_ms is None else round(self.total_ms, 3),
+        }
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+
+class Tracer:
+    """Tampon circulaire des dernières traces et détection des traces lentes"""
+
+    def __init__(self, capacity: Optional[int] = None, slow_ms: Optional[float] = None):
+        """
+        Args:
+            capacity: Traces gardées (TRACE_BUFFER, 200 par défaut ; 0 désactive)
+            slow_ms: Seuil de journalisation d'une trace lente (TRACE_SLOW_MS, 1000 par défaut)
+        """
+        self.capacity = int(os.getenv('TRACE_BUFFER', '200')) if capacity is None else capacity
+        self.slow_ms = float(os.getenv('TRACE_SLOW_MS', '1000')) if slow_ms is None else slow_ms
+        self._traces: Deque[Trace] = deque(maxlen=self.capacity or None)
+        self.completed = 0
+        self.slow = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def start(self, chat_id: int, message_id: int, sent_at=None) -> Trace:
+        """Nouvelle trace (``sent_at`` : date Telegram du message, pour son âge à la réception)"""
+        age_ms = None
+        if sent_at is not None:
+            try:
+                age_ms = max(0.0, (time.time() - sent_at.timestamp()) * 1000)
+            except (AttributeError, TypeError, ValueError):
+                pass
+        trace = Trace(self, chat_id, message_id, age_ms)
+        self._traces.append(trace)
+        return trace
+
+    def _completed(self, trace: Trace):
+        self.completed += 1
+        if trace.total_ms > self.slow_ms:
+            self.slow += 1
+            logger.warning("🐢 Message %s/%s traité en %.0f ms (âge à la réception: %s ms): %s",
+                           trace.chat_id, trace.message_id, trace.total_ms,
+                           'inconnu' if trace.age_ms is None else f'{trace.age_ms:.0f}',
+                           ', '.join(f'{stage} {at:.1f}' for stage, at in trace.spans))
+
+    def recent(self, limit: Optional[int] = None, slow_only: bool = False) -> List[Dict[str, Any]]:
+        """Traces les plus récentes d'abord"""
+        traces = [trace for trace in reversed(self._traces)
+                  if not slow_only or (trace.total_ms or 0) > self.slow_ms]
+        return [trace.to_dict() for trace in traces[:limit]]
+
+    @staticmethod
+    def mark(stage: str):
+        """Marque la fin d'une étape de la trace courante"""
+        mark(stage)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'buffered': len(self._traces), 'completed': self.completed, 'slow': self.slow,
+                'slow_ms': self.slow_ms}
+
+    def traced(self, handler):
+        """Décorateur d'un gestionnaire Telethon : une trace par message, courante pendant l'appel"""
+        if not self.enabled:
+            return handler
+
+        @functools.wraps(handler)
+        async def wrapper(event):
+            message = event.message
+            trace = self.start(event.chat_id, getattr(message, 'id', None), getattr(message, 'date', None))
+            token = current_trace.set(trace)
+            try:
+                return await handler(event)
+            finally:
+                current_trace.reset(token)
+                trace._handled()
+        return wrapper
+
+
+def mark(stage: str):
+    """Marque la fin d'une étape de la trace courante (sans effet hors d'une trace)"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
+
+
+def track(future, stage: str):
+    """Rattache un futur de la file d'envoi à la trace courante ; retourne le futur"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.track(future, stage)
+    return future
+
+
+tracer = Tracer()
@@ -0,0 +1,173 @@
+"""
+Politiques de choix des déclencheurs du CardPredictor.
+
+- ``fixed`` : comportement historique, tous les chiffres de ``trigger_numbers``
+  déclenchent, avec 30 % de saut quand le même chiffre se répète ;
+- ``adaptive`` : bandit UCB sur des taux de réussite glissants (EWMA) par
+  chiffre déclencheur et par offset ; un chiffre est sauté tant que sa borne
+  optimiste reste sous le taux moyen de tous les déclencheurs, mais il est
+  réessayé tous les ``retry_every`` sauts consécutifs : sans résultat, ni son
+  taux ni son bonus d'exploration ne bougeraient plus.
+
+Chaque décision et chaque mise à jour coûtent O(1). L'état (quelques nombres
+par chiffre) est exporté sous forme de liste de flottants pour les instantanés.
+"""
+import math
+import os
+import random
+from typing import Dict, List, Optional
+
+from bot_logging import get_logger
+
+logger = get_logger(__name__)
+
+OFFSETS = 3  # Réussites ✅0️⃣ / ✅1️⃣ / ✅2️⃣
+
+
+class FixedTriggerPolicy:
+    """Déclencheurs fixes, saut aléatoire d'un chiffre répété"""
+
+    mode = 'fixed'
+
+    def __init__(self, repeat_skip: float = 0.3):
+        self.repeat_skip = repeat_skip
+
+    def allow(self, digit: int, last_digit: Optional[int]) -> bool:
+        """Le chiffre peut-il déclencher une prédiction maintenant ?"""
+        return not (digit == last_digit and random.random() < self.repeat_skip)
+
+    def record(self, digit: int, offset: Optional[int]):
+        """Résultat d'une prédiction déclenchée par ``digit`` (offset ou None si échec)"""
+
+    def reset(self):
+        pass
+
+    def export_state(self) -> List[float]:
+        return []
+
+    def restore_state(self, values: List[float]):
+        pass
+
+    def snapshot(self) -> Dict:
+        return {'mode': self.mode}
+
+
+class AdaptiveTriggerPolicy:
+    """Bandit UCB sur les taux de réussite glissants de chaque chiffre déclencheur"""
+
+    mode = 'adaptive'
+
+    def __init__(self, alpha: float = 0.05, exploration: float = 0.5, min_samples: int = 10,
+                 retry_every: Optional[int] = None):
+        """
+        Args:
+            alpha: Poids d'un nouveau résultat dans les moyennes glissantes (EWMA)
+            exploration: Poids du bonus d'exploration UCB
+            min_samples: Résultats requis avant qu'un chiffre puisse être sauté
+            retry_every: Sauts consécutifs après lesquels un chiffre est réessayé
+                (TRIGGER_RETRY_EVERY, 20 par défaut)
+        """
+        self.alpha = alpha
+        self.exploration = exploration
+        self.min_samples = min_samples
+        self.retry_every = retry_every or int(os.getenv('TRIGGER_RETRY_EVERY', '20'))
+        self.reset()
+
+    def reset(self):
+        self.samples = [0] * 10  # Résultats observés par chiffre
+        self.win_rate = [0.5] * 10  # EWMA des réussites par chiffre
+        self.offset_rate = [[0.0] * OFFSETS for _ in range(10)]  # EWMA par chiffre et offset
+        self.total = 0
+        self.baseline = 0.5  # EWMA des réussites tous chiffres confondus
+        self.skipped = [0] * 10  # Sauts cumulés par chiffre
+        self.skip_streak = [0] * 10  # Sauts depuis le dernier essai
+
+    def _score(self, digit: int) -> float:
+        """Borne optimiste (UCB) du taux de réussite du chiffre"""
+        bonus = self.exploration * math.sqrt(math.log(self.total + 1) / (self.samples[digit] + 1))
+        return self.win_rate[digit] + bonus
+
+    def allow(self, digit: int, last_digit: Optional[int]) -> bool:
+        if (self.samples[digit] < self.min_samples or self._score(digit) >= self.baseline
+                or self.skip_streak[digit] >= self.retry_every):
+            # Essai (y compris forcé) : seul un résultat fait évoluer le taux du chiffre
+            self.skip_streak[digit] = 0
+            return True
+        self.skipped[digit] += 1
+        self.skip_streak[digit] += 1
+        return False
+
+    def record(self, digit: int, offset: Optional[int]):
+        win = 1.0 if offset is not None else 0.0
+        alpha = self.alpha
+        self.samples[digit] += 1
+        self.total += 1
+        self.win_rate[digit] += alpha * (win - self.win_rate[digit])
+        self.baseline += alpha * (win - self.baseline)
+        rates = self.offset_rate[digit]
+        for k in range(OFFSETS):
+            rates[k] += alpha * ((1.0 if offset == k else 0.0) - rates[k])
+
+    def export_state(self) -> List[float]:
+        values = [float(self.total), self.baseline]
+        for digit in range(10):
+            values.append(float(self.samples[digit]))
+            values.append(self.win_rate[digit])
+            values.extend(self.offset_rate[digit])
+        for digit in range(10):
+            values.append(float(self.skipped[digit]))
+            values.append(float(self.skip_streak[digit]))
+        return values
+
+    def restore_state(self, values: List[float]):
+        width = 2 + OFFSETS
+        rates_end = 2 + 10 * width
+        # Les instantanés antérieurs s'arrêtent après les taux (sans compteurs de sauts)
+        if len(values) not in (rates_end, rates_end + 10 * 2):
+            logger.warning("⚠️ État de politique adaptative ignoré (%s valeurs)", len(values))
+            return
+        self.total = int(values[0])
+        self.baseline = values[1]
+        for digit in range(10):
+            start = 2 + digit * width
+            self.samples[digit] = int(values[start])
+            self.win_rate[digit] = values[start + 1]
+            self.offset_rate[digit] = list(values[start + 2:start + width])
+        if len(values) > rates_end:
+            for digit in range(10):
+                start = rates_end + digit * 2
+                self.skipped[digit] = int(values[start])
+                self.skip_streak[digit] = int(values[start + 1])
+
+    def snapshot(self) -> Dict:
+        """Taux glissants par chiffre (pour /sta et /status)"""
+        return {
+            'mode': self.mode,
+            'baseline': self.baseline,
+            'digits': {
+                digit: {
+                    'samples': self.samples[digit],
+                    'win_rate': self.win_rate[digit],
+                    'offset_rates': list(self.offset_rate[digit]),
+                    'score': self._score(digit),
+                    'skipped': self.skipped[digit],
+                }
+                for digit in range(10) if self.samples[digit]
+            },
+        }
+
+
+POLICIES = {
+    FixedTriggerPolicy.mode: FixedTriggerPolicy,
+    AdaptiveTriggerPolicy.mode: AdaptiveTriggerPolicy,
+}
+
+
+def create_policy(mode: Optional[str] = None):
+    """Politique demandée (``TRIGGER_POLICY`` par défaut, ``fixed`` sinon)"""
+    mode = (mode or os.getenv('TRIGGER_POLICY') or FixedTriggerPolicy.mode).lower()
+    policy_class = POLICIES.get(mode)
+    if policy_class is None:
+        logger.warning("⚠️ Politique de déclenchement inconnue '%s', mode fixed utilisé", mode)
+        policy_class = FixedTriggerPolicy
+    return policy_class()